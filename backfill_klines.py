@@ -11,13 +11,18 @@ K线数据补齐脚本
 
 import asyncio
 import argparse
+import json
 import logging
+import os
+import time
+from collections import namedtuple
 from datetime import datetime
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, literal, union_all
 
 from src.storage.db_manager import DatabaseManager
 from src.storage.models import MonitoredToken, PotentialToken, TokenKline
 from src.services.kline_service import KlineService
+from src.api_clients.base_client import RateLimiter
 
 # 配置日志
 logging.basicConfig(
@@ -30,209 +35,309 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 检查阶段使用的代币引用，pair_address_lc 在加载时统一转小写一次
+TokenRef = namedtuple(
+    "TokenRef",
+    "type token_address pair_address pair_address_lc chain token_symbol"
+)
+
+# K线数量扫描结果缓存（以K线表最新写入时间为水位线）
+SCAN_CACHE_FILE = '/tmp/backfill_cache.json'
+
+
+def _load_scan_cache(watermark, pair_addrs):
+    """
+    读取K线数量缓存
+
+    水位线一致且缓存覆盖了全部交易对时返回 {pair_address: count}，否则返回 None
+    """
+    try:
+        with open(SCAN_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if cache.get("watermark") != watermark:
+        return None
+    if not set(pair_addrs) <= set(cache.get("pair_addrs", [])):
+        return None
+
+    return cache.get("counts", {})
 
-async def check_missing_klines():
+
+def _save_scan_cache(watermark, pair_addrs, counts):
+    """写入K线数量缓存"""
+    try:
+        data = json.dumps({
+            "watermark": watermark,
+            "pair_addrs": pair_addrs,
+            "counts": counts
+        })
+        with open(SCAN_CACHE_FILE, 'w', encoding='utf-8') as f:
+            f.write(data)
+    except OSError as e:
+        logger.warning(f"写入扫描缓存失败: {e}")
+
+
+def invalidate_scan_cache():
+    """补齐后K线数据已变化，删除扫描缓存"""
+    try:
+        os.remove(SCAN_CACHE_FILE)
+    except FileNotFoundError:
+        pass
+
+
+async def check_missing_klines(db_manager):
     """
     检查哪些代币缺失K线数据
 
+    Args:
+        db_manager: 数据库管理器（由 main 创建并在脚本结束时关闭）
+
     Returns:
-        (missing_tokens, total_tokens, stats)
+        (missing_tokens, total_tokens, stats)，missing_tokens 为 TokenRef 列表，
+        需要补齐时再由调用方转换为字典
     """
-    db_manager = DatabaseManager()
     missing_tokens = []
 
-    try:
-        async with db_manager.get_session() as session:
-            # 1. 获取所有监控代币
-            monitored_result = await session.execute(
-                select(MonitoredToken).where(
-                    and_(
-                        MonitoredToken.deleted_at.is_(None),
-                        MonitoredToken.permanently_deleted == 0
-                    )
-                )
+    async with db_manager.get_session() as session:
+        # 1. 一次查询获取所有监控代币和潜力代币（UNION ALL，按 type 区分来源）
+        monitored_query = select(
+            MonitoredToken.token_address,
+            MonitoredToken.pair_address,
+            MonitoredToken.chain,
+            MonitoredToken.token_symbol,
+            literal("monitored").label("type")
+        ).where(
+            and_(
+                MonitoredToken.deleted_at.is_(None),
+                MonitoredToken.permanently_deleted == 0
             )
-            monitored_tokens = monitored_result.scalars().all()
+        )
+        potential_query = select(
+            PotentialToken.token_address,
+            PotentialToken.pair_address,
+            PotentialToken.chain,
+            PotentialToken.token_symbol,
+            literal("potential").label("type")
+        ).where(
+            and_(
+                PotentialToken.is_added_to_monitoring == 0,
+                PotentialToken.deleted_at.is_(None),
+                PotentialToken.permanently_deleted == 0
+            )
+        )
+        tokens_result = await session.execute(
+            union_all(monitored_query, potential_query)
+        )
 
-            # 2. 获取所有潜力代币
-            potential_result = await session.execute(
-                select(PotentialToken).where(
+        # 2. 按来源拆分为监控代币 / 潜力代币
+        monitored_tokens = []
+        potential_tokens = []
+        for row in tokens_result.all():
+            token = TokenRef(
+                type=row.type,
+                token_address=row.token_address,
+                pair_address=row.pair_address,
+                pair_address_lc=row.pair_address.lower(),
+                chain=row.chain,
+                token_symbol=row.token_symbol or 'N/A'
+            )
+            if token.type == "monitored":
+                monitored_tokens.append(token)
+            else:
+                potential_tokens.append(token)
+
+        # 3. 检查每个代币的K线数据
+        logger.info("=" * 80)
+        logger.info("开始检查K线数据...")
+        logger.info("=" * 80)
+
+        total_monitored = len(monitored_tokens)
+        total_potential = len(potential_tokens)
+        total_tokens = total_monitored + total_potential
+
+        logger.info(f"监控代币: {total_monitored} 个")
+        logger.info(f"潜力代币: {total_potential} 个")
+        logger.info(f"总计: {total_tokens} 个")
+        logger.info("-" * 80)
+
+        # 一次 GROUP BY 查询所有代币的K线数量，避免逐个代币 COUNT
+        pair_addrs = [
+            token.pair_address_lc
+            for token in [*monitored_tokens, *potential_tokens]
+        ]
+
+        # 水位线：K线表最新写入时间，未变化时直接复用上次的扫描结果
+        watermark_result = await session.execute(
+            select(func.max(TokenKline.created_at))
+        )
+        watermark = watermark_result.scalar()
+        watermark = watermark.isoformat() if watermark else None
+
+        counts = _load_scan_cache(watermark, pair_addrs)
+        if counts is not None:
+            logger.info(f"K线数据未变化，使用缓存的扫描结果 ({SCAN_CACHE_FILE})")
+        elif pair_addrs:
+            count_result = await session.execute(
+                select(TokenKline.pair_address, func.count(TokenKline.id))
+                .where(
                     and_(
-                        PotentialToken.is_added_to_monitoring == 0,
-                        PotentialToken.deleted_at.is_(None),
-                        PotentialToken.permanently_deleted == 0
+                        TokenKline.pair_address.in_(pair_addrs),
+                        TokenKline.timeframe == "minute",
+                        TokenKline.aggregate == 5
                     )
                 )
+                .group_by(TokenKline.pair_address)
             )
-            potential_tokens = potential_result.scalars().all()
-
-            # 3. 检查每个代币的K线数据
-            logger.info("=" * 80)
-            logger.info("开始检查K线数据...")
-            logger.info("=" * 80)
-
-            total_monitored = len(monitored_tokens)
-            total_potential = len(potential_tokens)
-            total_tokens = total_monitored + total_potential
-
-            logger.info(f"监控代币: {total_monitored} 个")
-            logger.info(f"潜力代币: {total_potential} 个")
-            logger.info(f"总计: {total_tokens} 个")
-            logger.info("-" * 80)
-
-            # 检查监控代币
-            for token in monitored_tokens:
-                kline_count_result = await session.execute(
-                    select(func.count(TokenKline.id)).where(
-                        and_(
-                            TokenKline.pair_address == token.pair_address.lower(),
-                            TokenKline.timeframe == "minute",
-                            TokenKline.aggregate == 5
-                        )
-                    )
-                )
-                kline_count = kline_count_result.scalar()
-
-                if kline_count == 0:
-                    missing_tokens.append({
-                        "type": "monitored",
-                        "token_address": token.token_address,
-                        "pair_address": token.pair_address,
-                        "chain": token.chain,
-                        "symbol": getattr(token, 'token_symbol', 'N/A'),
-                        "kline_count": 0
-                    })
-                    logger.info(
-                        f"❌ [监控] {getattr(token, 'token_symbol', 'N/A'):10s} "
-                        f"{token.token_address[:10]}... - 缺失K线数据"
-                    )
-                else:
-                    logger.info(
-                        f"✅ [监控] {getattr(token, 'token_symbol', 'N/A'):10s} "
-                        f"{token.token_address[:10]}... - 已有 {kline_count} 根K线"
-                    )
+            counts = dict(count_result.all())
+            _save_scan_cache(watermark, pair_addrs, counts)
+        else:
+            counts = {}
 
-            # 检查潜力代币
-            for token in potential_tokens:
-                kline_count_result = await session.execute(
-                    select(func.count(TokenKline.id)).where(
-                        and_(
-                            TokenKline.pair_address == token.pair_address.lower(),
-                            TokenKline.timeframe == "minute",
-                            TokenKline.aggregate == 5
-                        )
-                    )
-                )
-                kline_count = kline_count_result.scalar()
-
-                if kline_count == 0:
-                    missing_tokens.append({
-                        "type": "potential",
-                        "token_address": token.token_address,
-                        "pair_address": token.pair_address,
-                        "chain": token.chain,
-                        "symbol": getattr(token, 'token_symbol', 'N/A'),
-                        "kline_count": 0
-                    })
+        # 集合差集一次性求出缺失K线的交易对
+        missing_pairs = set(pair_addrs) - counts.keys()
+
+        # 逐个代币的日志只在 INFO 级别开启时才拼装参数
+        log_rows = logger.isEnabledFor(logging.INFO)
+
+        missing_monitored = 0
+        missing_potential = 0
+
+        # 检查监控代币
+        for token in monitored_tokens:
+            if token.pair_address_lc in missing_pairs:
+                missing_monitored += 1
+                missing_tokens.append(token)
+                if log_rows:
                     logger.info(
-                        f"❌ [潜力] {getattr(token, 'token_symbol', 'N/A'):10s} "
-                        f"{token.token_address[:10]}... - 缺失K线数据"
+                        "❌ [监控] %-10s %s... - 缺失K线数据",
+                        token.token_symbol, token.token_address[:10]
                     )
-                else:
+            elif log_rows:
+                logger.info(
+                    "✅ [监控] %-10s %s... - 已有 %d 根K线",
+                    token.token_symbol, token.token_address[:10],
+                    counts[token.pair_address_lc]
+                )
+
+        # 检查潜力代币
+        for token in potential_tokens:
+            if token.pair_address_lc in missing_pairs:
+                missing_potential += 1
+                missing_tokens.append(token)
+                if log_rows:
                     logger.info(
-                        f"✅ [潜力] {getattr(token, 'token_symbol', 'N/A'):10s} "
-                        f"{token.token_address[:10]}... - 已有 {kline_count} 根K线"
+                        "❌ [潜力] %-10s %s... - 缺失K线数据",
+                        token.token_symbol, token.token_address[:10]
                     )
+            elif log_rows:
+                logger.info(
+                    "✅ [潜力] %-10s %s... - 已有 %d 根K线",
+                    token.token_symbol, token.token_address[:10],
+                    counts[token.pair_address_lc]
+                )
 
-            logger.info("=" * 80)
-            logger.info(f"检查完成: 总计 {total_tokens} 个代币，缺失 {len(missing_tokens)} 个")
-            logger.info("=" * 80)
+        logger.info("=" * 80)
+        logger.info(f"检查完成: 总计 {total_tokens} 个代币，缺失 {len(missing_tokens)} 个")
+        logger.info("=" * 80)
 
-            stats = {
-                "total_tokens": total_tokens,
-                "total_monitored": total_monitored,
-                "total_potential": total_potential,
-                "missing_count": len(missing_tokens),
-                "missing_monitored": len([t for t in missing_tokens if t["type"] == "monitored"]),
-                "missing_potential": len([t for t in missing_tokens if t["type"] == "potential"])
-            }
+        stats = {
+            "total_tokens": total_tokens,
+            "total_monitored": total_monitored,
+            "total_potential": total_potential,
+            "missing_count": len(missing_tokens),
+            "missing_monitored": missing_monitored,
+            "missing_potential": missing_potential
+        }
 
-            return missing_tokens, total_tokens, stats
-
-    finally:
-        await db_manager.close()
+        return missing_tokens, total_tokens, stats
 
 
-async def backfill_missing_klines(missing_tokens, delay=2.5):
+async def backfill_missing_klines(db_manager, missing_tokens, delay=2.5, concurrency=5):
     """
     补齐缺失的K线数据
 
     Args:
+        db_manager: 数据库管理器（与检查阶段共用连接池）
         missing_tokens: 缺失K线的代币列表
-        delay: 每次请求之间的延迟（秒）
+        delay: 平均请求间隔（秒），按令牌桶限速，空闲时允许突发
+        concurrency: 同时进行补齐的代币数量
     """
     if not missing_tokens:
         logger.info("没有需要补齐的K线数据")
         return
 
-    kline_service = KlineService()
+    kline_service = KlineService(db_manager)
+    total = len(missing_tokens)
+    concurrency = max(1, concurrency)
 
     logger.info("=" * 80)
-    logger.info(f"开始补齐 {len(missing_tokens)} 个代币的K线数据...")
-    logger.info(f"使用延迟: {delay} 秒/请求")
+    logger.info(f"开始补齐 {total} 个代币的K线数据...")
+    logger.info(f"使用延迟: {delay} 秒/请求, 并发数: {concurrency}")
     logger.info("=" * 80)
 
-    success_count = 0
-    failed_count = 0
-    total_fetched = 0
-    total_saved = 0
+    start_time = time.perf_counter()
+    sem = asyncio.Semaphore(concurrency)
+    # 令牌桶限速（每分钟请求数，保留小数，不会比 delay 更快），代替固定 sleep
+    rate_limiter = RateLimiter(60 / delay) if delay > 0 else None
+
+    async def worker(idx, token_info):
+        """补齐单个代币，返回 update_token_klines 的统计信息（异常时为 None）"""
+        async with sem:
+            logger.info(
+                "[%d/%d] 补齐 %s 代币: %s (%s...) 链: %s",
+                idx, total, token_info['type'], token_info['symbol'],
+                token_info['token_address'][:8], token_info['chain']
+            )
 
-    start_time = datetime.now()
+            try:
+                if rate_limiter:
+                    await rate_limiter.acquire()
+
+                stats = await kline_service.update_token_klines(
+                    token_address=token_info["token_address"],
+                    pair_address=token_info["pair_address"],
+                    chain=token_info["chain"],
+                    timeframe="minute",
+                    aggregate=5,
+                    max_candles=500
+                )
 
-    for idx, token_info in enumerate(missing_tokens, 1):
-        logger.info(
-            f"[{idx}/{len(missing_tokens)}] 补齐 {token_info['type']} 代币: "
-            f"{token_info['symbol']} ({token_info['token_address'][:8]}...) "
-            f"链: {token_info['chain']}"
-        )
+                if stats["success"]:
+                    logger.info(
+                        "  ✅ [%d/%d] 成功: 拉取 %d 根，保存 %d 根",
+                        idx, total, stats['fetched'], stats['saved']
+                    )
+                else:
+                    logger.error(
+                        "  ❌ [%d/%d] 失败: %s",
+                        idx, total, stats.get('error', 'Unknown error')
+                    )
 
-        try:
-            stats = await kline_service.update_token_klines(
-                token_address=token_info["token_address"],
-                pair_address=token_info["pair_address"],
-                chain=token_info["chain"],
-                timeframe="minute",
-                aggregate=5,
-                max_candles=500
-            )
+            except Exception as e:
+                stats = None
+                logger.error("  ❌ [%d/%d] 异常: %s", idx, total, e)
 
-            if stats["success"]:
-                success_count += 1
-                total_fetched += stats["fetched"]
-                total_saved += stats["saved"]
-                logger.info(
-                    f"  ✅ 成功: 拉取 {stats['fetched']} 根，保存 {stats['saved']} 根"
-                )
-            else:
-                failed_count += 1
-                logger.error(
-                    f"  ❌ 失败: {stats.get('error', 'Unknown error')}"
-                )
+            return stats
+
+    results = await asyncio.gather(
+        *(worker(idx, token_info) for idx, token_info in enumerate(missing_tokens, 1))
+    )
 
-        except Exception as e:
-            failed_count += 1
-            logger.error(f"  ❌ 异常: {e}")
+    succeeded = [r for r in results if r and r["success"]]
+    success_count = len(succeeded)
+    failed_count = total - success_count
+    total_fetched = sum(r["fetched"] for r in succeeded)
+    total_saved = sum(r["saved"] for r in succeeded)
 
-        # 延迟避免API限流
-        if idx < len(missing_tokens):
-            await asyncio.sleep(delay)
+    invalidate_scan_cache()
 
-    end_time = datetime.now()
-    duration = (end_time - start_time).total_seconds()
+    duration = time.perf_counter() - start_time
 
     logger.info("=" * 80)
     logger.info("补齐完成!")
-    logger.info(f"总计: {len(missing_tokens)} 个代币")
+    logger.info(f"总计: {total} 个代币")
     logger.info(f"成功: {success_count} 个")
     logger.info(f"失败: {failed_count} 个")
     logger.info(f"拉取: {total_fetched} 根K线")
@@ -241,14 +346,15 @@ async def backfill_missing_klines(missing_tokens, delay=2.5):
     logger.info("=" * 80)
 
 
-async def backfill_all_klines(delay=2.5):
+async def backfill_all_klines(db_manager, delay=2.5):
     """
     强制重新拉取所有代币的K线数据
 
     Args:
+        db_manager: 数据库管理器
         delay: 每次请求之间的延迟（秒）
     """
-    kline_service = KlineService()
+    kline_service = KlineService(db_manager)
 
     result = await kline_service.update_all_tokens_klines(
         timeframe="minute",
@@ -256,6 +362,8 @@ async def backfill_all_klines(delay=2.5):
         max_candles=500
     )
 
+    invalidate_scan_cache()
+
     logger.info("=" * 80)
     logger.info("强制补齐完成!")
     logger.info(f"监控代币: {result['monitored']} 个")
@@ -279,6 +387,7 @@ async def main():
   python3 backfill_klines.py --force      # 强制重新拉取所有代币
   python3 backfill_klines.py --check      # 只检查，不拉取
   python3 backfill_klines.py --delay 3    # 自定义延迟时间（秒）
+  python3 backfill_klines.py --concurrency 3  # 自定义并发数
         """
     )
     parser.add_argument(
@@ -295,7 +404,13 @@ async def main():
         '--delay',
         type=float,
         default=2.5,
-        help='每次请求之间的延迟时间（秒），默认2.5秒'
+        help='平均请求间隔（秒），按令牌桶限速，默认2.5秒'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=5,
+        help='同时补齐的代币数量，默认5个'
     )
 
     args = parser.parse_args()
@@ -305,32 +420,55 @@ async def main():
     logger.info(f"启动时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("=" * 80)
 
-    if args.force:
-        # 强制重新拉取所有代币
-        logger.info("模式: 强制补齐所有代币")
-        await backfill_all_klines(delay=args.delay)
-    else:
-        # 只补齐缺失的代币
-        missing_tokens, total_tokens, stats = await check_missing_klines()
-
-        if args.check:
-            # 只检查，不补齐
-            logger.info("=" * 80)
-            logger.info("检查模式 - 不进行补齐")
-            logger.info(f"总代币数: {stats['total_tokens']}")
-            logger.info(f"  监控代币: {stats['total_monitored']}")
-            logger.info(f"  潜力代币: {stats['total_potential']}")
-            logger.info(f"缺失K线: {stats['missing_count']}")
-            logger.info(f"  监控代币缺失: {stats['missing_monitored']}")
-            logger.info(f"  潜力代币缺失: {stats['missing_potential']}")
-            logger.info("=" * 80)
+    # 整个脚本共用一个数据库管理器（连接池只创建一次）
+    db_manager = DatabaseManager()
+
+    try:
+        if args.force:
+            # 强制重新拉取所有代币
+            logger.info("模式: 强制补齐所有代币")
+            await backfill_all_klines(db_manager, delay=args.delay)
         else:
-            # 补齐缺失的代币
-            if missing_tokens:
-                logger.info("模式: 补齐缺失的代币")
-                await backfill_missing_klines(missing_tokens, delay=args.delay)
+            # 只补齐缺失的代币
+            missing_tokens, total_tokens, stats = await check_missing_klines(db_manager)
+
+            if args.check:
+                # 只检查，不补齐
+                logger.info("=" * 80)
+                logger.info("检查模式 - 不进行补齐")
+                logger.info(f"总代币数: {stats['total_tokens']}")
+                logger.info(f"  监控代币: {stats['total_monitored']}")
+                logger.info(f"  潜力代币: {stats['total_potential']}")
+                logger.info(f"缺失K线: {stats['missing_count']}")
+                logger.info(f"  监控代币缺失: {stats['missing_monitored']}")
+                logger.info(f"  潜力代币缺失: {stats['missing_potential']}")
+                logger.info("=" * 80)
             else:
-                logger.info("所有代币都已有K线数据，无需补齐")
+                # 补齐缺失的代币
+                if missing_tokens:
+                    logger.info("模式: 补齐缺失的代币")
+                    token_infos = [
+                        {
+                            "type": token.type,
+                            "token_address": token.token_address,
+                            "pair_address": token.pair_address,
+                            "chain": token.chain,
+                            "symbol": token.token_symbol,
+                            "kline_count": 0
+                        }
+                        for token in missing_tokens
+                    ]
+                    await backfill_missing_klines(
+                        db_manager,
+                        token_infos,
+                        delay=args.delay,
+                        concurrency=args.concurrency
+                    )
+                else:
+                    logger.info("所有代币都已有K线数据，无需补齐")
+
+    finally:
+        await db_manager.close()
 
     logger.info("=" * 80)
     logger.info("脚本执行完成")
@@ -5,17 +5,21 @@ DexScreener服务高级用法示例
 """
 
 import asyncio
+import csv
 import sys
 import logging
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 
+import orjson
+
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.services.dexscreener_service import DexScreenerService
 from src.storage.db_manager import DatabaseManager
+from src.utils.helpers import ainput
 from sqlalchemy import text
 
 # 配置日志
@@ -37,37 +41,39 @@ async def example1_retry_mechanism():
     max_retries = 3
     retry_delay = 5  # 秒
 
-    for attempt in range(max_retries):
-        service = DexScreenerService()
+    # 服务在多次重试之间复用（数据库连接池只创建一次）
+    service = DexScreenerService()
 
-        try:
-            logger.info(f"尝试 {attempt + 1}/{max_retries}...")
+    try:
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"尝试 {attempt + 1}/{max_retries}...")
 
-            result = await service.scrape_and_import(
-                target_count=50,
-                headless=True,
-                deduplicate=True
-            )
+                result = await service.scrape_and_import(
+                    target_count=50,
+                    headless=True,
+                    deduplicate=True
+                )
 
-            if result['success']:
-                logger.info(f"✓ 成功！最终有 {result['final_count']} 个代币")
-                return result
-            else:
-                raise Exception(result.get('error', 'Unknown error'))
+                if result['success']:
+                    logger.info(f"✓ 成功！最终有 {result['final_count']} 个代币")
+                    return result
+                else:
+                    raise Exception(result.get('error', 'Unknown error'))
 
-        except Exception as e:
-            logger.error(f"✗ 尝试 {attempt + 1} 失败: {e}")
+            except Exception as e:
+                logger.error(f"✗ 尝试 {attempt + 1} 失败: {e}")
 
-            if attempt < max_retries - 1:
-                wait_time = retry_delay * (attempt + 1)
-                logger.info(f"等待 {wait_time} 秒后重试...")
-                await asyncio.sleep(wait_time)
-            else:
-                logger.error("达到最大重试次数，放弃")
-                raise
+                if attempt < max_retries - 1:
+                    wait_time = retry_delay * (attempt + 1)
+                    logger.info(f"等待 {wait_time} 秒后重试...")
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error("达到最大重试次数，放弃")
+                    raise
 
-        finally:
-            await service.close()
+    finally:
+        await service.close()
 
 
 # ==================== 高级示例 2: 定时更新任务 ====================
@@ -81,10 +87,11 @@ async def example2_scheduled_update():
     update_interval = 60  # 60秒更新一次（演示用）
     max_iterations = 3    # 最多运行3次（演示用）
 
+    # 服务在多次更新之间复用（数据库连接池只创建一次）
+    service = DexScreenerService()
+
     async def update_task():
         """更新任务"""
-        service = DexScreenerService()
-
         try:
             logger.info(f"[{datetime.now()}] 开始更新...")
 
@@ -109,20 +116,21 @@ async def example2_scheduled_update():
             logger.exception("更新过程中出错")
             return False
 
-        finally:
-            await service.close()
-
     # 模拟定时任务
-    for i in range(max_iterations):
-        logger.info(f"\n{'=' * 60}")
-        logger.info(f"第 {i + 1}/{max_iterations} 次更新")
-        logger.info(f"{'=' * 60}")
+    try:
+        for i in range(max_iterations):
+            logger.info(f"\n{'=' * 60}")
+            logger.info(f"第 {i + 1}/{max_iterations} 次更新")
+            logger.info(f"{'=' * 60}")
 
-        success = await update_task()
+            success = await update_task()
 
-        if i < max_iterations - 1:
-            logger.info(f"\n等待 {update_interval} 秒后进行下一次更新...")
-            await asyncio.sleep(update_interval)
+            if i < max_iterations - 1:
+                logger.info(f"\n等待 {update_interval} 秒后进行下一次更新...")
+                await asyncio.sleep(update_interval)
+
+    finally:
+        await service.close()
 
     logger.info("\n定时任务演示完成")
 
@@ -140,63 +148,77 @@ async def example3_data_quality_analysis():
 
     try:
         async with db_manager.get_session() as session:
-            # 1. 总体统计
-            print("\n【总体统计】")
+            # 一次扫描计算总体统计、完整性、流动性分布和活跃度
             result = await session.execute(text("""
+                WITH base AS (
+                    SELECT
+                        base_token_address,
+                        dex_id,
+                        price_usd,
+                        liquidity_usd,
+                        volume_h24,
+                        market_cap,
+                        website_url,
+                        txns_h24_buys + txns_h24_sells AS txns_h24
+                    FROM dexscreener_tokens
+                )
                 SELECT
                     COUNT(*) as total,
                     COUNT(DISTINCT base_token_address) as unique_tokens,
-                    COUNT(DISTINCT dex_id) as dex_count
-                FROM dexscreener_tokens
-            """))
-            stats = result.fetchone()
-            print(f"  总记录数: {stats[0]}")
-            print(f"  唯一代币数: {stats[1]}")
-            print(f"  DEX数量: {stats[2]}")
+                    COUNT(DISTINCT dex_id) as dex_count,
 
-            # 2. 数据完整性
-            print("\n【数据完整性】")
-            result = await session.execute(text("""
-                SELECT
                     COUNT(*) FILTER (WHERE price_usd IS NOT NULL) as has_price,
                     COUNT(*) FILTER (WHERE liquidity_usd IS NOT NULL) as has_liquidity,
                     COUNT(*) FILTER (WHERE volume_h24 IS NOT NULL) as has_volume,
                     COUNT(*) FILTER (WHERE market_cap IS NOT NULL) as has_market_cap,
                     COUNT(*) FILTER (WHERE website_url IS NOT NULL) as has_website,
-                    COUNT(*) as total
-                FROM dexscreener_tokens
+
+                    COUNT(*) FILTER (WHERE liquidity_usd < 10000) as liq_lt_10k,
+                    COUNT(*) FILTER (WHERE liquidity_usd >= 10000 AND liquidity_usd < 100000) as liq_10k_100k,
+                    COUNT(*) FILTER (WHERE liquidity_usd >= 100000 AND liquidity_usd < 1000000) as liq_100k_1m,
+                    COUNT(*) FILTER (WHERE liquidity_usd >= 1000000 AND liquidity_usd < 10000000) as liq_1m_10m,
+                    COUNT(*) FILTER (WHERE liquidity_usd >= 10000000) as liq_gt_10m,
+
+                    COUNT(*) FILTER (WHERE txns_h24 > 1000) as very_active,
+                    COUNT(*) FILTER (WHERE txns_h24 BETWEEN 100 AND 1000) as active,
+                    COUNT(*) FILTER (WHERE txns_h24 BETWEEN 10 AND 100) as moderate,
+                    COUNT(*) FILTER (WHERE txns_h24 < 10) as low,
+                    COUNT(txns_h24) as activity_total
+                FROM base
             """))
-            completeness = result.fetchone()
-            total = completeness[5]
-            print(f"  有价格数据: {completeness[0]}/{total} ({completeness[0]/total*100:.1f}%)")
-            print(f"  有流动性数据: {completeness[1]}/{total} ({completeness[1]/total*100:.1f}%)")
-            print(f"  有交易量数据: {completeness[2]}/{total} ({completeness[2]/total*100:.1f}%)")
-            print(f"  有市值数据: {completeness[3]}/{total} ({completeness[3]/total*100:.1f}%)")
-            print(f"  有网站链接: {completeness[4]}/{total} ({completeness[4]/total*100:.1f}%)")
+            stats = result.mappings().one()
+
+            # 1. 总体统计
+            print("\n【总体统计】")
+            print(f"  总记录数: {stats['total']}")
+            print(f"  唯一代币数: {stats['unique_tokens']}")
+            print(f"  DEX数量: {stats['dex_count']}")
+
+            # 2. 数据完整性
+            print("\n【数据完整性】")
+            total = stats['total']
+            print(f"  有价格数据: {stats['has_price']}/{total} ({stats['has_price']/total*100:.1f}%)")
+            print(f"  有流动性数据: {stats['has_liquidity']}/{total} ({stats['has_liquidity']/total*100:.1f}%)")
+            print(f"  有交易量数据: {stats['has_volume']}/{total} ({stats['has_volume']/total*100:.1f}%)")
+            print(f"  有市值数据: {stats['has_market_cap']}/{total} ({stats['has_market_cap']/total*100:.1f}%)")
+            print(f"  有网站链接: {stats['has_website']}/{total} ({stats['has_website']/total*100:.1f}%)")
 
             # 3. 流动性分布
             print("\n【流动性分布】")
-            result = await session.execute(text("""
-                SELECT
-                    CASE
-                        WHEN liquidity_usd < 10000 THEN '< $10k'
-                        WHEN liquidity_usd < 100000 THEN '$10k - $100k'
-                        WHEN liquidity_usd < 1000000 THEN '$100k - $1M'
-                        WHEN liquidity_usd < 10000000 THEN '$1M - $10M'
-                        ELSE '> $10M'
-                    END as range,
-                    COUNT(*) as count
-                FROM dexscreener_tokens
-                WHERE liquidity_usd IS NOT NULL
-                GROUP BY range
-                ORDER BY MIN(liquidity_usd)
-            """))
             print("  流动性范围 | 代币数量")
             print("  " + "-" * 30)
-            for row in result:
-                print(f"  {row[0]:>15} | {row[1]}")
+            liquidity_ranges = [
+                ('< $10k', 'liq_lt_10k'),
+                ('$10k - $100k', 'liq_10k_100k'),
+                ('$100k - $1M', 'liq_100k_1m'),
+                ('$1M - $10M', 'liq_1m_10m'),
+                ('> $10M', 'liq_gt_10m'),
+            ]
+            for label, key in liquidity_ranges:
+                if stats[key]:
+                    print(f"  {label:>15} | {stats[key]}")
 
-            # 4. Top DEX
+            # 4. Top DEX（需要分组，单独一个小查询）
             print("\n【Top DEX】")
             result = await session.execute(text("""
                 SELECT
@@ -216,22 +238,11 @@ async def example3_data_quality_analysis():
 
             # 5. 活跃度分析
             print("\n【交易活跃度】")
-            result = await session.execute(text("""
-                SELECT
-                    COUNT(*) FILTER (WHERE txns_h24_buys + txns_h24_sells > 1000) as very_active,
-                    COUNT(*) FILTER (WHERE txns_h24_buys + txns_h24_sells BETWEEN 100 AND 1000) as active,
-                    COUNT(*) FILTER (WHERE txns_h24_buys + txns_h24_sells BETWEEN 10 AND 100) as moderate,
-                    COUNT(*) FILTER (WHERE txns_h24_buys + txns_h24_sells < 10) as low,
-                    COUNT(*) as total
-                FROM dexscreener_tokens
-                WHERE txns_h24_buys IS NOT NULL AND txns_h24_sells IS NOT NULL
-            """))
-            activity = result.fetchone()
-            total = activity[4]
-            print(f"  非常活跃 (>1000 txns/24h): {activity[0]} ({activity[0]/total*100:.1f}%)")
-            print(f"  活跃 (100-1000 txns/24h): {activity[1]} ({activity[1]/total*100:.1f}%)")
-            print(f"  中等 (10-100 txns/24h): {activity[2]} ({activity[2]/total*100:.1f}%)")
-            print(f"  低活跃 (<10 txns/24h): {activity[3]} ({activity[3]/total*100:.1f}%)")
+            total = stats['activity_total']
+            print(f"  非常活跃 (>1000 txns/24h): {stats['very_active']} ({stats['very_active']/total*100:.1f}%)")
+            print(f"  活跃 (100-1000 txns/24h): {stats['active']} ({stats['active']/total*100:.1f}%)")
+            print(f"  中等 (10-100 txns/24h): {stats['moderate']} ({stats['moderate']/total*100:.1f}%)")
+            print(f"  低活跃 (<10 txns/24h): {stats['low']} ({stats['low']/total*100:.1f}%)")
 
     finally:
         await db_manager.close()
@@ -381,6 +392,23 @@ async def example5_batch_operations():
 
 # ==================== 高级示例 6: 数据导出 ====================
 
+def _write_csv(path: str, rows: List[Any]):
+    """写入CSV文件（在线程中执行）"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            'Symbol', 'Name', 'Price USD', 'Liquidity USD',
+            'Volume 24h', 'Market Cap', 'DEX', 'Pair Address'
+        ])
+        writer.writerows(rows)
+
+
+def _write_json(path: str, data: List[Dict[str, Any]]):
+    """写入JSON文件（在线程中执行），Decimal 由 orjson 的 default 回调转为数字"""
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2, default=float))
+
+
 async def example6_data_export():
     """示例6: 导出数据为不同格式"""
     print("\n" + "=" * 80)
@@ -410,45 +438,32 @@ async def example6_data_export():
 
             tokens = result.fetchall()
 
-            # 导出为CSV
-            import csv
             csv_file = "/tmp/top_tokens.csv"
-            print(f"\n导出为CSV: {csv_file}")
-
-            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    'Symbol', 'Name', 'Price USD', 'Liquidity USD',
-                    'Volume 24h', 'Market Cap', 'DEX', 'Pair Address'
-                ])
-
-                for token in tokens:
-                    writer.writerow(token)
-
-            print(f"✓ 已导出 {len(tokens)} 条记录到 CSV")
-
-            # 导出为JSON
-            import json
             json_file = "/tmp/top_tokens_export.json"
-            print(f"\n导出为JSON: {json_file}")
 
             data = [
                 {
                     "symbol": t[0],
                     "name": t[1],
-                    "price_usd": float(t[2]) if t[2] else None,
-                    "liquidity_usd": float(t[3]) if t[3] else None,
-                    "volume_24h": float(t[4]) if t[4] else None,
-                    "market_cap": float(t[5]) if t[5] else None,
+                    "price_usd": t[2],
+                    "liquidity_usd": t[3],
+                    "volume_24h": t[4],
+                    "market_cap": t[5],
                     "dex": t[6],
                     "pair_address": t[7]
                 }
                 for t in tokens
             ]
 
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # CSV 和 JSON 在线程池中并行写入，不阻塞事件循环
+            print(f"\n导出为CSV: {csv_file}")
+            print(f"导出为JSON: {json_file}")
+            await asyncio.gather(
+                asyncio.to_thread(_write_csv, csv_file, tokens),
+                asyncio.to_thread(_write_json, json_file, data)
+            )
 
+            print(f"✓ 已导出 {len(tokens)} 条记录到 CSV")
             print(f"✓ 已导出 {len(tokens)} 条记录到 JSON")
 
             # 打印预览
@@ -489,7 +504,7 @@ async def main():
     print("  0. 运行所有示例")
     print("  q. 退出")
 
-    choice = input("\n请选择示例 (1-6, 0, q): ").strip()
+    choice = (await ainput("\n请选择示例 (1-6, 0, q): ")).strip()
 
     if choice == 'q':
         print("\n再见!")
@@ -501,15 +516,15 @@ async def main():
             try:
                 await func()
                 print("\n" + "-" * 80)
-            except Exception as e:
-                logger.exception(f"示例 {key} 失败")
+            except Exception:
+                logger.exception("示例 %s 失败", key)
     elif choice in examples:
         # 运行单个示例
         desc, func = examples[choice]
         try:
             await func()
-        except Exception as e:
-            logger.exception("示例失败")
+        except Exception:
+            logger.exception("示例 %s 失败", choice)
     else:
         print(f"\n✗ 无效选择: {choice}")
 
@@ -11,12 +11,23 @@ from pathlib import Path
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.services.dexscreener_service import DexScreenerService, quick_scrape_and_import
+from src.services.dexscreener_service import DexScreenerService, TokenView, quick_scrape_and_import
+from src.storage.db_manager import DatabaseManager
+from src.utils.helpers import ainput
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 爬取结果缓存有效期（秒），反复运行示例时复用最近的爬取结果
+SCRAPE_CACHE_TTL = 300
+
+# 示例2写出、示例4读入的代币数据文件（每行一个代币）
+EXAMPLE_TOKENS_FILE = "/tmp/example_tokens.ndjson"
 
 
 # ==================== 示例 1: 最简单的方式 ====================
 
-async def example1_quickstart():
+async def example1_quickstart(service: DexScreenerService):
     """示例1: 使用快捷函数一键完成所有操作"""
     print("\n" + "=" * 80)
     print("示例 1: 快捷函数 - 一键爬取并导入")
@@ -25,7 +36,8 @@ async def example1_quickstart():
     result = await quick_scrape_and_import(
         target_count=50,       # 爬取50个代币（演示用，减少时间）
         headless=True,         # 使用无头浏览器
-        deduplicate=True       # 自动去重
+        deduplicate=True,      # 自动去重
+        db_manager=service.db_manager  # 复用共享的数据库连接池
     )
 
     if result['success']:
@@ -41,59 +53,49 @@ async def example1_quickstart():
 
 # ==================== 示例 2: 分步操作 ====================
 
-async def example2_step_by_step():
+async def example2_step_by_step(service: DexScreenerService):
     """示例2: 分步执行 - 更灵活的控制"""
     print("\n" + "=" * 80)
     print("示例 2: 分步操作 - 爬取、导入、去重")
     print("=" * 80)
 
-    service = DexScreenerService()
-
-    try:
-        # 步骤1: 爬取数据
-        print("\n[1/3] 爬取页面数据...")
-        tokens = service.scrape_and_fetch(
+    # 步骤1+2: 边爬取边导入（同时写入 NDJSON 文件）
+    print("\n[1/2] 爬取并导入到数据库...")
+    stats = await service.import_tokens(
+        service.iter_scrape(
             target_count=50,
-            output_file="/tmp/example_tokens.json",
+            output_file=EXAMPLE_TOKENS_FILE,
             headless=True
-        )
-        print(f"✓ 爬取到 {len(tokens)} 个代币的完整数据")
-
-        # 步骤2: 导入数据库
-        print("\n[2/3] 导入到数据库...")
-        stats = await service.import_tokens(tokens, update_existing=True)
-        print(f"✓ 插入: {stats['inserted']}, 更新: {stats['updated']}, 错误: {stats['errors']}")
-
-        # 步骤3: 去重
-        print("\n[3/3] 执行去重...")
-        # 先预览
-        preview = await service.deduplicate_tokens(dry_run=True)
-        print(f"  发现 {preview['duplicate_tokens_count']} 个有重复的代币")
-        print(f"  将删除 {preview['pairs_to_delete']} 条重复记录")
-
-        # 执行删除
-        if preview['pairs_to_delete'] > 0:
-            result = await service.deduplicate_tokens(dry_run=False)
-            print(f"✓ 已删除 {result['pairs_to_delete']} 条重复记录")
-
-        # 查看最终结果
-        final_count = await service.get_token_count()
-        print(f"\n✓ 完成！数据库中有 {final_count} 个代币")
+        ),
+        update_existing=True
+    )
+    print(f"✓ 插入: {stats['inserted']}, 更新: {stats['updated']}, 错误: {stats['errors']}")
 
-    finally:
-        await service.close()
+    # 步骤2: 去重
+    print("\n[2/2] 执行去重...")
+    # 先预览
+    preview = await service.deduplicate_tokens(dry_run=True)
+    print(f"  发现 {preview['duplicate_tokens_count']} 个有重复的代币")
+    print(f"  将删除 {preview['pairs_to_delete']} 条重复记录")
+
+    # 执行删除
+    if preview['pairs_to_delete'] > 0:
+        result = await service.deduplicate_tokens(dry_run=False)
+        print(f"✓ 已删除 {result['pairs_to_delete']} 条重复记录")
+
+    # 查看最终结果
+    final_count = await service.get_token_count()
+    print(f"\n✓ 完成！数据库中有 {final_count} 个代币")
 
 
 # ==================== 示例 3: 只爬取数据 ====================
 
-def example3_scrape_only():
+async def example3_scrape_only(service: DexScreenerService):
     """示例3: 只爬取数据，不导入数据库"""
     print("\n" + "=" * 80)
     print("示例 3: 只爬取数据（不导入数据库）")
     print("=" * 80)
 
-    service = DexScreenerService()
-
     # 只获取交易对地址
     print("\n获取交易对地址...")
     pairs = service.scrape_bsc_page(
@@ -107,10 +109,10 @@ def example3_scrape_only():
         print(f"  {i}. {pair['pair_address']}")
     print(f"  ... 还有 {len(pairs) - 5} 个")
 
-    # 获取详细信息
+    # 获取详细信息（批量并发请求）
     print("\n获取详细信息...")
     pair_addresses = [p['pair_address'] for p in pairs[:10]]  # 只取前10个
-    details = service.fetch_pair_details(pair_addresses)
+    details = await service.fetch_pair_details_async(pair_addresses)
 
     print(f"\n获取到 {len(details)} 个代币的详细信息:")
     for token in details[:5]:
@@ -122,182 +124,153 @@ def example3_scrape_only():
 
 # ==================== 示例 4: 只导入数据 ====================
 
-async def example4_import_only():
+async def example4_import_only(service: DexScreenerService):
     """示例4: 从现有JSON文件导入数据"""
     print("\n" + "=" * 80)
     print("示例 4: 从JSON文件导入数据")
     print("=" * 80)
 
     # 检查文件是否存在
-    json_file = "/tmp/example_tokens.json"
+    json_file = EXAMPLE_TOKENS_FILE
     if not Path(json_file).exists():
         print(f"\n✗ 文件不存在: {json_file}")
         print("  请先运行示例2生成JSON文件")
         return
 
-    service = DexScreenerService()
-
-    try:
-        print(f"\n从文件导入: {json_file}")
-        stats = await service.import_from_json(
-            json_file,
-            update_existing=True
-        )
-
-        print(f"\n✓ 导入完成!")
-        print(f"  - 插入: {stats['inserted']} 条新记录")
-        print(f"  - 更新: {stats['updated']} 条现有记录")
-        print(f"  - 错误: {stats['errors']} 条")
+    print(f"\n从文件导入: {json_file}")
+    stats = await service.import_from_json(
+        json_file,
+        update_existing=True
+    )
 
-        # 查看总数
-        total = await service.get_token_count()
-        print(f"  - 数据库总计: {total} 个代币")
+    print(f"\n✓ 导入完成!")
+    print(f"  - 插入: {stats['inserted']} 条新记录")
+    print(f"  - 更新: {stats['updated']} 条现有记录")
+    print(f"  - 错误: {stats['errors']} 条")
 
-    finally:
-        await service.close()
+    # 查看总数
+    total = await service.get_token_count()
+    print(f"  - 数据库总计: {total} 个代币")
 
 
 # ==================== 示例 5: 只去重 ====================
 
-async def example5_deduplicate_only():
+async def example5_deduplicate_only(service: DexScreenerService):
     """示例5: 只执行去重操作"""
     print("\n" + "=" * 80)
     print("示例 5: 去重现有数据")
     print("=" * 80)
 
-    service = DexScreenerService()
-
-    try:
-        # 查看当前状态
-        count_before = await service.get_token_count()
-        print(f"\n当前数据库有 {count_before} 条记录")
-
-        # 分析重复情况
-        print("\n分析重复代币...")
-        result = await service.deduplicate_tokens(dry_run=True)
-
-        print(f"  - 有重复的代币: {result['duplicate_tokens_count']} 个")
-        print(f"  - 将删除的交易对: {result['pairs_to_delete']} 个")
-
-        # 显示详细信息
-        if result['duplicate_info']:
-            print("\n重复代币详情:")
-            for info in result['duplicate_info'][:3]:  # 只显示前3个
-                print(f"\n  代币: {info['token_symbol']} ({info['token_name']})")
-                print(f"    共有 {info['total_pairs']} 个交易对")
-                print(f"    保留: {info['keep']['pair_address'][:20]}... "
-                      f"(流动性: ${info['keep']['liquidity_usd']:,.2f})")
-                print(f"    删除:")
-                for del_pair in info['delete']:
-                    print(f"      - {del_pair['pair_address'][:20]}... "
-                          f"(流动性: ${del_pair['liquidity_usd']:,.2f})")
-
-        # 执行去重
-        if result['pairs_to_delete'] > 0:
-            confirm = input("\n是否执行去重? (yes/no): ")
-            if confirm.lower() == 'yes':
-                final_result = await service.deduplicate_tokens(dry_run=False)
-                print(f"\n✓ 去重完成!")
-                print(f"  - 删除: {final_result['pairs_to_delete']} 条重复记录")
-                print(f"  - 剩余: {final_result['remaining_records']} 条记录")
-            else:
-                print("\n取消操作")
+    # 查看当前状态
+    count_before = await service.get_token_count()
+    print(f"\n当前数据库有 {count_before} 条记录")
+
+    # 分析重复情况
+    print("\n分析重复代币...")
+    result = await service.deduplicate_tokens(dry_run=True)
+
+    print(f"  - 有重复的代币: {result['duplicate_tokens_count']} 个")
+    print(f"  - 将删除的交易对: {result['pairs_to_delete']} 个")
+
+    # 显示详细信息
+    if result['duplicate_info']:
+        print("\n重复代币详情:")
+        for info in result['duplicate_info'][:3]:  # 只显示前3个
+            print(f"\n  代币: {info['token_symbol']} ({info['token_name']})")
+            print(f"    共有 {info['total_pairs']} 个交易对")
+            print(f"    保留: {info['keep']['pair_address'][:20]}... "
+                  f"(流动性: ${info['keep']['liquidity_usd']:,.2f})")
+            print(f"    删除:")
+            for del_pair in info['delete']:
+                print(f"      - {del_pair['pair_address'][:20]}... "
+                      f"(流动性: ${del_pair['liquidity_usd']:,.2f})")
+
+    # 执行去重
+    if result['pairs_to_delete'] > 0:
+        confirm = await ainput("\n是否执行去重? (yes/no): ")
+        if confirm.lower() == 'yes':
+            final_result = await service.deduplicate_tokens(dry_run=False)
+            print(f"\n✓ 去重完成!")
+            print(f"  - 删除: {final_result['pairs_to_delete']} 条重复记录")
+            print(f"  - 剩余: {final_result['remaining_records']} 条记录")
         else:
-            print("\n✓ 没有重复数据，无需去重")
-
-    finally:
-        await service.close()
+            print("\n取消操作")
+    else:
+        print("\n✓ 没有重复数据，无需去重")
 
 
 # ==================== 示例 6: 数据过滤 ====================
 
-async def example6_filter_data():
+async def example6_filter_data(service: DexScreenerService):
     """示例6: 爬取时过滤数据"""
     print("\n" + "=" * 80)
     print("示例 6: 爬取并过滤高质量代币")
     print("=" * 80)
 
-    service = DexScreenerService()
+    # 爬取数据
+    print("\n爬取数据...")
+    tokens = service.scrape_and_fetch(
+        target_count=50,
+        headless=True
+    )
+    print(f"✓ 爬取到 {len(tokens)} 个代币")
 
-    try:
-        # 爬取数据
-        print("\n爬取数据...")
-        tokens = service.scrape_and_fetch(
-            target_count=50,
-            headless=True
-        )
-        print(f"✓ 爬取到 {len(tokens)} 个代币")
-
-        # 过滤条件
-        print("\n应用过滤条件:")
-        print("  - 流动性 > $10,000")
-        print("  - 24小时交易量 > $5,000")
-        print("  - 有价格数据")
-
-        filtered_tokens = []
-        for token in tokens:
-            liquidity = token.get('liquidity', {}).get('usd', 0) or 0
-            volume_24h = token.get('volume', {}).get('h24', 0) or 0
-            price_usd = token.get('priceUsd')
-
-            if liquidity > 10000 and volume_24h > 5000 and price_usd:
-                filtered_tokens.append(token)
-
-        print(f"\n✓ 过滤后剩余 {len(filtered_tokens)} 个高质量代币")
-
-        # 导入过滤后的数据
-        if filtered_tokens:
-            print("\n导入过滤后的数据...")
-            stats = await service.import_tokens(filtered_tokens)
-            print(f"✓ 插入: {stats['inserted']}, 更新: {stats['updated']}")
-
-            # 显示前几个
-            print("\n高质量代币示例:")
-            for token in filtered_tokens[:5]:
-                symbol = token.get('baseToken', {}).get('symbol', 'N/A')
-                price = float(token.get('priceUsd', 0))
-                liquidity = token.get('liquidity', {}).get('usd', 0)
-                volume = token.get('volume', {}).get('h24', 0)
-                print(f"  {symbol:>10}: ${price:>12.6f} | "
-                      f"流动性: ${liquidity:>12,.2f} | "
-                      f"交易量: ${volume:>12,.2f}")
+    # 过滤条件
+    print("\n应用过滤条件:")
+    print("  - 流动性 > $10,000")
+    print("  - 24小时交易量 > $5,000")
+    print("  - 有价格数据")
 
-    finally:
-        await service.close()
+    # 解析为视图后按属性过滤（代替逐层字典 .get）
+    views = [TokenView.from_raw(token) for token in tokens]
+    filtered = [
+        t for t in views
+        if t.liquidity_usd > 10000 and t.volume_h24 > 5000 and t.price_usd is not None
+    ]
+
+    print(f"\n✓ 过滤后剩余 {len(filtered)} 个高质量代币")
+
+    # 导入过滤后的数据
+    if filtered:
+        print("\n导入过滤后的数据...")
+        stats = await service.import_tokens([t.raw for t in filtered])
+        print(f"✓ 插入: {stats['inserted']}, 更新: {stats['updated']}")
+
+        # 显示前几个
+        print("\n高质量代币示例:")
+        for t in filtered[:5]:
+            print(f"  {t.symbol:>10}: ${t.price_usd:>12.6f} | "
+                  f"流动性: ${t.liquidity_usd:>12,.2f} | "
+                  f"交易量: ${t.volume_h24:>12,.2f}")
 
 
 # ==================== 示例 7: 增量更新 ====================
 
-async def example7_incremental_update():
+async def example7_incremental_update(service: DexScreenerService):
     """示例7: 增量更新现有数据"""
     print("\n" + "=" * 80)
     print("示例 7: 增量更新（刷新价格和交易量）")
     print("=" * 80)
 
-    service = DexScreenerService()
+    # 获取当前数据库中的代币数量
+    count_before = await service.get_token_count()
+    print(f"\n当前数据库有 {count_before} 个代币")
 
-    try:
-        # 获取当前数据库中的代币数量
-        count_before = await service.get_token_count()
-        print(f"\n当前数据库有 {count_before} 个代币")
-
-        # 爬取最新数据
-        print("\n爬取最新数据...")
-        result = await service.scrape_and_import(
-            target_count=50,
-            headless=True,
-            deduplicate=True,
-            save_json=False
-        )
-
-        if result['success']:
-            print(f"\n✓ 更新完成!")
-            print(f"  - 新增代币: {result['steps']['import']['inserted']}")
-            print(f"  - 更新代币: {result['steps']['import']['updated']}")
-            print(f"  - 总计: {result['final_count']} 个代币")
+    # 爬取最新数据（清空缓存，确保拿到最新价格）
+    print("\n爬取最新数据...")
+    service.refresh()
+    result = await service.scrape_and_import(
+        target_count=50,
+        headless=True,
+        deduplicate=True,
+        save_json=False
+    )
 
-    finally:
-        await service.close()
+    if result['success']:
+        print(f"\n✓ 更新完成!")
+        print(f"  - 新增代币: {result['steps']['import']['inserted']}")
+        print(f"  - 更新代币: {result['steps']['import']['updated']}")
+        print(f"  - 总计: {result['final_count']} 个代币")
 
 
 # ==================== 主函数 ====================
@@ -324,39 +297,40 @@ async def main():
     print("  0. 运行所有示例")
     print("  q. 退出")
 
-    choice = input("\n请选择示例 (1-7, 0, q): ").strip()
+    choice = (await ainput("\n请选择示例 (1-7, 0, q): ")).strip()
 
     if choice == 'q':
         print("\n再见!")
         return
 
-    if choice == '0':
-        # 运行所有示例
-        for key, (desc, func) in examples.items():
-            try:
-                if asyncio.iscoroutinefunction(func):
-                    await func()
-                else:
-                    func()
-                print("\n" + "-" * 80)
-            except Exception as e:
-                print(f"\n✗ 示例 {key} 失败: {e}")
-                import traceback
-                traceback.print_exc()
-    elif choice in examples:
-        # 运行单个示例
-        desc, func = examples[choice]
-        try:
-            if asyncio.iscoroutinefunction(func):
-                await func()
-            else:
-                func()
-        except Exception as e:
-            print(f"\n✗ 示例失败: {e}")
-            import traceback
-            traceback.print_exc()
-    else:
+    if choice != '0' and choice not in examples:
         print(f"\n✗ 无效选择: {choice}")
+        return
+
+    # 所有示例共用一个数据库连接池和服务实例
+    db_manager = DatabaseManager()
+    await db_manager.init_async_db()
+    service = DexScreenerService(db_manager, cache_ttl=SCRAPE_CACHE_TTL)
+
+    try:
+        if choice == '0':
+            # 运行所有示例
+            for key, (desc, func) in examples.items():
+                try:
+                    await func(service)
+                    print("\n" + "-" * 80)
+                except Exception:
+                    logger.exception("示例 %s 失败", key)
+        else:
+            # 运行单个示例
+            desc, func = examples[choice]
+            try:
+                await func(service)
+            except Exception:
+                logger.exception("示例 %s 失败", choice)
+    finally:
+        await service.close()
+        await db_manager.close()
 
     print("\n" + "=" * 80)
     print("示例运行完成！")
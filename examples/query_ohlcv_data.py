@@ -8,18 +8,135 @@ import asyncio
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from sqlalchemy import text
+import numpy as np
 import pandas as pd
 
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.storage.db_manager import DatabaseManager
+from src.utils.helpers import ainput
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'timeframe']
+OHLCV_DTYPES = {col: 'float64' for col in ['open', 'high', 'low', 'close', 'volume']}
+# 流式读取K线时每批的行数
+OHLCV_FETCH_SIZE = 1000
+
+# 查询语句在模块级构建一次，重复调用只绑定参数，SQLAlchemy 编译缓存
+# 和 asyncpg 预编译语句缓存都能命中
+# 同一符号可能对应多个代币：只选有K线数据的，并取最近更新的一个，保证结果确定
+_TOKEN_BY_SYMBOL_STMT = text("""
+    SELECT id, symbol, name FROM tokens
+    WHERE symbol = :value
+      AND EXISTS (SELECT 1 FROM token_ohlcv o WHERE o.token_id = tokens.id)
+    ORDER BY updated_at DESC
+    LIMIT 1
+""")
+_TOKEN_BY_ID_STMT = text("SELECT id, symbol, name FROM tokens WHERE id = :value LIMIT 1")
+
+# 内层取最近 limit 根，外层按时间升序返回，省去客户端排序
+_OHLCV_BY_TOKEN_STMT = text("""
+    SELECT * FROM (
+        SELECT timestamp, open, high, low, close, volume, timeframe
+        FROM token_ohlcv
+        WHERE token_id = :token_id
+        ORDER BY timestamp DESC
+        LIMIT :limit
+    ) recent
+    ORDER BY timestamp ASC
+""")
+
+_PRICE_STATS_STMT = text("""
+    WITH recent AS (
+        SELECT timestamp, high, low, close, timeframe
+        FROM token_ohlcv
+        WHERE token_id = :token_id
+        ORDER BY timestamp DESC
+        LIMIT :limit
+    )
+    SELECT
+        COUNT(*) as candle_count,
+        (array_agg(timeframe ORDER BY timestamp ASC))[1] as timeframe,
+        (array_agg(close ORDER BY timestamp ASC))[1] as first_price,
+        (array_agg(close ORDER BY timestamp DESC))[1] as last_price,
+        MAX(high) as max_price,
+        MIN(low) as min_price
+    FROM recent
+""")
+
+_VOLUME_STATS_STMT = text("""
+    WITH recent AS (
+        SELECT timestamp, volume
+        FROM token_ohlcv
+        WHERE token_id = :token_id
+        ORDER BY timestamp DESC
+        LIMIT :limit
+    ),
+    hourly AS (
+        SELECT
+            EXTRACT(HOUR FROM timestamp)::int as hour,
+            SUM(volume) as volume
+        FROM recent
+        GROUP BY 1
+    )
+    SELECT
+        COUNT(*) as candle_count,
+        SUM(volume) as total_volume,
+        AVG(volume) as avg_volume,
+        MAX(volume) as max_volume,
+        (array_agg(timestamp ORDER BY volume DESC, timestamp ASC))[1] as max_volume_time,
+        (SELECT array_agg(hour ORDER BY hour) FROM hourly) as hours,
+        (SELECT array_agg(volume ORDER BY hour) FROM hourly) as hourly_volumes
+    FROM recent
+""")
+
+# 代币元数据缓存: "symbol:<符号>" / "id:<代币ID>" -> {"id", "symbol", "name"}
+_token_cache: Dict[str, Dict[str, Any]] = {}
+
+
+async def _resolve_token(
+    db: DatabaseManager,
+    symbol: str = None,
+    token_id: str = None
+) -> Optional[Dict[str, Any]]:
+    """
+    解析代币ID、符号和名称（进程内缓存，K线查询无需每次 JOIN tokens 表）
+
+    Args:
+        db: 数据库管理器
+        symbol: 代币符号
+        token_id: 代币ID
+
+    Returns:
+        代币信息字典，不存在时返回 None（不缓存，便于新导入的代币被查到）
+    """
+    if token_id:
+        key, stmt, value = f"id:{token_id}", _TOKEN_BY_ID_STMT, token_id
+    elif symbol:
+        key, stmt, value = f"symbol:{symbol}", _TOKEN_BY_SYMBOL_STMT, symbol
+    else:
+        raise ValueError("Must provide either symbol or token_id")
+
+    token = _token_cache.get(key)
+    if token is None:
+        async with db.get_session() as session:
+            result = await session.execute(stmt, {"value": value})
+            row = result.mappings().first()
+
+        if row is None:
+            return None
+
+        token = dict(row)
+        _token_cache[key] = token
+        _token_cache[f"id:{token['id']}"] = token
+
+    return token
+
 
 async def get_token_ohlcv(
     db: DatabaseManager,
@@ -39,290 +156,300 @@ async def get_token_ohlcv(
     Returns:
         DataFrame with OHLCV data
     """
-    async with db.get_session() as session:
-        query = """
-            SELECT
-                o.timestamp,
-                o.open,
-                o.high,
-                o.low,
-                o.close,
-                o.volume,
-                o.timeframe,
-                t.symbol,
-                t.name
-            FROM token_ohlcv o
-            JOIN tokens t ON o.token_id = t.id
-            WHERE 1=1
-        """
-
-        params = {}
-
-        if token_id:
-            query += " AND t.id = :token_id"
-            params["token_id"] = token_id
-        elif symbol:
-            query += " AND t.symbol = :symbol"
-            params["symbol"] = symbol
-        else:
-            raise ValueError("Must provide either symbol or token_id")
+    token = await _resolve_token(db, symbol=symbol, token_id=token_id)
+    if token is None:
+        logger.warning(f"No OHLCV data found for {symbol or token_id}")
+        return pd.DataFrame()
 
-        query += " ORDER BY o.timestamp DESC LIMIT :limit"
-        params["limit"] = limit
-
-        result = await session.execute(text(query), params)
-        rows = result.fetchall()
-
-        if not rows:
-            logger.warning(f"No OHLCV data found for {symbol or token_id}")
-            return pd.DataFrame()
-
-        # 转换为DataFrame
-        df = pd.DataFrame(rows, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'timeframe', 'symbol', 'name'
-        ])
-
-        # 转换数据类型
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col])
+    async with db.get_session() as session:
+        # 服务端游标分批读取，每批直接转为带类型的DataFrame
+        # （timestamp 已是 datetime，数值列一次性转为 float64），不保留整批原始行
+        result = await session.stream(_OHLCV_BY_TOKEN_STMT, {"token_id": token["id"], "limit": limit})
+        frames = [
+            pd.DataFrame.from_records(partition, columns=OHLCV_COLUMNS).astype(OHLCV_DTYPES)
+            async for partition in result.partitions(OHLCV_FETCH_SIZE)
+        ]
 
-        # 按时间排序
-        df = df.sort_values('timestamp').reset_index(drop=True)
+    if not frames:
+        logger.warning(f"No OHLCV data found for {symbol or token_id}")
+        return pd.DataFrame()
 
-        return df
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    df['symbol'] = token['symbol']
+    df['name'] = token['name']
+    return df
 
 
 async def get_all_dexscreener_tokens(db: DatabaseManager) -> List[Dict[str, Any]]:
     """获取所有DexScreener代币列表"""
     async with db.get_session() as session:
+        # 先按 token_id 聚合K线（可走 idx_token_timeframe_timestamp 索引），
+        # 再与 tokens 内连接，只保留有K线的代币
         result = await session.execute(text("""
+            WITH agg AS (
+                SELECT
+                    token_id,
+                    COUNT(*) as candle_count,
+                    MIN(timestamp) as earliest,
+                    MAX(timestamp) as latest,
+                    array_agg(DISTINCT timeframe ORDER BY timeframe) as timeframes
+                FROM token_ohlcv
+                GROUP BY token_id
+            )
             SELECT
                 t.id,
                 t.symbol,
                 t.name,
-                COUNT(o.id) as candle_count,
-                MIN(o.timestamp) as earliest,
-                MAX(o.timestamp) as latest,
-                array_agg(DISTINCT o.timeframe ORDER BY o.timeframe) as timeframes
-            FROM tokens t
-            LEFT JOIN token_ohlcv o ON t.id = o.token_id
+                agg.candle_count,
+                agg.earliest,
+                agg.latest,
+                agg.timeframes
+            FROM agg
+            JOIN tokens t ON t.id = agg.token_id
             WHERE t.data_source = 'dexscreener'
-            GROUP BY t.id, t.symbol, t.name
-            HAVING COUNT(o.id) > 0
-            ORDER BY COUNT(o.id) DESC
+            ORDER BY agg.candle_count DESC
         """))
 
-        tokens = []
-        for row in result:
-            tokens.append({
-                'id': row[0],
-                'symbol': row[1],
-                'name': row[2],
-                'candle_count': row[3],
-                'earliest': row[4],
-                'latest': row[5],
-                'timeframes': row[6]
-            })
+        return [dict(row) for row in result.mappings().all()]
 
-        return tokens
 
+async def get_token_price_stats(
+    db: DatabaseManager,
+    symbol: str,
+    limit: int = 100
+) -> Dict[str, Any]:
+    """
+    在数据库端计算最近 limit 根K线的价格变化统计
+
+    只返回一行聚合结果，不再把原始K线拉到客户端用 pandas 计算
 
-async def calculate_price_change(df: pd.DataFrame) -> Dict[str, float]:
-    """计算价格变化统计"""
-    if len(df) == 0:
+    Args:
+        db: 数据库管理器
+        symbol: 代币符号
+        limit: 参与统计的K线数量
+
+    Returns:
+        价格统计字典，无数据时返回空字典
+    """
+    token = await _resolve_token(db, symbol=symbol)
+    if token is None:
         return {}
 
-    first_price = df.iloc[0]['close']
-    last_price = df.iloc[-1]['close']
-    max_price = df['high'].max()
-    min_price = df['low'].min()
+    async with db.get_session() as session:
+        result = await session.execute(_PRICE_STATS_STMT, {"token_id": token["id"], "limit": limit})
+        row = result.mappings().one()
+
+    if row['candle_count'] == 0:
+        return {}
+
+    first_price = float(row['first_price'])
+    last_price = float(row['last_price'])
+    max_price = float(row['max_price'])
+    min_price = float(row['min_price'])
 
     price_change = last_price - first_price
     price_change_pct = (price_change / first_price * 100) if first_price > 0 else 0
 
     return {
-        'first_price': float(first_price),
-        'last_price': float(last_price),
-        'max_price': float(max_price),
-        'min_price': float(min_price),
-        'price_change': float(price_change),
-        'price_change_pct': float(price_change_pct),
-        'volatility': float((max_price - min_price) / first_price * 100) if first_price > 0 else 0
+        'candle_count': row['candle_count'],
+        'timeframe': row['timeframe'],
+        'first_price': first_price,
+        'last_price': last_price,
+        'max_price': max_price,
+        'min_price': min_price,
+        'price_change': price_change,
+        'price_change_pct': price_change_pct,
+        'volatility': (max_price - min_price) / first_price * 100 if first_price > 0 else 0
+    }
+
+
+async def get_token_volume_stats(
+    db: DatabaseManager,
+    symbol: str,
+    limit: int = 100
+) -> Dict[str, Any]:
+    """
+    在数据库端计算最近 limit 根K线的交易量统计及按小时（0-23）的交易量分布
+
+    Args:
+        db: 数据库管理器
+        symbol: 代币符号
+        limit: 参与统计的K线数量
+
+    Returns:
+        交易量统计字典，无数据时返回空字典
+    """
+    token = await _resolve_token(db, symbol=symbol)
+    if token is None:
+        return {}
+
+    async with db.get_session() as session:
+        result = await session.execute(_VOLUME_STATS_STMT, {"token_id": token["id"], "limit": limit})
+        row = result.mappings().one()
+
+    if row['candle_count'] == 0:
+        return {}
+
+    return {
+        'candle_count': row['candle_count'],
+        'total_volume': float(row['total_volume']),
+        'avg_volume': float(row['avg_volume']),
+        'max_volume': float(row['max_volume']),
+        'max_volume_time': row['max_volume_time'],
+        'hours': list(row['hours']),
+        'hourly_volumes': [float(v) for v in row['hourly_volumes']],
     }
 
 
-async def example1_list_tokens():
+def fmt_ohlcv_tail(df: pd.DataFrame, n: int = 5) -> str:
+    """格式化最后 n 根K线为对齐的文本表格"""
+    lines = [
+        f"{'timestamp':<25} {'open':>12} {'high':>12} {'low':>12} {'close':>12} {'volume':>16}"
+    ]
+    for row in df.tail(n).itertuples(index=False):
+        lines.append(
+            f"{str(row.timestamp):<25} {row.open:>12.8f} {row.high:>12.8f} "
+            f"{row.low:>12.8f} {row.close:>12.8f} {row.volume:>16,.2f}"
+        )
+    return "\n".join(lines)
+
+
+async def example1_list_tokens(db: DatabaseManager):
     """示例1: 列出所有有K线数据的DexScreener代币"""
     print("\n" + "=" * 80)
     print("示例 1: 列出所有DexScreener代币及其K线数据")
     print("=" * 80)
 
-    db = DatabaseManager()
-    await db.init_async_db()
+    tokens = await get_all_dexscreener_tokens(db)
 
-    try:
-        tokens = await get_all_dexscreener_tokens(db)
+    print(f"\n找到 {len(tokens)} 个有K线数据的代币:\n")
 
-        print(f"\n找到 {len(tokens)} 个有K线数据的代币:\n")
+    for i, token in enumerate(tokens[:10], 1):  # 只显示前10个
+        print(f"{i}. {token['symbol']:>10} - {token['name']}")
+        print(f"   K线数量: {token['candle_count']}")
+        print(f"   时间周期: {', '.join(token['timeframes'])}")
+        print(f"   时间范围: {token['earliest']} 至 {token['latest']}")
+        print()
 
-        for i, token in enumerate(tokens[:10], 1):  # 只显示前10个
-            print(f"{i}. {token['symbol']:>10} - {token['name']}")
-            print(f"   K线数量: {token['candle_count']}")
-            print(f"   时间周期: {', '.join(token['timeframes'])}")
-            print(f"   时间范围: {token['earliest']} 至 {token['latest']}")
-            print()
-
-        if len(tokens) > 10:
-            print(f"... 还有 {len(tokens) - 10} 个代币\n")
+    if len(tokens) > 10:
+        print(f"... 还有 {len(tokens) - 10} 个代币\n")
 
-    finally:
-        await db.close()
 
-
-async def example2_query_ohlcv():
+async def example2_query_ohlcv(db: DatabaseManager):
     """示例2: 查询特定代币的K线数据"""
     print("\n" + "=" * 80)
     print("示例 2: 查询代币K线数据")
     print("=" * 80)
 
-    db = DatabaseManager()
-    await db.init_async_db()
+    # 查询COAI代币的K线
+    symbol = "COAI"
+    print(f"\n查询 {symbol} 的K线数据...\n")
 
-    try:
-        # 查询COAI代币的K线
-        symbol = "COAI"
-        print(f"\n查询 {symbol} 的K线数据...\n")
-
-        df = await get_token_ohlcv(db, symbol=symbol, limit=100)
-
-        if len(df) > 0:
-            print(f"获取到 {len(df)} 根K线")
-            print(f"时间周期: {df['timeframe'].iloc[0]}")
-            print(f"时间范围: {df['timestamp'].min()} 至 {df['timestamp'].max()}")
-            print(f"\n最近5根K线:")
-            print(df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].tail(5).to_string(index=False))
-        else:
-            print(f"未找到 {symbol} 的K线数据")
+    df = await get_token_ohlcv(db, symbol=symbol, limit=100)
 
-    finally:
-        await db.close()
+    if len(df) > 0:
+        print(f"获取到 {len(df)} 根K线")
+        print(f"时间周期: {df['timeframe'].iloc[0]}")
+        print(f"时间范围: {df['timestamp'].min()} 至 {df['timestamp'].max()}")
+        print(f"\n最近5根K线:")
+        print(fmt_ohlcv_tail(df, n=5))
+    else:
+        print(f"未找到 {symbol} 的K线数据")
 
 
-async def example3_price_analysis():
+async def example3_price_analysis(db: DatabaseManager):
     """示例3: 价格分析"""
     print("\n" + "=" * 80)
     print("示例 3: 价格变化分析")
     print("=" * 80)
 
-    db = DatabaseManager()
-    await db.init_async_db()
-
-    try:
-        # 分析多个代币
-        symbols = ["COAI", "修仙", "GIGGLE"]
-
-        for symbol in symbols:
-            print(f"\n分析 {symbol}:")
-
-            df = await get_token_ohlcv(db, symbol=symbol, limit=200)
-
-            if len(df) > 0:
-                stats = await calculate_price_change(df)
-
-                print(f"  K线数量: {len(df)}")
-                print(f"  时间周期: {df['timeframe'].iloc[0]}")
-                print(f"  起始价格: ${stats['first_price']:.8f}")
-                print(f"  最新价格: ${stats['last_price']:.8f}")
-                print(f"  价格变化: {stats['price_change_pct']:+.2f}%")
-                print(f"  最高价格: ${stats['max_price']:.8f}")
-                print(f"  最低价格: ${stats['min_price']:.8f}")
-                print(f"  波动率: {stats['volatility']:.2f}%")
-            else:
-                print(f"  未找到数据")
-
-    finally:
-        await db.close()
+    # 分析多个代币
+    symbols = ["COAI", "修仙", "GIGGLE"]
+
+    # 并发查询（每个查询使用连接池中独立的连接），聚合在数据库端完成
+    all_stats = await asyncio.gather(
+        *(get_token_price_stats(db, symbol=symbol, limit=200) for symbol in symbols)
+    )
+
+    for symbol, stats in zip(symbols, all_stats):
+        print(f"\n分析 {symbol}:")
+
+        if stats:
+            print(f"  K线数量: {stats['candle_count']}")
+            print(f"  时间周期: {stats['timeframe']}")
+            print(f"  起始价格: ${stats['first_price']:.8f}")
+            print(f"  最新价格: ${stats['last_price']:.8f}")
+            print(f"  价格变化: {stats['price_change_pct']:+.2f}%")
+            print(f"  最高价格: ${stats['max_price']:.8f}")
+            print(f"  最低价格: ${stats['min_price']:.8f}")
+            print(f"  波动率: {stats['volatility']:.2f}%")
+        else:
+            print(f"  未找到数据")
 
 
-async def example4_volume_analysis():
+async def example4_volume_analysis(db: DatabaseManager):
     """示例4: 交易量分析"""
     print("\n" + "=" * 80)
     print("示例 4: 交易量分析")
     print("=" * 80)
 
-    db = DatabaseManager()
-    await db.init_async_db()
+    symbol = "COAI"
+    print(f"\n分析 {symbol} 的交易量:\n")
 
-    try:
-        symbol = "COAI"
-        print(f"\n分析 {symbol} 的交易量:\n")
+    stats = await get_token_volume_stats(db, symbol=symbol, limit=100)
 
-        df = await get_token_ohlcv(db, symbol=symbol, limit=100)
+    if stats:
+        print(f"总交易量: {stats['total_volume']:,.2f}")
+        print(f"平均交易量: {stats['avg_volume']:,.2f}")
+        print(f"最大交易量: {stats['max_volume']:,.2f}")
+        print(f"最大交易量时间: {stats['max_volume_time']}")
 
-        if len(df) > 0:
-            total_volume = df['volume'].sum()
-            avg_volume = df['volume'].mean()
-            max_volume = df['volume'].max()
-            max_volume_time = df.loc[df['volume'].idxmax(), 'timestamp']
+        # 按小时统计（如果数据足够）
+        if stats['candle_count'] > 24:
+            # 小时取值固定为 0-23，直接铺成 24 格数组，用 argpartition 取前3而不做全排序
+            hours = np.asarray(stats['hours'], dtype=np.intp)
+            hourly_volume = np.bincount(hours, weights=stats['hourly_volumes'], minlength=24)
+            has_data = np.bincount(hours, minlength=24) > 0
 
-            print(f"总交易量: {total_volume:,.2f}")
-            print(f"平均交易量: {avg_volume:,.2f}")
-            print(f"最大交易量: {max_volume:,.2f}")
-            print(f"最大交易量时间: {max_volume_time}")
+            top3 = np.argpartition(hourly_volume, -3)[-3:]
+            top3 = top3[np.argsort(hourly_volume[top3])[::-1]]
 
-            # 按小时统计（如果数据足够）
-            if len(df) > 24:
-                df['hour'] = df['timestamp'].dt.hour
-                hourly_volume = df.groupby('hour')['volume'].sum().sort_values(ascending=False)
+            print(f"\n交易量最大的3个小时:")
+            for hour in top3[has_data[top3]]:
+                print(f"  {hour:02d}:00 - {hourly_volume[hour]:,.2f}")
 
-                print(f"\n交易量最大的3个小时:")
-                for hour, vol in hourly_volume.head(3).items():
-                    print(f"  {hour:02d}:00 - {vol:,.2f}")
 
-    finally:
-        await db.close()
-
-
-async def example5_recent_tokens():
+async def example5_recent_tokens(db: DatabaseManager):
     """示例5: 查看最近的代币"""
     print("\n" + "=" * 80)
     print("示例 5: 最近活跃的代币")
     print("=" * 80)
 
-    db = DatabaseManager()
-    await db.init_async_db()
-
-    try:
-        async with db.get_session() as session:
-            # 查询最近有交易的代币
-            result = await session.execute(text("""
-                SELECT
-                    t.symbol,
-                    t.name,
-                    MAX(o.timestamp) as last_candle,
-                    COUNT(*) as candle_count,
-                    o.timeframe
-                FROM token_ohlcv o
-                JOIN tokens t ON o.token_id = t.id
-                WHERE t.data_source = 'dexscreener'
-                GROUP BY t.symbol, t.name, o.timeframe
-                ORDER BY MAX(o.timestamp) DESC
-                LIMIT 10
-            """))
-
-            print("\n最近更新的10个代币:\n")
-            for i, row in enumerate(result, 1):
-                symbol, name, last_candle, count, timeframe = row
-                print(f"{i}. {symbol:>10} ({name})")
-                print(f"   最新K线: {last_candle}")
-                print(f"   时间周期: {timeframe}")
-                print(f"   K线数量: {count}")
-                print()
+    async with db.get_session() as session:
+        # 查询最近有交易的代币
+        result = await session.execute(text("""
+            SELECT
+                t.symbol,
+                t.name,
+                MAX(o.timestamp) as last_candle,
+                COUNT(*) as candle_count,
+                o.timeframe
+            FROM token_ohlcv o
+            JOIN tokens t ON o.token_id = t.id
+            WHERE t.data_source = 'dexscreener'
+            GROUP BY t.symbol, t.name, o.timeframe
+            ORDER BY MAX(o.timestamp) DESC
+            LIMIT 10
+        """))
 
-    finally:
-        await db.close()
+        print("\n最近更新的10个代币:\n")
+        for i, row in enumerate(result, 1):
+            symbol, name, last_candle, count, timeframe = row
+            print(f"{i}. {symbol:>10} ({name})")
+            print(f"   最新K线: {last_candle}")
+            print(f"   时间周期: {timeframe}")
+            print(f"   K线数量: {count}")
+            print()
 
 
 async def main():
@@ -345,33 +472,38 @@ async def main():
     print("  0. 运行所有示例")
     print("  q. 退出")
 
-    choice = input("\n请选择示例 (1-5, 0, q): ").strip()
+    choice = (await ainput("\n请选择示例 (1-5, 0, q): ")).strip()
 
     if choice == 'q':
         print("\n再见!")
         return
 
-    if choice == '0':
-        # 运行所有示例
-        for key, (desc, func) in examples.items():
-            try:
-                await func()
-                print("\n" + "-" * 80)
-            except Exception as e:
-                print(f"\n✗ 示例 {key} 失败: {e}")
-                import traceback
-                traceback.print_exc()
-    elif choice in examples:
-        # 运行单个示例
-        desc, func = examples[choice]
-        try:
-            await func()
-        except Exception as e:
-            print(f"\n✗ 示例失败: {e}")
-            import traceback
-            traceback.print_exc()
-    else:
+    if choice != '0' and choice not in examples:
         print(f"\n✗ 无效选择: {choice}")
+        return
+
+    # 所有示例共用一个数据库连接池
+    db = DatabaseManager()
+    await db.init_async_db()
+
+    try:
+        if choice == '0':
+            # 运行所有示例
+            for key, (desc, func) in examples.items():
+                try:
+                    await func(db)
+                    print("\n" + "-" * 80)
+                except Exception:
+                    logger.exception("示例 %s 失败", key)
+        else:
+            # 运行单个示例
+            desc, func = examples[choice]
+            try:
+                await func(db)
+            except Exception:
+                logger.exception("示例 %s 失败", choice)
+    finally:
+        await db.close()
 
 
 if __name__ == "__main__":
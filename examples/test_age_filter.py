@@ -7,14 +7,123 @@
 import asyncio
 import sys
 import json
+import time
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import List, Dict, Any, Tuple, Iterator
+
+import numpy as np
+
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    _json_loads = orjson.loads
+except ImportError:  # 未安装 orjson 时退回标准库
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+    _json_loads = json.loads
+
+try:
+    import ijson
+except ImportError:  # 未安装 ijson 时整体读入后再遍历
+    ijson = None
 
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.services.dexscreener_service import DexScreenerService, quick_scrape_and_import
 
+# 一天的毫秒数（pairCreatedAt 为毫秒时间戳）
+DAY_MS = 86_400_000
+
+# 年龄分布的区间边界（天）与对应标签
+AGE_BUCKET_EDGES = np.array([1, 7, 14, 30], dtype=np.int64)
+AGE_BUCKET_LABELS = ["1天内", "1-7天", "7-14天", "14-30天", "30天以上"]
+
+
+def _now_ms() -> int:
+    """当前时间的毫秒时间戳（直接取整数，不构造 datetime 对象）"""
+    return int(time.time() * 1000)
+
+
+def _created_at_ms(tokens: List[Dict[str, Any]]) -> np.ndarray:
+    """提取代币创建时间（毫秒时间戳）数组，缺失记为 0"""
+    return np.fromiter(
+        (t.get('pairCreatedAt') or 0 for t in tokens),
+        dtype=np.int64,
+        count=len(tokens)
+    )
+
+
+def _token_symbol(token: Dict[str, Any]) -> str:
+    """代币符号（绝大多数代币都有 baseToken.symbol，直接取值）"""
+    try:
+        return token['baseToken']['symbol']
+    except (KeyError, TypeError):
+        return 'N/A'
+
+
+def _token_ages(
+    tokens: List[Dict[str, Any]],
+    now_ms: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    一次性计算代币的创建时间与年龄，供多个测试共享
+
+    Returns:
+        (创建时间毫秒数组, 是否有创建时间的掩码, 年龄天数数组)
+    """
+    created_ms = _created_at_ms(tokens)
+    has_created = created_ms > 0
+    age_days = (now_ms - created_ms) // DAY_MS
+    return created_ms, has_created, age_days
+
+
+def _read_json(path: str) -> Any:
+    """以字节方式读取并解析JSON文件"""
+    with open(path, 'rb') as f:
+        return _json_loads(f.read())
+
+
+def _iter_json_array(path: str) -> Iterator[Dict[str, Any]]:
+    """逐个读取JSON数组文件中的元素（安装了 ijson 时流式解析，不会一次性载入整个文件）"""
+    if ijson is None:
+        yield from _read_json(path)
+        return
+
+    with open(path, 'rb') as f:
+        yield from ijson.items(f, 'item', use_float=True)
+
+
+def _filter_json_by_age(path: str, max_age_days: int) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    流式读取JSON文件并按年龄过滤（规则与 filter_tokens_by_age 一致，没有创建时间的代币保留）
+
+    Returns:
+        (原始代币数量, 过滤后的代币列表)
+    """
+    cutoff_ms = _now_ms() - max_age_days * DAY_MS
+    total = 0
+    kept = []
+
+    for token in _iter_json_array(path):
+        total += 1
+        pair_created_at = token.get('pairCreatedAt')
+        if pair_created_at is None or pair_created_at >= cutoff_ms:
+            kept.append(token)
+
+    return total, kept
+
+
+def _write_json(path: str, data: Any) -> None:
+    """将数据序列化为缩进JSON写入文件"""
+    with open(path, 'wb') as f:
+        f.write(_json_dumps(data))
+
 
 async def test_age_filter():
     """测试年龄过滤功能"""
@@ -39,38 +148,37 @@ async def test_age_filter():
         filtered_30days = DexScreenerService.filter_tokens_by_age(all_tokens, max_age_days=30)
         print(f"✓ 30天过滤后: {len(filtered_30days)} 个代币")
 
+        # 一次性计算所有代币的年龄（天），后续测试只做数组比较
+        now_ms = _now_ms()
+        created_ms, has_created, age_days = _token_ages(all_tokens, now_ms)
+
         # 3. 测试不同的天数
         print("\n[测试 3] 测试不同的过滤天数...")
-        for days in [7, 14, 30, 60, 90]:
-            filtered = DexScreenerService.filter_tokens_by_age(all_tokens, max_age_days=days)
-            percentage = len(filtered) / len(all_tokens) * 100 if all_tokens else 0
-            print(f"  {days:>3} 天内: {len(filtered):>3} 个代币 ({percentage:>5.1f}%)")
+        # 排序一次后用 searchsorted 一次算出所有阈值下保留的数量（无创建时间的代币也保留）
+        sorted_created = np.sort(created_ms[has_created])
+        days_list = np.array([7, 14, 30, 60, 90], dtype=np.int64)
+        cutoffs = now_ms - days_list * DAY_MS
+        kept_counts = (
+            np.count_nonzero(~has_created)
+            + len(sorted_created)
+            - np.searchsorted(sorted_created, cutoffs, side='left')
+        )
+        for days, count in zip(days_list.tolist(), kept_counts.tolist()):
+            percentage = count / len(all_tokens) * 100 if all_tokens else 0
+            print(f"  {days:>3} 天内: {count:>3} 个代币 ({percentage:>5.1f}%)")
 
         # 4. 显示被过滤的代币详情
         print("\n[测试 4] 查看被过滤的代币（30天）...")
-        cutoff_time = datetime.now() - timedelta(days=30)
-        filtered_out = []
-
-        for token in all_tokens:
-            pair_created_at = token.get('pairCreatedAt')
-            if pair_created_at:
-                created_time = datetime.fromtimestamp(pair_created_at / 1000)
-                age_days = (datetime.now() - created_time).days
-
-                if age_days > 30:
-                    symbol = token.get('baseToken', {}).get('symbol', 'N/A')
-                    filtered_out.append({
-                        'symbol': symbol,
-                        'created': created_time.strftime('%Y-%m-%d'),
-                        'age_days': age_days
-                    })
-
-        if filtered_out:
+        filtered_out = np.flatnonzero(has_created & (age_days > 30))
+
+        if len(filtered_out):
             print(f"\n被过滤掉的代币（共 {len(filtered_out)} 个）:")
             print(f"{'代币':>10} | {'创建日期':>12} | {'年龄（天）':>10}")
             print("-" * 40)
-            for item in filtered_out[:10]:  # 只显示前10个
-                print(f"{item['symbol']:>10} | {item['created']:>12} | {item['age_days']:>10}")
+            for i in filtered_out[:10]:  # 只显示前10个
+                symbol = _token_symbol(all_tokens[i])
+                created = datetime.fromtimestamp(created_ms[i] / 1000).strftime('%Y-%m-%d')
+                print(f"{symbol:>10} | {created:>12} | {age_days[i]:>10}")
             if len(filtered_out) > 10:
                 print(f"... 还有 {len(filtered_out) - 10} 个")
         else:
@@ -78,36 +186,27 @@ async def test_age_filter():
 
         # 5. 显示保留的代币详情
         print("\n[测试 5] 查看保留的代币（30天内）...")
-        kept_tokens = []
-
-        for token in all_tokens:
-            pair_created_at = token.get('pairCreatedAt')
-            if pair_created_at:
-                created_time = datetime.fromtimestamp(pair_created_at / 1000)
-                age_days = (datetime.now() - created_time).days
-
-                if age_days <= 30:
-                    symbol = token.get('baseToken', {}).get('symbol', 'N/A')
-                    liquidity = token.get('liquidity', {}).get('usd', 0) or 0
-                    kept_tokens.append({
-                        'symbol': symbol,
-                        'created': created_time.strftime('%Y-%m-%d'),
-                        'age_days': age_days,
-                        'liquidity': liquidity
-                    })
-
-        if kept_tokens:
+        kept = np.flatnonzero(has_created & (age_days <= 30))
+
+        if len(kept):
             # 按流动性排序
-            kept_tokens.sort(key=lambda x: x['liquidity'], reverse=True)
+            liquidity = np.array(
+                [all_tokens[i].get('liquidity', {}).get('usd', 0) or 0 for i in kept],
+                dtype=np.float64
+            )
+            order = np.argsort(-liquidity, kind='stable')
 
-            print(f"\n保留的代币（共 {len(kept_tokens)} 个，按流动性排序）:")
+            print(f"\n保留的代币（共 {len(kept)} 个，按流动性排序）:")
             print(f"{'代币':>10} | {'创建日期':>12} | {'年龄（天）':>10} | {'流动性':>15}")
             print("-" * 55)
-            for item in kept_tokens[:10]:  # 只显示前10个
-                print(f"{item['symbol']:>10} | {item['created']:>12} | "
-                      f"{item['age_days']:>10} | ${item['liquidity']:>14,.2f}")
-            if len(kept_tokens) > 10:
-                print(f"... 还有 {len(kept_tokens) - 10} 个")
+            for j in order[:10]:  # 只显示前10个
+                i = kept[j]
+                symbol = _token_symbol(all_tokens[i])
+                created = datetime.fromtimestamp(created_ms[i] / 1000).strftime('%Y-%m-%d')
+                print(f"{symbol:>10} | {created:>12} | "
+                      f"{age_days[i]:>10} | ${liquidity[j]:>14,.2f}")
+            if len(kept) > 10:
+                print(f"... 还有 {len(kept) - 10} 个")
         else:
             print("没有保留的代币")
 
@@ -149,26 +248,23 @@ async def test_manual_filter():
     # 检查是否有现成的JSON文件
     json_file = "/Users/mac/Documents/code/blockchain-data/dexscreener_tokens.json"
 
-    if not Path(json_file).exists():
+    print(f"\n读取文件: {json_file}")
+    # 边读取边过滤（30天），大文件的解析放到线程中，避免阻塞事件循环
+    # 直接打开文件，不存在时再提示（不预先检查，避免多一次 stat）
+    try:
+        total, filtered_tokens = await asyncio.to_thread(_filter_json_by_age, json_file, 30)
+    except FileNotFoundError:
         print(f"\n✗ 文件不存在: {json_file}")
         print("请先运行爬取操作生成数据")
         return
 
-    print(f"\n读取文件: {json_file}")
-    with open(json_file, 'r', encoding='utf-8') as f:
-        tokens = json.load(f)
-
-    print(f"原始数据: {len(tokens)} 个代币")
-
-    # 应用年龄过滤
-    filtered_tokens = DexScreenerService.filter_tokens_by_age(tokens, max_age_days=30)
+    print(f"原始数据: {total} 个代币")
     print(f"过滤后: {len(filtered_tokens)} 个代币")
-    print(f"过滤掉: {len(tokens) - len(filtered_tokens)} 个代币")
+    print(f"过滤掉: {total - len(filtered_tokens)} 个代币")
 
     # 保存过滤后的数据
     output_file = "/tmp/dexscreener_tokens_filtered_30days.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(filtered_tokens, f, indent=2, ensure_ascii=False)
+    await asyncio.to_thread(_write_json, output_file, filtered_tokens)
 
     print(f"\n✓ 过滤后的数据已保存到: {output_file}")
 
@@ -218,28 +314,17 @@ async def test_custom_days():
         # 显示代币年龄分布
         if tokens:
             print(f"\n代币年龄分布:")
-            age_distribution = {}
-
-            for token in tokens:
-                pair_created_at = token.get('pairCreatedAt')
-                if pair_created_at:
-                    created_time = datetime.fromtimestamp(pair_created_at / 1000)
-                    age_days = (datetime.now() - created_time).days
-
-                    if age_days <= 1:
-                        key = "1天内"
-                    elif age_days <= 7:
-                        key = "1-7天"
-                    elif age_days <= 14:
-                        key = "7-14天"
-                    elif age_days <= 30:
-                        key = "14-30天"
-                    else:
-                        key = f"30天以上"
-
-                    age_distribution[key] = age_distribution.get(key, 0) + 1
-
-            for age_range, count in sorted(age_distribution.items()):
+            now_ms = _now_ms()
+            _, has_created, age_days = _token_ages(tokens, now_ms)
+
+            # 区间为左开右闭（年龄 <= 边界），side='left' 保持与原分段一致
+            buckets = np.searchsorted(AGE_BUCKET_EDGES, age_days[has_created], side='left')
+            counts = np.bincount(buckets, minlength=len(AGE_BUCKET_LABELS))
+
+            # 按区间顺序输出（而不是按标签字符串排序）
+            for age_range, count in zip(AGE_BUCKET_LABELS, counts.tolist()):
+                if not count:
+                    continue
                 percentage = count / len(tokens) * 100
                 print(f"  {age_range:>10}: {count:>3} 个 ({percentage:>5.1f}%)")
 
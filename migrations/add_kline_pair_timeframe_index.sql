@@ -0,0 +1,23 @@
+-- 为 token_klines 添加 (pair_address, timeframe, aggregate) 复合索引
+-- 日期: 2026-10-17
+--
+-- backfill_klines.py 按交易对统计 K 线数量：
+--   SELECT pair_address, COUNT(id) FROM token_klines
+--   WHERE pair_address IN (...) AND timeframe = 'minute' AND aggregate = 5
+--   GROUP BY pair_address
+-- INCLUDE (id) 让 COUNT(id) 走 index-only scan，无需回表
+
+-- CONCURRENTLY 不能在事务块中执行，请单独运行本文件（psql -f）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_kline_pair_tf_agg
+ON token_klines (pair_address, timeframe, aggregate)
+INCLUDE (id);
+
+-- 更新统计信息，让规划器尽快使用新索引
+ANALYZE token_klines;
+
+-- 验证（应看到 Index Only Scan using idx_kline_pair_tf_agg）
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT pair_address, COUNT(id)
+FROM token_klines
+WHERE timeframe = 'minute' AND aggregate = 5
+GROUP BY pair_address;
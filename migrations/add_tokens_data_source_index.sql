@@ -0,0 +1,14 @@
+-- 为 tokens.data_source 添加索引
+-- 日期: 2026-10-17
+--
+-- K线查询示例按 data_source = 'dexscreener' 过滤 tokens；
+-- token_ohlcv 已有 idx_token_timeframe_timestamp (token_id, timeframe, timestamp)，
+-- 按 token_id 聚合时可直接使用
+
+CREATE INDEX IF NOT EXISTS ix_tokens_data_source ON tokens(data_source);
+
+-- 验证
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename IN ('tokens', 'token_ohlcv')
+ORDER BY tablename, indexname;
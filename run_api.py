@@ -3,14 +3,22 @@
 """
 
 import os
+import sys
 import uvicorn
-from src.api.app import app
 
 
 if __name__ == "__main__":
     # 从环境变量读取端口，默认使用 18763（更安全的非标准端口）
     PORT = int(os.getenv("API_PORT", 18763))
 
+    # 从环境变量读取监听地址
+    # 生产环境：使用 0.0.0.0 + 防火墙限制特定IP访问
+    # 纯本地环境：使用 127.0.0.1
+    HOST = os.getenv("API_HOST", "0.0.0.0")
+
+    # 工作进程数，多进程时 uvicorn 需要通过导入路径在各子进程中加载应用
+    WORKERS = int(os.getenv("API_WORKERS", 1))
+
     print("=" * 60)
     print("🚀 启动 Blockchain Data API 服务")
     print("=" * 60)
@@ -19,14 +27,18 @@ if __name__ == "__main__":
     print(f"📖 ReDoc 文档: http://localhost:{PORT}/redoc")
     print("=" * 60)
 
-    # 从环境变量读取监听地址
-    # 生产环境：使用 0.0.0.0 + 防火墙限制特定IP访问
-    # 纯本地环境：使用 127.0.0.1
-    HOST = os.getenv("API_HOST", "0.0.0.0")
-
     uvicorn.run(
-        app,
+        "src.api.app:app",
         host=HOST,
         port=PORT,
-        log_level="info"
+        workers=WORKERS,
+        # 已安装 uvloop 时使用 libuv 事件循环（Windows 上不安装，自动退回 asyncio）
+        # + C 实现的 HTTP 解析器（uvicorn[standard] 自带）
+        loop="auto",
+        http="httptools",
+        backlog=2048,
+        timeout_keep_alive=5,
+        log_level="info",
+        # 输出重定向到日志文件时不输出颜色控制符
+        use_colors=sys.stdout.isatty()
     )
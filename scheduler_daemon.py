@@ -12,61 +12,235 @@
 """
 
 import asyncio
+import gzip
 import logging
+import shutil
 import signal
 import sys
+import time
 import os
+import queue
 import random
 import argparse
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from apscheduler.triggers.date import DateTrigger
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import insert
 
 from src.services.token_monitor_service import TokenMonitorService
 from src.services.multi_chain_scraper import MultiChainScraper
 from src.services.kline_service import KlineService
+from src.storage.db_manager import DatabaseManager
+from src.storage.models import MonitorLog, ScrapeLog
+
+
+def _gzip_rotator(source: str, dest: str):
+    """轮转日志时压缩旧文件"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class BufferedFileHandler(RotatingFileHandler):
+    """
+    带写缓冲、按大小轮转的文件日志处理器
+
+    普通记录只写入缓冲区，ERROR 及以上级别立即刷新；
+    其余记录由 LogQueueListener 在日志队列清空时统一落盘。
+    文件超过 max_bytes 时轮转，旧文件压缩为 .gz
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 5,
+        buffer_size: int = 65536
+    ):
+        self.buffer_size = buffer_size
+        self._size = 0
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.namer = lambda name: name + '.gz'
+        self.rotator = _gzip_rotator
+
+    def _open(self):
+        # 自行记录文件大小：RotatingFileHandler 默认的 seek/tell 会刷新写缓冲
+        try:
+            self._size = os.path.getsize(self.baseFilename)
+        except OSError:
+            self._size = 0
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/tmp/scheduler.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+    def emit(self, record: logging.LogRecord):
+        try:
+            msg = self.format(record) + self.terminator
+            # 按编码后的字节数计算（与 _open 中的文件大小一致，中文每字符占 3 字节）
+            msg_size = len(msg.encode(self.encoding, self.errors or 'strict'))
+            if self.maxBytes > 0 and self.stream is not None \
+                    and self._size + msg_size >= self.maxBytes:
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            self._size += msg_size
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class LogQueueListener(QueueListener):
+    """在后台线程中写日志，每处理完一批记录（队列清空）刷新一次文件缓冲"""
+
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+# 配置日志：事件循环中只把记录放入队列，文件和控制台写入由后台线程完成
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+file_log_handler = BufferedFileHandler('/tmp/scheduler.log')
+stream_log_handler = logging.StreamHandler(sys.stdout)
+for _handler in (file_log_handler, stream_log_handler):
+    _handler.setFormatter(log_formatter)
+
+log_queue: queue.Queue = queue.Queue(-1)
+log_listener = LogQueueListener(log_queue, file_log_handler, stream_log_handler)
+logging.root.setLevel(logging.INFO)
+logging.root.addHandler(QueueHandler(log_queue))
 logger = logging.getLogger(__name__)
 
-# 全局变量
-scheduler = None
-monitor_service = None
-enable_scraper = True  # 是否启用爬虫任务
-use_undetected_chrome = os.getenv('USE_UNDETECTED_CHROME', 'false').lower() == 'true'
+BANNER = "=" * 80
+
+
+def log_banner(title: str):
+    """输出带分隔线的标题（合并为一条日志记录）"""
+    logger.info("%s\n%s\n%s", BANNER, title, BANNER)
+
+
+def log_section_end(message: str, *args):
+    """输出消息并以分隔线收尾（合并为一条日志记录，args 按 logging 的 % 风格延迟格式化）"""
+    logger.info(message + "\n%s", *args, BANNER)
+
+
+_TRUTHY = frozenset({'1', 'true', 'yes', 'on'})
+
+# 环境变量指定的默认爬取方法（命令行参数 --use-undetected-chrome 可覆盖）
+USE_UNDETECTED_CHROME_DEFAULT = os.environ.get('USE_UNDETECTED_CHROME', '').lower() in _TRUTHY
+
+# 退出时等待正在进行的爬取结束的最长时间（秒），超时后终止爬虫进程
+SCRAPE_EXECUTOR_SHUTDOWN_TIMEOUT = 10
+
+# 潜力代币 AVE 数据更新：最大并发请求数，以及每个请求后的平均停顿（秒）
+POTENTIAL_UPDATE_CONCURRENCY = 10
+POTENTIAL_UPDATE_DELAY = 0.1
+
+
+
+@dataclass
+class AppContext:
+    """守护进程运行状态（在 main 中创建，传给各任务共用，进程退出时关闭）"""
+
+    db_manager: DatabaseManager
+    monitor_service: TokenMonitorService
+    kline_service: KlineService
+    use_undetected_chrome: bool = USE_UNDETECTED_CHROME_DEFAULT  # 数据库中没有爬虫配置时使用的爬取方法
+    scrape_executor: Optional[Executor] = None  # 执行阻塞爬取的进程池
+
+
+def _init_scrape_worker(worker_log_queue: multiprocessing.Queue):
+    """
+    爬虫子进程初始化：日志改为写入跨进程队列，由主进程的监听线程写入日志文件
+
+    （继承来的队列处理器指向主进程内的 queue.Queue，子进程中无人消费，需要替换）
+    """
+    logging.root.handlers.clear()
+    logging.root.setLevel(logging.INFO)
+    logging.root.addHandler(QueueHandler(worker_log_queue))
+
+
+async def shutdown_executor(executor: ProcessPoolExecutor, timeout: float = SCRAPE_EXECUTOR_SHUTDOWN_TIMEOUT):
+    """
+    关闭爬虫进程池，不阻塞事件循环
+
+    取消排队中的任务，最多等待 timeout 秒让正在进行的爬取结束，
+    超时则直接终止子进程（Chrome 爬取可能持续数分钟，不能拖住进程退出）
+    """
+    try:
+        await asyncio.wait_for(
+            asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        logger.warning("爬虫进程 %s 秒内未结束，强制终止", timeout)
+        # ProcessPoolExecutor 在 Python 3.14 之前没有公开的终止子进程接口，
+        # 这里依赖 CPython 内部属性 _processes（pid -> Process），升级 Python 时需确认
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+
+
+def finish_log_row(log_row: Dict[str, Any], start_mono: float) -> float:
+    """
+    按单调时钟计算任务耗时，填入日志记录的结束时间和耗时
+
+    结束时间由 started_at 加耗时得到，不受系统时间跳变（如 NTP 校时）影响
+
+    Args:
+        log_row: 日志记录字段（包含 started_at）
+        start_mono: 任务开始时的 time.monotonic()
+
+    Returns:
+        耗时（秒）
+    """
+    duration = time.monotonic() - start_mono
+    log_row['completed_at'] = log_row['started_at'] + timedelta(seconds=duration)
+    log_row['duration_seconds'] = round(duration)
+    return duration
+
+
+async def save_log_row(db_manager: DatabaseManager, model, **values):
+    """
+    任务结束时一次性写入任务日志记录（ScrapeLog / MonitorLog）
+
+    Args:
+        db_manager: 数据库管理器
+        model: 日志模型类
+        **values: 记录字段（包含最终状态和统计）
+    """
+    # 只写不读的单行记录：直接 INSERT，不经过 ORM 的对象映射和 flush
+    async with db_manager.get_session() as session:
+        await session.execute(insert(model).values(**values))
 
 
-async def scrape_dexscreener_task():
+async def scrape_dexscreener_task(ctx: AppContext):
     """
     爬取 DexScreener 首页任务（从数据库读取配置）
     使用 cloudscraper 或 undetected-chromedriver 爬取多链数据
     支持重试机制提高成功率
-    """
-    from src.storage.models import ScrapeLog
-    from src.storage.db_manager import DatabaseManager
-    import uuid
 
-    scraper = None
-    monitor_service = None
-    scrape_log_id = None
-    db_manager = None
+    Args:
+        ctx: 守护进程运行状态
+
+    Returns:
+        本次使用的爬虫配置（用于计算下次爬取间隔），失败时返回 None
+    """
+    monitor_service = ctx.monitor_service
+    log_row: Optional[Dict[str, Any]] = None  # 本次抓取日志的字段，结束时一次性写入
 
     try:
-        logger.info("="*80)
-        logger.info("开始爬取 DexScreener 首页（多链）...")
-        logger.info("="*80)
+        log_banner("开始爬取 DexScreener 首页（多链）...")
 
-        # 1. 从数据库读取配置
-        monitor_service = TokenMonitorService()
+        # 1. 从数据库读取配置（复用共享的监控服务，保持连接池和 HTTP 会话）
         config = await monitor_service.get_scraper_config()
 
         if not config:
@@ -75,7 +249,7 @@ async def scrape_dexscreener_task():
                 'enabled_chains': ['bsc', 'solana'],
                 'count_per_chain': 100,
                 'top_n_per_chain': 10,
-                'use_undetected_chrome': use_undetected_chrome,
+                'use_undetected_chrome': ctx.use_undetected_chrome,
                 'enabled': True,
                 'scrape_interval_min': 9,
                 'scrape_interval_max': 15
@@ -84,205 +258,185 @@ async def scrape_dexscreener_task():
         # 2. 检查配置是否启用
         if not config.get('enabled', True):
             logger.info("爬虫配置已禁用，跳过本次爬取")
-            schedule_next_scrape(config)
-            return
-
-        logger.info(f"配置信息: chains={config['enabled_chains']}, "
-                   f"count_per_chain={config['count_per_chain']}, "
-                   f"top_n_per_chain={config['top_n_per_chain']}, "
-                   f"use_undetected_chrome={config['use_undetected_chrome']}")
-
-        # 2.5 创建 ScrapeLog 记录（状态：running）
-        start_time = datetime.utcnow()
-        db_manager = DatabaseManager()
-        scrape_log_id = str(uuid.uuid4())
-
-        async with db_manager.get_session() as session:
-            scrape_log = ScrapeLog(
-                id=scrape_log_id,
-                started_at=start_time,
-                status='running',
-                chain=','.join(config.get('enabled_chains', [])),  # 多链用逗号分隔
-                config_snapshot=config  # 保存配置快照
+            return config
+
+        logger.info("配置信息: chains=%s, count_per_chain=%s, top_n_per_chain=%s, "
+                    "use_undetected_chrome=%s",
+                    config['enabled_chains'], config['count_per_chain'],
+                    config['top_n_per_chain'], config['use_undetected_chrome'])
+
+        # 2.5 记录抓取日志的基本信息（任务结束时连同结果一起写入 ScrapeLog）
+        start_mono = time.monotonic()
+        log_row = {
+            'started_at': datetime.utcnow(),
+            'chain': ','.join(config.get('enabled_chains', [])),  # 多链用逗号分隔
+            'config_snapshot': config  # 保存配置快照
+        }
+
+        # 3. 使用配置参数爬取并保存到 potential_tokens 表（结束后关闭爬虫的连接）
+        async with MultiChainScraper(ctx.db_manager, executor=ctx.scrape_executor) as scraper:
+            result = await scraper.scrape_and_save_multi_chain(
+                chains=config['enabled_chains'],              # 从配置读取链列表
+                count_per_chain=config['count_per_chain'],    # 从配置读取每条链爬取总数
+                top_n_per_chain=config['top_n_per_chain'],    # 从配置读取每条链取前N名
+                use_undetected_chrome=config['use_undetected_chrome'],  # 从配置读取爬取方法
+                min_market_cap=config.get('min_market_cap'),  # 从配置读取最小市值
+                min_liquidity=config.get('min_liquidity'),    # 从配置读取最小流动性
+                max_token_age_days=config.get('max_token_age_days')  # 从配置读取最大代币年龄
             )
-            session.add(scrape_log)
-            await session.commit()
-
-        logger.info(f"📝 已创建抓取日志记录: {scrape_log_id}")
-
-        # 3. 使用配置参数爬取
-        scraper = MultiChainScraper()
-
-        # 爬取并保存到 potential_tokens 表
-        result = await scraper.scrape_and_save_multi_chain(
-            chains=config['enabled_chains'],              # 从配置读取链列表
-            count_per_chain=config['count_per_chain'],    # 从配置读取每条链爬取总数
-            top_n_per_chain=config['top_n_per_chain'],    # 从配置读取每条链取前N名
-            use_undetected_chrome=config['use_undetected_chrome'],  # 从配置读取爬取方法
-            min_market_cap=config.get('min_market_cap'),  # 从配置读取最小市值
-            min_liquidity=config.get('min_liquidity'),    # 从配置读取最小流动性
-            max_token_age_days=config.get('max_token_age_days')  # 从配置读取最大代币年龄
-        )
 
-        # 3.5 更新 ScrapeLog 记录（状态：success）
-        end_time = datetime.utcnow()
-        duration = int((end_time - start_time).total_seconds())
-
-        async with db_manager.get_session() as session:
-            scrape_log = await session.get(ScrapeLog, scrape_log_id)
-            if scrape_log:
-                scrape_log.completed_at = end_time
-                scrape_log.duration_seconds = duration
-                scrape_log.status = 'success'
-                scrape_log.tokens_saved = result.get('total_saved', 0)
-                scrape_log.tokens_skipped = result.get('total_skipped', 0)
-                # 从 chains 结果中计算 scraped 总数
-                total_scraped = sum(
-                    chain_result.get('scraped', 0)
-                    for chain_result in result.get('chains', {}).values()
-                )
-                scrape_log.tokens_scraped = total_scraped
-                await session.commit()
+        # 3.5 记录抓取结果
+        duration = finish_log_row(log_row, start_mono)
 
-        logger.info(f"✅ 已更新抓取日志: 耗时 {duration}秒")
+        # 从 chains 结果中计算 scraped 总数
+        total_scraped = sum(
+            chain_result.get('scraped', 0)
+            for chain_result in result.get('chains', {}).values()
+        )
+        log_row.update(
+            tokens_saved=result.get('total_saved', 0),
+            tokens_skipped=result.get('total_skipped', 0),
+            tokens_scraped=total_scraped
+        )
 
-        logger.info(
-            f"爬取完成：总共保存 {result['total_saved']} 个代币到数据库，"
-            f"跳过 {result['total_skipped']} 个"
+        log_section_end(
+            "爬取完成：总共保存 %s 个代币到数据库，跳过 %s 个",
+            result['total_saved'], result['total_skipped']
         )
-        logger.info("="*80)
 
         # 爬取完成后，立即更新潜力代币的 AVE API 数据
         if result['total_saved'] > 0:
-            logger.info("\n" + "="*80)
-            logger.info("更新潜力代币的 AVE API 数据...")
-            logger.info("="*80)
-
-            if not monitor_service:
-                monitor_service = TokenMonitorService()
+            log_banner("更新潜力代币的 AVE API 数据...")
 
             update_result = await monitor_service.update_potential_tokens_data(
-                delay=0.3,
+                delay=POTENTIAL_UPDATE_DELAY,
+                max_concurrency=POTENTIAL_UPDATE_CONCURRENCY,
                 min_update_interval_minutes=0  # 爬取后立即更新，不检查间隔
             )
 
-            logger.info(
-                f"更新完成：成功 {update_result.get('updated', 0)} 个，"
-                f"失败 {update_result.get('failed', 0)} 个"
+            log_section_end(
+                "更新完成：成功 %s 个，失败 %s 个",
+                update_result.get('updated', 0), update_result.get('failed', 0)
             )
-            logger.info("="*80)
 
-        # 调度下一次爬取任务（使用配置的间隔时间）
-        schedule_next_scrape(config)
+        await save_log_row(ctx.db_manager, ScrapeLog, status='success', **log_row)
+        logger.info("✅ 已保存抓取日志: 耗时 %.1f秒", duration)
+
+        return config
 
     except Exception as e:
-        logger.error(f"爬取任务失败: {e}", exc_info=True)
+        logger.error("爬取任务失败: %s", e, exc_info=True)
 
-        # 更新 ScrapeLog 记录（状态：failed）
-        if scrape_log_id and db_manager:
+        # 写入 ScrapeLog 记录（状态：failed）
+        if log_row is not None:
             try:
-                end_time = datetime.utcnow()
-                duration = int((end_time - start_time).total_seconds())
-
-                async with db_manager.get_session() as session:
-                    scrape_log = await session.get(ScrapeLog, scrape_log_id)
-                    if scrape_log:
-                        scrape_log.completed_at = end_time
-                        scrape_log.duration_seconds = duration
-                        scrape_log.status = 'failed'
-                        scrape_log.error_message = str(e)[:1000]  # 限制长度
-                        await session.commit()
-
-                logger.info(f"❌ 已更新抓取日志: 失败，耗时 {duration}秒")
-            except Exception as log_error:
-                logger.error(f"更新失败日志时出错: {log_error}")
+                duration = finish_log_row(log_row, start_mono)
+
+                await save_log_row(
+                    ctx.db_manager,
+                    ScrapeLog,
+                    status='failed',
+                    error_message=str(e)[:1000],  # 限制长度
+                    **log_row
+                )
 
-        # 即使失败也要调度下一次（使用默认配置）
-        schedule_next_scrape()
+                logger.info("❌ 已保存抓取日志: 失败，耗时 %.1f秒", duration)
+            except Exception as log_error:
+                logger.error("写入失败日志时出错: %s", log_error)
 
-    finally:
-        # 关闭连接
-        if scraper:
-            await scraper.close()
-        if monitor_service:
-            await monitor_service.close()
+        # 失败时下次爬取使用默认间隔
+        return None
 
 
-def schedule_next_scrape(config=None):
+def next_scrape_interval(config: Optional[Dict[str, Any]] = None) -> float:
     """
-    调度下一次爬取任务（使用配置的间隔时间或默认9-15分钟）
+    计算本轮爬取周期（秒）：配置区间的中值加随机抖动（默认 12±3 分钟，即9-15分钟）
 
     Args:
         config: 爬虫配置字典，包含 scrape_interval_min 和 scrape_interval_max
+
+    Returns:
+        爬取周期（秒）
     """
-    global scheduler, enable_scraper
+    # 从配置读取间隔时间，如果没有配置则使用默认值（9-15分钟）
+    if config:
+        interval_min = config.get('scrape_interval_min', 9)
+        interval_max = config.get('scrape_interval_max', 15)
+    else:
+        interval_min = 9
+        interval_max = 15
 
-    # 如果爬虫被禁用，不调度
-    if not enable_scraper:
-        return
+    interval = (interval_min + interval_max) / 2
+    jitter = (interval_max - interval_min) / 2
+    return (interval + random.uniform(-jitter, jitter)) * 60
 
-    if scheduler:
-        # 从配置读取间隔时间，如果没有配置则使用默认值（9-15分钟）
-        if config:
-            interval_min = config.get('scrape_interval_min', 9)
-            interval_max = config.get('scrape_interval_max', 15)
-        else:
-            interval_min = 9
-            interval_max = 15
 
-        # 计算随机间隔时间
-        next_run_minutes = random.uniform(interval_min, interval_max)
-        next_run_time = datetime.now() + timedelta(minutes=next_run_minutes)
+async def scrape_loop(ctx: AppContext):
+    """
+    爬取循环：启动时立即爬取一次，之后按上一次爬取的开始时间加抖动周期安排下一次爬取
 
-        # 移除旧的爬取任务
-        try:
-            scheduler.remove_job('scrape_dexscreener')
-        except:
-            pass
+    爬取本身的耗时计入周期，不会把间隔越拉越长；每次爬取返回的最新配置
+    用于计算下一轮周期，修改配置无需重启
 
-        # 添加新的一次性任务
-        scheduler.add_job(
-            scrape_dexscreener_task,
-            trigger=DateTrigger(run_date=next_run_time),
-            id='scrape_dexscreener',
-            name='爬取DexScreener首页',
-            max_instances=1,
-            coalesce=True,
-            misfire_grace_time=60
-        )
+    Args:
+        ctx: 守护进程运行状态
+    """
+    loop = asyncio.get_running_loop()
+
+    while True:
+        last_started = loop.time()
+        config = await scrape_dexscreener_task(ctx)
 
-        logger.info(f"📅 下次爬取时间: {next_run_time.strftime('%Y-%m-%d %H:%M:%S')} "
-                   f"(间隔 {next_run_minutes:.1f} 分钟)")
+        interval = next_scrape_interval(config)
+        delay = max(0.0, last_started + interval - loop.time())
+        next_run_time = datetime.now() + timedelta(seconds=delay)
+        logger.info("📅 下次爬取时间: %s (周期 %.1f 分钟)",
+                    next_run_time.replace(microsecond=0), interval / 60)
 
+        await asyncio.sleep(delay)
 
 
-async def monitor_prices_task():
+async def run_periodically(task_func: Callable[[], Awaitable[Any]], interval_seconds: float):
     """
-    监控价格任务（从数据库读取配置）
-    更新监控代币价格 + 潜力代币数据
+    启动时立即执行一次任务，之后按固定频率重复执行
+
+    上一次执行尚未结束时不会重叠执行，错过的轮次直接跳过
+
+    Args:
+        task_func: 任务协程函数
+        interval_seconds: 执行间隔（秒）
     """
-    from src.storage.models import MonitorLog
-    from src.storage.db_manager import DatabaseManager
-    import uuid
+    loop = asyncio.get_running_loop()
+    next_run = loop.time()
 
-    global monitor_service
+    while True:
+        await asyncio.sleep(max(0.0, next_run - loop.time()))
+        await task_func()
 
-    monitor_log_id = None
-    db_manager = None
-    start_time = None
+        now = loop.time()
+        while next_run <= now:
+            next_run += interval_seconds
+
+
+async def monitor_prices_task(ctx: AppContext):
+    """
+    监控价格任务（从数据库读取配置）
+    更新监控代币价格 + 潜力代币数据
+
+    Args:
+        ctx: 守护进程运行状态
+    """
+    monitor_service = ctx.monitor_service
+    log_row: Optional[Dict[str, Any]] = None  # 本次监控日志的字段，结束时一次性写入
 
     try:
         # 任务开始计时（包含所有步骤）
         start_time = datetime.utcnow()
+        start_mono = time.monotonic()
 
-        logger.info("="*80)
-        logger.info("开始更新监控代币价格...")
-        logger.info("="*80)
+        log_banner("开始更新监控代币价格和潜力代币数据...")
 
         # 1. 从数据库读取监控配置
-        if not monitor_service:
-            monitor_service = TokenMonitorService()
-
         config = await monitor_service.get_monitor_config()
 
         if not config:
@@ -294,196 +448,205 @@ async def monitor_prices_task():
             logger.info("监控配置已禁用，跳过本次更新")
             return
 
-        logger.info(f"配置信息: 间隔={config['update_interval_minutes']}分钟, "
-                   f"市值阈值={config.get('min_monitor_market_cap')}, "
-                   f"流动性阈值={config.get('min_monitor_liquidity')}")
-
-        # 创建 MonitorLog 记录（状态：running）
-        db_manager = DatabaseManager()
-        monitor_log_id = str(uuid.uuid4())
-
-        async with db_manager.get_session() as session:
-            monitor_log = MonitorLog(
-                id=monitor_log_id,
-                started_at=start_time,
-                status='running',
-                config_snapshot=config  # 保存配置快照
-            )
-            session.add(monitor_log)
-            await session.commit()
-
-        logger.info(f"📝 已创建监控日志记录: {monitor_log_id}")
-
-        # 更新所有监控代币的价格
-        result = await monitor_service.update_monitored_prices()
-
-        # 更新 MonitorLog 记录（中间状态）
-        async with db_manager.get_session() as session:
-            monitor_log = await session.get(MonitorLog, monitor_log_id)
-            if monitor_log:
-                monitor_log.status = 'success'
-                monitor_log.tokens_monitored = result.get('total_monitored', 0)
-                monitor_log.tokens_updated = result.get('updated', 0)
-                monitor_log.tokens_failed = result.get('failed', 0)
-                monitor_log.tokens_auto_removed = result.get('removed', 0)
-                monitor_log.alerts_triggered = result.get('alerts_triggered', 0)
-                monitor_log.removed_by_market_cap = result.get('removed_by_market_cap', 0)
-                monitor_log.removed_by_liquidity = result.get('removed_by_liquidity', 0)
-                await session.commit()
-
-        logger.info(
-            f"价格更新完成：更新 {result['updated']} 个代币，"
-            f"触发 {result['alerts_triggered']} 个报警"
+        logger.info("配置信息: 间隔=%s分钟, 市值阈值=%s, 流动性阈值=%s",
+                    config['update_interval_minutes'],
+                    config.get('min_monitor_market_cap'),
+                    config.get('min_monitor_liquidity'))
+
+        # 监控日志的字段和统计先累积在本地，任务结束时一次性写入 MonitorLog
+        log_row = {
+            'started_at': start_time,
+            'config_snapshot': config  # 保存配置快照
+        }
+
+        # 监控代币价格和潜力代币 AVE 数据互不依赖，并发更新（潜力代币带去重检查）
+        result, potential_result = await asyncio.gather(
+            monitor_service.update_monitored_prices(),
+            monitor_service.update_potential_tokens_data(
+                delay=POTENTIAL_UPDATE_DELAY,
+                max_concurrency=POTENTIAL_UPDATE_CONCURRENCY,
+                min_update_interval_minutes=3  # 最少间隔3分钟，避免重复调用
+            ),
+            return_exceptions=True
         )
-        if result.get('removed', 0) > 0:
-            logger.info(
-                f"自动删除 {result['removed']} 个代币 "
-                f"(市值: {result.get('removed_by_market_cap', 0)}, "
-                f"流动性: {result.get('removed_by_liquidity', 0)})"
-            )
-        logger.info("="*80)
 
-        # 同时更新潜力代币的 AVE API 数据（带去重检查）
-        logger.info("\n" + "="*80)
-        logger.info("检查是否需要更新潜力代币数据...")
-        logger.info("="*80)
+        errors = []
 
-        potential_result = await monitor_service.update_potential_tokens_data(
-            delay=0.3,
-            min_update_interval_minutes=3  # 最少间隔3分钟，避免重复调用
-        )
+        if isinstance(result, Exception):
+            logger.error("监控代币价格更新失败: %s", result, exc_info=result)
+            errors.append(f"价格更新失败: {result}")
+        else:
+            log_row.update(
+                tokens_monitored=result.get('total_monitored', 0),
+                tokens_updated=result.get('updated', 0),
+                tokens_failed=result.get('failed', 0),
+                tokens_auto_removed=result.get('removed', 0),
+                alerts_triggered=result.get('alerts_triggered', 0),
+                removed_by_market_cap=result.get('removed_by_market_cap', 0),
+                removed_by_liquidity=result.get('removed_by_liquidity', 0)
+            )
 
-        if potential_result.get('skipped'):
+            summary = "价格更新完成：更新 %s 个代币，触发 %s 个报警"
+            summary_args = [result['updated'], result['alerts_triggered']]
+            if result.get('removed', 0) > 0:
+                summary += "\n自动删除 %s 个代币 (市值: %s, 流动性: %s)"
+                summary_args += [
+                    result['removed'],
+                    result.get('removed_by_market_cap', 0),
+                    result.get('removed_by_liquidity', 0)
+                ]
+            log_section_end(summary, *summary_args)
+
+        if isinstance(potential_result, Exception):
+            logger.error("潜力代币数据更新失败: %s", potential_result, exc_info=potential_result)
+            errors.append(f"潜力代币更新失败: {potential_result}")
+        elif potential_result.get('skipped'):
             logger.info("潜力代币数据更新已跳过（距上次更新时间太短）")
         else:
             logger.info(
-                f"潜力代币更新完成：成功 {potential_result.get('updated', 0)} 个，"
-                f"失败 {potential_result.get('failed', 0)} 个"
+                "潜力代币更新完成：成功 %s 个，失败 %s 个",
+                potential_result.get('updated', 0), potential_result.get('failed', 0)
             )
 
             # 如果潜力代币有删除，累加到监控日志统计中
             potential_removed = potential_result.get('removed', 0)
             if potential_removed > 0:
                 logger.info(
-                    f"自动删除潜力代币 {potential_removed} 个 "
-                    f"(市值: {potential_result.get('removed_by_market_cap', 0)}, "
-                    f"流动性: {potential_result.get('removed_by_liquidity', 0)})"
+                    "自动删除潜力代币 %s 个 (市值: %s, 流动性: %s)",
+                    potential_removed,
+                    potential_result.get('removed_by_market_cap', 0),
+                    potential_result.get('removed_by_liquidity', 0)
                 )
 
-                # 更新 monitor_log，累加潜力代币的删除统计
-                async with db_manager.get_session() as session:
-                    monitor_log = await session.get(MonitorLog, monitor_log_id)
-                    if monitor_log:
-                        monitor_log.tokens_auto_removed += potential_removed
-                        monitor_log.removed_by_market_cap += potential_result.get('removed_by_market_cap', 0)
-                        monitor_log.removed_by_liquidity += potential_result.get('removed_by_liquidity', 0)
-                        await session.commit()
+                # 累加潜力代币的删除统计
+                for field, value in (
+                    ('tokens_auto_removed', potential_removed),
+                    ('removed_by_market_cap', potential_result.get('removed_by_market_cap', 0)),
+                    ('removed_by_liquidity', potential_result.get('removed_by_liquidity', 0)),
+                ):
+                    log_row[field] = log_row.get(field, 0) + value
 
-                logger.info(f"✅ 已累加潜力代币删除统计到监控日志")
+        # 任一更新失败时按失败记录日志（已得到的统计一并写入）
+        if errors:
+            raise RuntimeError('; '.join(errors))
 
-        # 所有任务完成，计算总耗时并更新监控日志
-        end_time = datetime.utcnow()
-        duration = int((end_time - start_time).total_seconds())
+        # 所有任务完成，计算总耗时并写入监控日志
+        duration = finish_log_row(log_row, start_mono)
 
-        async with db_manager.get_session() as session:
-            monitor_log = await session.get(MonitorLog, monitor_log_id)
-            if monitor_log:
-                monitor_log.completed_at = end_time
-                monitor_log.duration_seconds = duration
-                await session.commit()
+        await save_log_row(ctx.db_manager, MonitorLog, status='success', **log_row)
 
-        logger.info(f"✅ 监控任务完成，总耗时: {duration} 秒")
-        logger.info("="*80)
+        log_section_end("✅ 监控任务完成，总耗时: %.1f 秒", duration)
 
     except Exception as e:
-        logger.error(f"监控任务失败: {e}", exc_info=True)
+        logger.error("监控任务失败: %s", e, exc_info=True)
 
-        # 更新 MonitorLog 记录（状态：failed）
-        if monitor_log_id and db_manager and start_time:
+        # 写入 MonitorLog 记录（状态：failed）
+        if log_row is not None:
             try:
-                end_time = datetime.utcnow()
-                duration = int((end_time - start_time).total_seconds())
-
-                async with db_manager.get_session() as session:
-                    monitor_log = await session.get(MonitorLog, monitor_log_id)
-                    if monitor_log:
-                        monitor_log.completed_at = end_time
-                        monitor_log.duration_seconds = duration
-                        monitor_log.status = 'failed'
-                        monitor_log.error_message = str(e)[:1000]  # 限制长度
-                        await session.commit()
-
-                logger.info(f"❌ 已更新监控日志: 失败，耗时 {duration}秒")
+                duration = finish_log_row(log_row, start_mono)
+
+                # 失败前已得到的统计一并写入
+                await save_log_row(
+                    ctx.db_manager,
+                    MonitorLog,
+                    status='failed',
+                    error_message=str(e)[:1000],  # 限制长度
+                    **log_row
+                )
+
+                logger.info("❌ 已保存监控日志: 失败，耗时 %.1f秒", duration)
             except Exception as log_error:
-                logger.error(f"更新失败日志时出错: {log_error}")
-    finally:
-        # 关闭数据库连接
-        if db_manager:
-            try:
-                await db_manager.close()
-            except:
-                pass
+                logger.error("写入失败日志时出错: %s", log_error)
 
 
-async def update_klines_task():
+async def update_klines_task(ctx: AppContext):
     """
     更新K线数据任务（每1小时）
     拉取所有监控代币和潜力代币的K线数据
-    """
-    kline_service = None
 
+    Args:
+        ctx: 守护进程运行状态
+    """
     try:
-        logger.info("="*80)
-        logger.info("开始更新K线数据...")
-        logger.info("="*80)
-
-        kline_service = KlineService()
+        log_banner("开始更新K线数据...")
 
         # 调用统一更新方法（内部自动限流）
-        result = await kline_service.update_all_tokens_klines(
+        result = await ctx.kline_service.update_all_tokens_klines(
             timeframe="minute",
             aggregate=5,
             max_candles=500
         )
 
-        logger.info("="*80)
-        logger.info("✅ K线数据更新完成")
-        logger.info(f"  监控代币: {result['monitored']} 个")
-        logger.info(f"  潜力代币: {result['potential']} 个")
-        logger.info(f"  总代币数: {result['total']} 个")
-        logger.info(f"  成功: {result['success']} 个，失败: {result['failed']} 个")
-        logger.info(f"  拉取: {result['total_fetched']} 根，保存: {result['total_saved']} 根")
-        logger.info("="*80)
+        logger.info(
+            "%s\n"
+            "✅ K线数据更新完成\n"
+            "  监控代币: %s 个\n"
+            "  潜力代币: %s 个\n"
+            "  总代币数: %s 个\n"
+            "  成功: %s 个，失败: %s 个\n"
+            "  拉取: %s 根，保存: %s 根\n"
+            "%s",
+            BANNER,
+            result['monitored'], result['potential'], result['total'],
+            result['success'], result['failed'],
+            result['total_fetched'], result['total_saved'],
+            BANNER
+        )
 
     except Exception as e:
-        logger.error(f"❌ 更新K线数据时出错: {e}", exc_info=True)
+        logger.error("❌ 更新K线数据时出错: %s", e, exc_info=True)
 
 
-def shutdown_handler(signum, frame):
+async def cancel_tasks(*tasks: asyncio.Task):
+    """取消任务并等待其结束，让各任务的 finally 完成资源清理"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_jobs(
+    ctx: AppContext,
+    enable_scraper: bool,
+    enable_monitor: bool,
+    update_interval: float,
+    shutdown_event: asyncio.Event
+):
     """
-    优雅关闭处理
+    并发启动各任务的定时循环（每个循环启动时立即执行一次，互不等待）
+
+    Args:
+        ctx: 守护进程运行状态
+        enable_scraper: 是否启用爬虫任务
+        enable_monitor: 是否启用监控和K线任务
+        update_interval: 监控任务间隔（分钟）
+        shutdown_event: 出现不可恢复的错误时用于通知主函数退出
     """
-    global scheduler
-    logger.info("收到关闭信号，正在关闭调度器...")
+    tasks = []
+    if enable_scraper:
+        tasks.append(asyncio.create_task(scrape_loop(ctx)))
 
-    if scheduler:
-        try:
-            scheduler.shutdown(wait=False)
-            logger.info("调度器已关闭")
-        except Exception:
-            pass  # 忽略重复关闭的错误
+    if enable_monitor:
+        tasks.append(asyncio.create_task(
+            run_periodically(functools.partial(monitor_prices_task, ctx), update_interval * 60)
+        ))
+        tasks.append(asyncio.create_task(
+            run_periodically(functools.partial(update_klines_task, ctx), 3600)
+        ))
 
-    # 直接退出（避免程序卡死）
-    import os
-    os._exit(0)
+    try:
+        await asyncio.gather(*tasks)
+    except Exception as e:
+        logger.error("运行时错误: %s", e, exc_info=True)
+        shutdown_event.set()
+    finally:
+        # 取消仍在运行的循环
+        await cancel_tasks(*tasks)
 
 
 async def main():
     """
     主函数：启动调度器
     """
-    global scheduler, monitor_service, enable_scraper
-
     # 解析命令行参数
     parser = argparse.ArgumentParser(
         description='定时任务守护进程：监控代币价格和爬取 DexScreener 数据',
@@ -522,110 +685,112 @@ async def main():
     enable_scraper = not args.monitor_only
     enable_monitor = not args.scraper_only
 
-    # 设置爬取方法
-    global use_undetected_chrome
-    if args.use_undetected_chrome:
-        use_undetected_chrome = True
+    # 设置爬取方法（命令行参数优先于环境变量）
+    use_undetected_chrome = args.use_undetected_chrome or USE_UNDETECTED_CHROME_DEFAULT
 
-    logger.info("="*80)
-    logger.info("定时任务守护进程启动")
     if use_undetected_chrome:
-        logger.info("爬取方法: undetected-chromedriver（高成功率模式）")
+        log_banner("定时任务守护进程启动\n爬取方法: undetected-chromedriver（高成功率模式）")
     else:
-        logger.info("爬取方法: cloudscraper（快速模式）")
-    logger.info("="*80)
-
-    # 注册信号处理
-    signal.signal(signal.SIGINT, shutdown_handler)
-    signal.signal(signal.SIGTERM, shutdown_handler)
+        log_banner("定时任务守护进程启动\n爬取方法: cloudscraper（快速模式）")
 
-    # 初始化服务
-    monitor_service = TokenMonitorService()
+    loop = asyncio.get_running_loop()
 
-    # 创建调度器
-    scheduler = AsyncIOScheduler(timezone='UTC')
+    # Python 3.12+：任务创建时立即执行到第一次真正挂起，减少事件循环调度开销
+    if hasattr(asyncio, 'eager_task_factory'):
+        loop.set_task_factory(asyncio.eager_task_factory)
 
-    # 根据参数添加任务
-    if enable_monitor:
-        # 从数据库读取监控配置
-        monitor_config = await monitor_service.get_monitor_config()
+    # 注册信号处理：只设置关闭事件，由主协程负责有序清理
+    shutdown_event = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, shutdown_event.set)
+        except NotImplementedError:  # Windows 事件循环不支持，Ctrl+C 仍会中断 asyncio.run
+            pass
 
-        if not monitor_config:
-            logger.error("未找到监控配置，使用默认间隔 5 分钟")
-            update_interval = 5
-        else:
-            update_interval = monitor_config.get('update_interval_minutes', 5)
-            logger.info(f"从配置读取更新间隔: {update_interval} 分钟")
-
-        scheduler.add_job(
-            monitor_prices_task,
-            trigger=IntervalTrigger(minutes=update_interval),
-            id='monitor_prices',
-            name='监控代币价格',
-            max_instances=1,
-            coalesce=True,
-            misfire_grace_time=30
-        )
-        logger.info(f"✅ 已启用任务：每 {update_interval} 分钟监控代币价格")
-
-        # K线更新任务：每1小时执行一次
-        scheduler.add_job(
-            update_klines_task,
-            trigger=IntervalTrigger(hours=1),
-            id='update_klines',
-            name='更新K线数据',
-            max_instances=1,
-            coalesce=True,
-            misfire_grace_time=300  # 允许5分钟的延迟
+    async with AsyncExitStack() as stack:
+        # 初始化数据库连接池和服务（所有任务共用，退出时按相反顺序关闭）
+        db_manager = DatabaseManager()
+        stack.push_async_callback(db_manager.close)
+        await db_manager.init_async_db()
+        monitor_service = await stack.enter_async_context(TokenMonitorService(db_manager))
+        kline_service = KlineService(db_manager)
+        stack.push_async_callback(kline_service.close)
+
+        # 阻塞的爬取（cloudscraper / Selenium）放到独立进程中，不影响监控等任务
+        scrape_executor = None
+        if enable_scraper:
+            # 用 spawn 启动爬虫进程：主进程已运行事件循环、日志线程并持有数据库连接，
+            # fork 会继承这些锁和 socket，可能死锁
+            mp_context = multiprocessing.get_context("spawn")
+
+            # 子进程的日志经跨进程队列交给主进程写入同一个日志文件
+            worker_log_queue = mp_context.Queue(-1)
+            worker_log_listener = LogQueueListener(worker_log_queue, file_log_handler, stream_log_handler)
+            worker_log_listener.start()
+            stack.callback(worker_log_listener.stop)
+
+            scrape_executor = ProcessPoolExecutor(
+                max_workers=2,
+                mp_context=mp_context,
+                initializer=_init_scrape_worker,
+                initargs=(worker_log_queue,)
+            )
+            stack.push_async_callback(shutdown_executor, scrape_executor)
+
+        ctx = AppContext(
+            db_manager=db_manager,
+            monitor_service=monitor_service,
+            kline_service=kline_service,
+            use_undetected_chrome=use_undetected_chrome,
+            scrape_executor=scrape_executor
         )
-        logger.info("✅ 已启用任务：每1小时更新K线数据")
 
-    # 启动调度器
-    scheduler.start()
+        # 根据参数确定任务
+        update_interval = 5
+        if enable_monitor:
+            # 从数据库读取监控配置
+            monitor_config = await monitor_service.get_monitor_config()
+
+            if not monitor_config:
+                logger.error("未找到监控配置，使用默认间隔 5 分钟")
+            else:
+                update_interval = monitor_config.get('update_interval_minutes', 5)
+                logger.info("从配置读取更新间隔: %s 分钟", update_interval)
+
+            logger.info("✅ 已启用任务：每 %s 分钟监控代币价格", update_interval)
+            logger.info("✅ 已启用任务：每1小时更新K线数据")
+
+        plan = ["调度器已启动，任务计划："]
+        if enable_scraper:
+            plan.append("  - 随机间隔9-15分钟爬取 DexScreener 首页（BSC + Solana，支持重试机制）")
+        if enable_monitor:
+            plan.append(f"  - 每 {update_interval} 分钟监控代币价格（更新 monitored_tokens 表并触发报警 + 更新 potential_tokens AVE 数据）")
+            plan.append("  - 每1小时更新K线数据（监控代币 + 潜力代币，5分钟K线）")
+        log_section_end("\n".join(plan))
+
+        jobs = asyncio.create_task(
+            run_jobs(ctx, enable_scraper, enable_monitor, update_interval, shutdown_event)
+        )
+        # 退出时先停止任务，再关闭服务和连接池
+        stack.push_async_callback(cancel_tasks, jobs)
 
-    logger.info("调度器已启动，任务计划：")
-    if enable_scraper:
-        logger.info("  - 随机间隔9-15分钟爬取 DexScreener 首页（BSC + Solana，支持重试机制）")
-    if enable_monitor:
-        logger.info(f"  - 每 {update_interval} 分钟监控代币价格（更新 monitored_tokens 表并触发报警 + 更新 potential_tokens AVE 数据）")
-        logger.info("  - 每1小时更新K线数据（监控代币 + 潜力代币，5分钟K线）")
-    logger.info("="*80)
+        # 保持运行，直到收到关闭信号
+        await shutdown_event.wait()
+        logger.info("接收到退出信号，正在关闭服务...")
 
-    # 启动时立即执行一次任务
-    if enable_scraper:
-        logger.info("立即执行一次爬取任务...")
-        await scrape_dexscreener_task()
+    logger.info("✅ 定时任务守护进程已安全关闭")
 
-    if enable_monitor:
-        logger.info("立即执行一次监控任务...")
-        await monitor_prices_task()
-
-        # 启动时也立即执行一次K线更新
-        logger.info("立即执行一次K线更新任务...")
-        await update_klines_task()
+if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:  # 未安装 uvloop（如 Windows）时使用默认事件循环
+        pass
 
-    # 保持运行
+    log_listener.start()
     try:
-        while True:
-            await asyncio.sleep(60)
-    except (KeyboardInterrupt, SystemExit):
-        logger.info("接收到退出信号")
-    except Exception as e:
-        logger.error(f"运行时错误: {e}", exc_info=True)
+        asyncio.run(main())
     finally:
-        logger.info("正在关闭服务...")
-        if scheduler:
-            try:
-                scheduler.shutdown(wait=False)
-            except:
-                pass
-        if monitor_service:
-            try:
-                await monitor_service.close()
-            except:
-                pass
-        logger.info("✅ 定时任务守护进程已安全关闭")
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
+        # 写完队列中剩余的日志后再退出
+        log_listener.stop()
+        file_log_handler.close()
@@ -3,12 +3,19 @@ FastAPI application for blockchain data service.
 Provides REST API endpoints for querying token and market data.
 """
 
-from fastapi import FastAPI, HTTPException, Query, Body
+from fastapi import FastAPI, HTTPException, Query, Body, Depends, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime
 from contextlib import asynccontextmanager
+import functools
+import json
 import logging
+import os
 
 from src.api.schemas import (
     TokenResponse,
@@ -38,7 +45,7 @@ from src.api.schemas import (
 from src.api.services import (
     get_tokens,
     get_token_by_address,
-    get_token_ohlcv,
+    iter_token_ohlcv,
     get_data_source_stats,
     search_tokens,
     initialize_db,
@@ -47,8 +54,18 @@ from src.api.services import (
     search_dexscreener_tokens,
     get_price_swings,
     get_token_swing_stats_list,
-    get_largest_swings
+    get_largest_swings,
+    db_manager,
+    InvalidCursorError
 )
+from src.api.cache import cached, init_cache, close_cache
+from src.services.token_monitor_service import TokenMonitorService
+from src.utils.config import config
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库 JSON 响应
+    orjson = None
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -62,9 +79,97 @@ async def lifespan(app: FastAPI):
     logger.info("Initializing database connection...")
     await initialize_db()
     logger.info("Database initialized successfully")
+    await init_cache()
+    # 所有请求共享一个监控服务实例，复用全局数据库连接池
+    app.state.monitor_service = TokenMonitorService(db_manager)
     yield
-    # 关闭时的清理工作（如果需要）
+    # 关闭时的清理工作
     logger.info("Shutting down...")
+    await app.state.monitor_service.close()
+    await close_cache()
+
+
+def get_monitor_service(request: Request) -> TokenMonitorService:
+    """依赖注入：获取应用共享的监控服务实例"""
+    return request.app.state.monitor_service
+
+
+class PaginationParams:
+    """依赖注入：列表接口共用的分页参数"""
+
+    def __init__(
+        self,
+        page: int = Query(1, ge=1, description="页码，从1开始"),
+        page_size: int = Query(20, ge=1, le=100, description="每页数量，最大100")
+    ):
+        self.page = page
+        self.page_size = page_size
+
+
+def handle_service_errors(message: str):
+    """
+    接口统一错误处理：HTTPException 原样抛出，无效分页游标返回 400，其他异常记录日志并返回 500
+
+    Args:
+        message: 日志中的错误描述
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except HTTPException:
+                raise
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                logger.error(f"{message}: {e}")
+                raise HTTPException(status_code=500, detail=str(e))
+        return wrapper
+    return decorator
+
+
+# 热点查询的 Redis 读穿缓存（列表 60 秒，统计 5 分钟；未启用 Redis 时直接查询数据库）
+cached_get_tokens = cached(60, "tokens", TokenListResponse)(get_tokens)
+cached_get_dexscreener_tokens = cached(60, "dexscreener_tokens", DexScreenerTokenListResponse)(get_dexscreener_tokens)
+cached_get_data_source_stats = cached(300, "stats", StatsResponse)(get_data_source_stats)
+cached_get_largest_swings = cached(300, "largest_swings", List[PriceSwingResponse])(get_largest_swings)
+
+
+def model_list_response(items: List[BaseModel]) -> JSONResponse:
+    """
+    直接序列化已构造好的响应模型列表，跳过 response_model 的再次校验
+
+    Args:
+        items: 响应模型列表
+
+    Returns:
+        JSON 响应（安装了 orjson 时使用 ORJSONResponse）
+    """
+    if orjson is not None:
+        # orjson 原生支持 datetime，model_dump() 即可，无需 jsonable_encoder
+        return ORJSONResponse([item.model_dump() for item in items])
+    return JSONResponse(jsonable_encoder(items))
+
+
+def _dump_json(obj: Any) -> bytes:
+    """序列化单个 JSON 值（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(jsonable_encoder(obj), ensure_ascii=False).encode()
+
+
+async def _stream_json_array(first: Dict[str, Any], rest: AsyncIterator[Dict[str, Any]]):
+    """将行迭代器逐行输出为 JSON 数组，first 为调用方已取出的第一行"""
+    yield b"[" + _dump_json(first)
+    try:
+        async for row in rest:
+            yield b"," + _dump_json(row)
+    except Exception as e:
+        # 响应头已发送，无法再返回 500，只能记录日志并截断响应
+        logger.error(f"Error streaming JSON array: {e}")
+        raise
+    yield b"]"
 
 
 # 创建 FastAPI 应用
@@ -74,18 +179,24 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse
 )
 
-# 配置 CORS - 允许前端跨域访问
+# 配置 CORS - 允许前端跨域访问（生产环境通过 CORS_ORIGINS 设置具体的域名）
+# 预检结果让浏览器缓存 24 小时，减少 OPTIONS 请求
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # 生产环境应该设置具体的域名
+    allow_origins=config.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    allow_headers=["authorization", "content-type"],
+    max_age=86400,
 )
 
+# 压缩较大的 JSON 响应（仅在客户端 Accept-Encoding 包含 gzip 时生效）
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 @app.get("/")
 async def root():
@@ -116,12 +227,13 @@ async def health_check():
 
 
 @app.get("/api/tokens", response_model=TokenListResponse)
+@handle_service_errors("Error getting tokens")
 async def list_tokens(
-    page: int = Query(1, ge=1, description="页码，从1开始"),
-    page_size: int = Query(20, ge=1, le=100, description="每页数量，最大100"),
+    pagination: PaginationParams = Depends(),
     data_source: Optional[str] = Query(None, description="数据来源过滤：ave, legacy等"),
     min_market_cap: Optional[float] = Query(None, description="最小市值（美元）"),
-    symbol: Optional[str] = Query(None, description="代币符号过滤")
+    symbol: Optional[str] = Query(None, description="代币符号过滤"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor），传入时忽略 page")
 ):
     """
     获取代币列表
@@ -131,18 +243,15 @@ async def list_tokens(
     - min_market_cap: 按最小市值过滤
     - symbol: 按代币符号过滤
     """
-    try:
-        result = await get_tokens(
-            page=page,
-            page_size=page_size,
-            data_source=data_source,
-            min_market_cap=min_market_cap,
-            symbol=symbol
-        )
-        return result
-    except Exception as e:
-        logger.error(f"Error getting tokens: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await cached_get_tokens(
+        page=pagination.page,
+        page_size=pagination.page_size,
+        data_source=data_source,
+        min_market_cap=min_market_cap,
+        symbol=symbol,
+        cursor=cursor
+    )
+    return result
 
 
 @app.get("/api/tokens/{address}", response_model=TokenResponse)
@@ -165,7 +274,11 @@ async def get_token_detail(address: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/tokens/{address}/ohlcv", response_model=List[OHLCVResponse])
+@app.get(
+    "/api/tokens/{address}/ohlcv",
+    response_model=None,
+    responses={200: {"model": List[OHLCVResponse]}}
+)
 async def get_token_klines(
     address: str,
     interval: Optional[str] = Query("1d", description="时间间隔：1h, 4h, 1d等"),
@@ -180,13 +293,16 @@ async def get_token_klines(
     - limit: 返回的K线数量
     """
     try:
-        ohlcv_data = await get_token_ohlcv(address, interval, limit)
-        if not ohlcv_data:
+        # 流式输出：先取出第一行以便在发送响应头前判断 404
+        rows = iter_token_ohlcv(address, interval, limit)
+        try:
+            first = await rows.__anext__()
+        except StopAsyncIteration:
             raise HTTPException(
                 status_code=404,
                 detail=f"No OHLCV data found for token {address}"
             )
-        return ohlcv_data
+        return StreamingResponse(_stream_json_array(first, rows), media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
@@ -195,52 +311,46 @@ async def get_token_klines(
 
 
 @app.get("/api/search", response_model=TokenListResponse)
+@handle_service_errors("Error searching tokens")
 async def search_tokens_endpoint(
     q: str = Query(..., min_length=1, description="搜索关键词：代币名称、符号或地址"),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100)
+    pagination: PaginationParams = Depends()
 ):
     """
     搜索代币
 
     支持按名称、符号、地址搜索
     """
-    try:
-        result = await search_tokens(q, page, page_size)
-        return result
-    except Exception as e:
-        logger.error(f"Error searching tokens: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await search_tokens(q, pagination.page, pagination.page_size)
+    return result
 
 
 @app.get("/api/stats", response_model=StatsResponse)
+@handle_service_errors("Error getting stats")
 async def get_statistics():
     """
     获取数据统计信息
 
     返回各数据源的代币数量、OHLCV记录数等统计信息
     """
-    try:
-        stats = await get_data_source_stats()
-        return stats
-    except Exception as e:
-        logger.error(f"Error getting stats: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    stats = await cached_get_data_source_stats()
+    return stats
 
 
 # ==================== DexScreener API Endpoints ====================
 
-@app.get("/api/dexscreener/tokens", response_model=DexScreenerTokenListResponse)
+@app.get("/api/dexscreener/tokens", response_model=DexScreenerTokenListResponse, response_model_exclude_none=True)
+@handle_service_errors("Error getting dexscreener tokens")
 async def list_dexscreener_tokens(
-    page: int = Query(1, ge=1, description="页码，从1开始"),
-    page_size: int = Query(20, ge=1, le=100, description="每页数量，最大100"),
+    pagination: PaginationParams = Depends(),
     chain_id: Optional[str] = Query(None, description="链ID过滤：bsc, eth等"),
     dex_id: Optional[str] = Query(None, description="DEX ID过滤：pancakeswap, uniswap等"),
     min_liquidity: Optional[float] = Query(None, description="最小流动性（美元）"),
     min_market_cap: Optional[float] = Query(None, description="最小市值（美元）"),
     symbol: Optional[str] = Query(None, description="代币符号过滤"),
     sort_by: str = Query("market_cap", description="排序字段：market_cap, liquidity_usd, volume_h24, price_change_h24"),
-    sort_order: str = Query("desc", description="排序方向：asc, desc")
+    sort_order: str = Query("desc", description="排序方向：asc, desc"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor），传入时忽略 page")
 ):
     """
     获取DexScreener代币列表
@@ -254,22 +364,19 @@ async def list_dexscreener_tokens(
     - sort_by: 排序字段
     - sort_order: 排序方向
     """
-    try:
-        result = await get_dexscreener_tokens(
-            page=page,
-            page_size=page_size,
-            chain_id=chain_id,
-            dex_id=dex_id,
-            min_liquidity=min_liquidity,
-            min_market_cap=min_market_cap,
-            symbol=symbol,
-            sort_by=sort_by,
-            sort_order=sort_order
-        )
-        return result
-    except Exception as e:
-        logger.error(f"Error getting dexscreener tokens: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await cached_get_dexscreener_tokens(
+        page=pagination.page,
+        page_size=pagination.page_size,
+        chain_id=chain_id,
+        dex_id=dex_id,
+        min_liquidity=min_liquidity,
+        min_market_cap=min_market_cap,
+        symbol=symbol,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        cursor=cursor
+    )
+    return result
 
 
 @app.get("/api/dexscreener/pairs/{pair_address}", response_model=DexScreenerTokenResponse)
@@ -296,41 +403,33 @@ async def get_dexscreener_pair_detail(pair_address: str):
 
 
 @app.get("/api/dexscreener/search", response_model=DexScreenerTokenListResponse)
+@handle_service_errors("Error searching dexscreener tokens")
 async def search_dexscreener_tokens_endpoint(
     q: str = Query(..., min_length=1, description="搜索关键词：代币名称、符号或地址"),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100)
+    pagination: PaginationParams = Depends()
 ):
     """
     搜索DexScreener代币
 
     支持按名称、符号、地址搜索
     """
-    try:
-        result = await search_dexscreener_tokens(q, page, page_size)
-        return result
-    except Exception as e:
-        logger.error(f"Error searching dexscreener tokens: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    result = await search_dexscreener_tokens(q, pagination.page, pagination.page_size)
+    return result
 
 
 # ==================== Price Swings API Endpoints ====================
 
 @app.get("/api/price-swings", response_model=PriceSwingListResponse)
+@handle_service_errors("Error getting price swings")
 async def list_price_swings(
-    page: int = Query(1, ge=1, description="页码，从1开始"),
-    page_size: int = Query(20, ge=1, le=100, description="每页数量，最大100"),
+    pagination: PaginationParams = Depends(),
     token_id: Optional[str] = Query(None, description="代币ID过滤"),
     symbol: Optional[str] = Query(None, description="代币符号过滤"),
     swing_type: Optional[str] = Query(None, description="波动类型过滤：rise, fall"),
     min_swing_pct: Optional[float] = Query(None, description="最小波动幅度（百分比）"),
     sort_by: str = Query("start_time", description="排序字段：start_time, swing_pct, duration_hours"),
-    sort_order: str = Query("desc", description="排序方向：asc, desc")
+    sort_order: str = Query("desc", description="排序方向：asc, desc"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor），传入时忽略 page")
 ):
     """
     获取价格波动列表
@@ -343,27 +442,24 @@ async def list_price_swings(
     - sort_by: 排序字段
     - sort_order: 排序方向
     """
-    try:
-        result = await get_price_swings(
-            page=page,
-            page_size=page_size,
-            token_id=token_id,
-            symbol=symbol,
-            swing_type=swing_type,
-            min_swing_pct=min_swing_pct,
-            sort_by=sort_by,
-            sort_order=sort_order
-        )
-        return result
-    except Exception as e:
-        logger.error(f"Error getting price swings: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await get_price_swings(
+        page=pagination.page,
+        page_size=pagination.page_size,
+        token_id=token_id,
+        symbol=symbol,
+        swing_type=swing_type,
+        min_swing_pct=min_swing_pct,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        cursor=cursor
+    )
+    return result
 
 
 @app.get("/api/price-swings/stats", response_model=TokenSwingStatsListResponse)
+@handle_service_errors("Error getting token swing stats")
 async def list_token_swing_stats(
-    page: int = Query(1, ge=1, description="页码，从1开始"),
-    page_size: int = Query(20, ge=1, le=100, description="每页数量，最大100"),
+    pagination: PaginationParams = Depends(),
     min_swings: Optional[int] = Query(None, description="最小波动次数过滤"),
     min_liquidity: Optional[float] = Query(None, description="最小流动性（美元）"),
     sort_by: str = Query("total_swings", description="排序字段：total_swings, max_rise_pct, max_fall_pct, liquidity_usd"),
@@ -379,22 +475,23 @@ async def list_token_swing_stats(
     - 平均持续时长
     - 当前价格和市场数据
     """
-    try:
-        result = await get_token_swing_stats_list(
-            page=page,
-            page_size=page_size,
-            min_swings=min_swings,
-            min_liquidity=min_liquidity,
-            sort_by=sort_by,
-            sort_order=sort_order
-        )
-        return result
-    except Exception as e:
-        logger.error(f"Error getting token swing stats: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.get("/api/price-swings/top-rises", response_model=List[PriceSwingResponse])
+    result = await get_token_swing_stats_list(
+        page=pagination.page,
+        page_size=pagination.page_size,
+        min_swings=min_swings,
+        min_liquidity=min_liquidity,
+        sort_by=sort_by,
+        sort_order=sort_order
+    )
+    return result
+
+
+@app.get(
+    "/api/price-swings/top-rises",
+    response_model=None,
+    responses={200: {"model": List[PriceSwingResponse]}}
+)
+@handle_service_errors("Error getting top rises")
 async def get_top_rises(
     limit: int = Query(10, ge=1, le=100, description="返回数量，最大100")
 ):
@@ -403,15 +500,16 @@ async def get_top_rises(
 
     返回历史上涨幅最大的价格波动记录
     """
-    try:
-        result = await get_largest_swings(swing_type="rise", limit=limit)
-        return result
-    except Exception as e:
-        logger.error(f"Error getting top rises: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await cached_get_largest_swings(swing_type="rise", limit=limit)
+    return model_list_response(result)
 
 
-@app.get("/api/price-swings/top-falls", response_model=List[PriceSwingResponse])
+@app.get(
+    "/api/price-swings/top-falls",
+    response_model=None,
+    responses={200: {"model": List[PriceSwingResponse]}}
+)
+@handle_service_errors("Error getting top falls")
 async def get_top_falls(
     limit: int = Query(10, ge=1, le=100, description="返回数量，最大100")
 ):
@@ -420,18 +518,18 @@ async def get_top_falls(
 
     返回历史上跌幅最大的价格波动记录
     """
-    try:
-        result = await get_largest_swings(swing_type="fall", limit=limit)
-        return result
-    except Exception as e:
-        logger.error(f"Error getting top falls: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await cached_get_largest_swings(swing_type="fall", limit=limit)
+    return model_list_response(result)
 
 
 # ==================== 代币监控 API ====================
 
 @app.post("/api/monitor/scrape-top-gainers", response_model=ScrapeTopGainersResponse)
-async def scrape_top_gainers(request: ScrapeTopGainersRequest):
+@handle_service_errors("Error scraping top gainers")
+async def scrape_top_gainers(
+    request: ScrapeTopGainersRequest,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
+):
     """
     抓取DexScreener首页涨幅榜，添加Top N到监控列表
 
@@ -446,60 +544,46 @@ async def scrape_top_gainers(request: ScrapeTopGainersRequest):
         drop_threshold: 跌幅报警阈值，默认20%
         headless: 是否使用无头浏览器
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
-    try:
-        result = await monitor_service.scrape_and_add_top_gainers(
-            count=request.count,
-            top_n=request.top_n,
-            drop_threshold=request.drop_threshold,
-            headless=request.headless
-        )
-        return ScrapeTopGainersResponse(**result)
-    except Exception as e:
-        logger.error(f"Error scraping top gainers: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
+    result = await monitor_service.scrape_and_add_top_gainers(
+        count=request.count,
+        top_n=request.top_n,
+        drop_threshold=request.drop_threshold,
+        headless=request.headless
+    )
+    return ScrapeTopGainersResponse(**result)
 
 
 @app.post("/api/monitor/update-prices", response_model=UpdateMonitoredPricesResponse)
+@handle_service_errors("Error updating monitored prices")
 async def update_monitored_prices(
     batch_size: int = Query(10, ge=1, le=50, description="批处理大小"),
-    delay: float = Query(0.5, ge=0.1, le=5.0, description="批次间延迟（秒）")
+    concurrency: int = Query(8, ge=1, le=20, description="AVE API 最大并发请求数"),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """
     更新所有监控代币的价格，检查并触发报警
 
     该接口会：
     1. 获取所有active状态的监控代币
-    2. 批量获取当前价格
+    2. 并发获取当前价格（最多 concurrency 个请求同时进行）
     3. 更新最高价（peak_price）
     4. 计算跌幅，触发报警
 
     建议使用定时任务定期调用（如每5-10分钟）
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
-    try:
-        result = await monitor_service.update_monitored_prices(
-            batch_size=batch_size,
-            delay=delay
-        )
-        return UpdateMonitoredPricesResponse(**result)
-    except Exception as e:
-        logger.error(f"Error updating monitored prices: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
+    result = await monitor_service.update_monitored_prices(
+        batch_size=batch_size,
+        concurrency=concurrency
+    )
+    return UpdateMonitoredPricesResponse(**result)
 
 
-@app.get("/api/monitor/tokens", response_model=MonitoredTokenListResponse)
+@app.get("/api/monitor/tokens", response_model=MonitoredTokenListResponse, response_model_exclude_none=True)
+@handle_service_errors("Error getting monitored tokens")
 async def get_monitored_tokens(
     limit: int = Query(100, ge=1, le=500, description="返回数量"),
-    status: Optional[str] = Query(None, description="状态过滤: active/alerted/stopped，不传则返回所有")
+    status: Optional[str] = Query(None, description="状态过滤: active/alerted/stopped，不传则返回所有"),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """
     获取监控代币列表
@@ -515,26 +599,18 @@ async def get_monitored_tokens(
     - 涨跌幅信息
     - 完整的AVE API数据（60+字段）
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
-    try:
-        tokens = await monitor_service.get_monitored_tokens(limit=limit, status=status)
-        return MonitoredTokenListResponse(
-            total=len(tokens),
-            data=tokens
-        )
-    except Exception as e:
-        logger.error(f"Error getting monitored tokens: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
+    tokens = await monitor_service.get_monitored_tokens(limit=limit, status=status)
+    return MonitoredTokenListResponse(
+        total=len(tokens),
+        data=tokens
+    )
 
 
 @app.patch("/api/monitor/tokens/{token_id}/thresholds", response_model=MonitoredTokenResponse)
 async def update_alert_thresholds(
     token_id: str,
-    request: UpdateAlertThresholdsRequest
+    request: UpdateAlertThresholdsRequest,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """
     更新监控代币的报警阈值
@@ -546,7 +622,6 @@ async def update_alert_thresholds(
 
     阈值必须是0-100之间的数字，表示从历史最高价(ATH)的跌幅百分比
     """
-    from src.services.token_monitor_service import TokenMonitorService
     from src.storage.models import MonitoredToken
     from sqlalchemy import select
 
@@ -558,9 +633,8 @@ async def update_alert_thresholds(
                 detail=f"阈值必须在0-100之间，收到: {threshold}"
             )
 
-    monitor_service = TokenMonitorService()
     try:
-        async with monitor_service.db.get_session() as session:
+        async with monitor_service.db_manager.get_session() as session:
             # 查询代币
             result = await session.execute(
                 select(MonitoredToken).where(MonitoredToken.id == token_id)
@@ -587,15 +661,15 @@ async def update_alert_thresholds(
     except Exception as e:
         logger.error(f"更新报警阈值时出错: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 @app.get("/api/monitor/alerts", response_model=PriceAlertListResponse)
+@handle_service_errors("Error getting price alerts")
 async def get_price_alerts(
     limit: int = Query(50, ge=1, le=200, description="返回数量"),
     acknowledged: Optional[bool] = Query(None, description="是否已确认（true/false/null=全部）"),
-    severity: Optional[str] = Query(None, description="严重程度：low/medium/high/critical")
+    severity: Optional[str] = Query(None, description="严重程度：low/medium/high/critical"),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """
     获取价格报警列表
@@ -606,32 +680,25 @@ async def get_price_alerts(
 
     按触发时间倒序排列
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
-    try:
-        alerts = await monitor_service.get_alerts(
-            limit=limit,
-            acknowledged=acknowledged,
-            severity=severity
-        )
-        return PriceAlertListResponse(
-            total=len(alerts),
-            data=alerts
-        )
-    except Exception as e:
-        logger.error(f"Error getting price alerts: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
+    alerts = await monitor_service.get_alerts(
+        limit=limit,
+        acknowledged=acknowledged,
+        severity=severity
+    )
+    return PriceAlertListResponse(
+        total=len(alerts),
+        data=alerts
+    )
 
 
 # ==================== 潜力币种相关端点 ====================
 
 @app.get("/api/potential-tokens", response_model=PotentialTokenListResponse)
+@handle_service_errors("Error getting potential tokens")
 async def get_potential_tokens(
     limit: int = Query(100, ge=1, le=500, description="返回数量"),
-    only_not_added: bool = Query(False, description="仅返回未添加到监控的代币")
+    only_not_added: bool = Query(False, description="仅返回未添加到监控的代币"),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """
     获取潜力币种列表（爬取的 Top Gainers）
@@ -645,27 +712,21 @@ async def get_potential_tokens(
     - limit: 返回数量
     - only_not_added: 仅显示未添加到监控的代币
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
-    try:
-        tokens = await monitor_service.get_potential_tokens(
-            limit=limit,
-            only_not_added=only_not_added
-        )
-        return PotentialTokenListResponse(
-            total=len(tokens),
-            data=tokens
-        )
-    except Exception as e:
-        logger.error(f"Error getting potential tokens: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
+    tokens = await monitor_service.get_potential_tokens(
+        limit=limit,
+        only_not_added=only_not_added
+    )
+    return PotentialTokenListResponse(
+        total=len(tokens),
+        data=tokens
+    )
 
 
 @app.post("/api/monitor/add-from-potential")
-async def add_potential_to_monitoring(request: AddToMonitoringRequest):
+async def add_potential_to_monitoring(
+    request: AddToMonitoringRequest,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
+):
     """
     从潜力币种添加到监控表
 
@@ -678,9 +739,6 @@ async def add_potential_to_monitoring(request: AddToMonitoringRequest):
     响应：
     - 包含新创建的监控代币信息
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
     try:
         result = await monitor_service.add_potential_to_monitoring(
             potential_token_id=request.potential_token_id,
@@ -693,12 +751,13 @@ async def add_potential_to_monitoring(request: AddToMonitoringRequest):
     except Exception as e:
         logger.error(f"Error adding potential token to monitoring: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 @app.delete("/api/potential-tokens/{potential_token_id}")
-async def delete_potential_token(potential_token_id: str):
+async def delete_potential_token(
+    potential_token_id: str,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
+):
     """
     删除潜力币种
 
@@ -707,9 +766,6 @@ async def delete_potential_token(potential_token_id: str):
     路径参数：
     - potential_token_id: 潜力币种ID
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
     try:
         result = await monitor_service.delete_potential_token(potential_token_id)
         return result
@@ -719,13 +775,13 @@ async def delete_potential_token(potential_token_id: str):
     except Exception as e:
         logger.error(f"Error deleting potential token: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 @app.get("/api/potential-tokens/deleted", response_model=PotentialTokenListResponse)
+@handle_service_errors("Error getting deleted potential tokens")
 async def get_deleted_potential_tokens(
-    limit: int = Query(100, ge=1, le=500, description="返回数量")
+    limit: int = Query(100, ge=1, le=500, description="返回数量"),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """
     获取已删除的潜力代币列表
@@ -735,24 +791,18 @@ async def get_deleted_potential_tokens(
     路径参数：
     - limit: 返回数量，默认100
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
-    try:
-        tokens = await monitor_service.get_deleted_potential_tokens(limit=limit)
-        return PotentialTokenListResponse(
-            total=len(tokens),
-            data=tokens
-        )
-    except Exception as e:
-        logger.error(f"Error getting deleted potential tokens: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
+    tokens = await monitor_service.get_deleted_potential_tokens(limit=limit)
+    return PotentialTokenListResponse(
+        total=len(tokens),
+        data=tokens
+    )
 
 
 @app.post("/api/potential-tokens/{potential_token_id}/restore")
-async def restore_potential_token(potential_token_id: str):
+async def restore_potential_token(
+    potential_token_id: str,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
+):
     """
     恢复已删除的潜力代币
 
@@ -761,9 +811,6 @@ async def restore_potential_token(potential_token_id: str):
     路径参数：
     - potential_token_id: 潜力代币ID
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
     try:
         result = await monitor_service.restore_potential_token(potential_token_id)
         return result
@@ -773,12 +820,13 @@ async def restore_potential_token(potential_token_id: str):
     except Exception as e:
         logger.error(f"Error restoring potential token: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 @app.delete("/api/monitor/tokens/{monitored_token_id}")
-async def delete_monitored_token(monitored_token_id: str):
+async def delete_monitored_token(
+    monitored_token_id: str,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
+):
     """
     软删除监控代币
 
@@ -787,9 +835,6 @@ async def delete_monitored_token(monitored_token_id: str):
     路径参数：
     - monitored_token_id: 监控代币ID
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
     try:
         result = await monitor_service.delete_monitored_token(monitored_token_id)
         return result
@@ -799,13 +844,13 @@ async def delete_monitored_token(monitored_token_id: str):
     except Exception as e:
         logger.error(f"Error deleting monitored token: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 @app.get("/api/monitor/tokens/deleted", response_model=MonitoredTokenListResponse)
+@handle_service_errors("Error getting deleted monitored tokens")
 async def get_deleted_monitored_tokens(
-    limit: int = Query(100, ge=1, le=500, description="返回数量")
+    limit: int = Query(100, ge=1, le=500, description="返回数量"),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """
     获取已删除的监控代币列表
@@ -815,24 +860,18 @@ async def get_deleted_monitored_tokens(
     路径参数：
     - limit: 返回数量，默认100
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
-    try:
-        tokens = await monitor_service.get_deleted_monitored_tokens(limit=limit)
-        return MonitoredTokenListResponse(
-            total=len(tokens),
-            data=tokens
-        )
-    except Exception as e:
-        logger.error(f"Error getting deleted monitored tokens: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
+    tokens = await monitor_service.get_deleted_monitored_tokens(limit=limit)
+    return MonitoredTokenListResponse(
+        total=len(tokens),
+        data=tokens
+    )
 
 
 @app.post("/api/monitor/tokens/{monitored_token_id}/restore")
-async def restore_monitored_token(monitored_token_id: str):
+async def restore_monitored_token(
+    monitored_token_id: str,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
+):
     """
     恢复已删除的监控代币
 
@@ -841,9 +880,6 @@ async def restore_monitored_token(monitored_token_id: str):
     路径参数：
     - monitored_token_id: 监控代币ID
     """
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
     try:
         result = await monitor_service.restore_monitored_token(monitored_token_id)
         return result
@@ -853,8 +889,6 @@ async def restore_monitored_token(monitored_token_id: str):
     except Exception as e:
         logger.error(f"Error restoring monitored token: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 # ==================== 爬虫配置 API ====================
@@ -914,7 +948,8 @@ async def update_scraper_config(
     max_token_age_days: Optional[int] = Body(None, ge=0),
     use_undetected_chrome: Optional[int] = Body(None, ge=0, le=1),
     enabled: Optional[int] = Body(None, ge=0, le=1),
-    description: Optional[str] = Body(None)
+    description: Optional[str] = Body(None),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """更新爬虫配置（接收 JSON body）
 
@@ -969,6 +1004,9 @@ async def update_scraper_config(
             await session.commit()
             await session.refresh(config)
 
+            # 共享的监控服务缓存了配置，立即失效，让新阈值在下次更新时生效
+            monitor_service.invalidate_config_cache()
+
             return {"success": True, "message": "配置已更新"}
     except Exception as e:
         logger.error(f"Error updating scraper config: {e}")
@@ -980,10 +1018,10 @@ async def add_monitoring_by_pair_address(
     pair_address: str = Body(...),
     chain: str = Body("bsc"),
     drop_threshold: float = Body(20.0, ge=0, le=100),
-    alert_thresholds: Optional[str] = Body(None)
+    alert_thresholds: Optional[str] = Body(None),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """通过 pair 地址手动添加监控代币（接收 JSON body）"""
-    from src.services.token_monitor_service import TokenMonitorService
 
     # 解析 alert_thresholds（支持逗号分隔字符串）
     custom_thresholds = None
@@ -993,7 +1031,6 @@ async def add_monitoring_by_pair_address(
         except (ValueError, AttributeError):
             raise HTTPException(status_code=400, detail="阈值格式错误，应为逗号分隔的数字，如 '70,80,90'")
 
-    monitor_service = TokenMonitorService()
     try:
         result = await monitor_service.add_monitoring_by_pair(
             pair_address=pair_address,
@@ -1007,16 +1044,14 @@ async def add_monitoring_by_pair_address(
     except Exception as e:
         logger.error(f"Error adding monitoring by pair: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 @app.delete("/api/monitor/tokens/{token_id}/permanent")
-async def permanently_delete_monitored_token(token_id: str):
+async def permanently_delete_monitored_token(
+    token_id: str,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
+):
     """彻底删除监控代币（permanently_deleted=1）"""
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
     try:
         result = await monitor_service.permanently_delete_monitored_token(token_id)
         return result
@@ -1025,16 +1060,14 @@ async def permanently_delete_monitored_token(token_id: str):
     except Exception as e:
         logger.error(f"Error permanently deleting monitored token: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 @app.delete("/api/potential-tokens/{token_id}/permanent")
-async def permanently_delete_potential_token(token_id: str):
+async def permanently_delete_potential_token(
+    token_id: str,
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
+):
     """彻底删除潜力代币（permanently_deleted=1）"""
-    from src.services.token_monitor_service import TokenMonitorService
-
-    monitor_service = TokenMonitorService()
     try:
         result = await monitor_service.permanently_delete_potential_token(token_id)
         return result
@@ -1043,8 +1076,6 @@ async def permanently_delete_potential_token(token_id: str):
     except Exception as e:
         logger.error(f"Error permanently deleting potential token: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await monitor_service.close()
 
 
 @app.get("/api/scraper/stats")
@@ -1199,7 +1230,8 @@ async def update_monitor_config(
     enabled: Optional[int] = Body(None, ge=0, le=1),
     max_retry_count: Optional[int] = Body(None, ge=1, le=10),
     batch_size: Optional[int] = Body(None, ge=1, le=100),
-    description: Optional[str] = Body(None)
+    description: Optional[str] = Body(None),
+    monitor_service: TokenMonitorService = Depends(get_monitor_service)
 ):
     """更新监控配置（接收 JSON body）
 
@@ -1246,6 +1278,9 @@ async def update_monitor_config(
             await session.commit()
             await session.refresh(config)
 
+            # 共享的监控服务缓存了配置，立即失效，让新阈值在下次更新时生效
+            monitor_service.invalidate_config_cache()
+
             return {"success": True, "message": "监控配置已更新"}
     except Exception as e:
         logger.error(f"Error updating monitor config: {e}")
@@ -1461,3 +1496,20 @@ async def get_klines(
     except Exception as e:
         logger.error(f"Error getting klines: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # 与 run_api.py 相同：已安装时使用 uvloop + httptools，多进程时通过导入路径加载应用
+    # 默认单进程：每个工作进程各自持有一个数据库连接池（DB_POOL_SIZE + DB_MAX_OVERFLOW），
+    # 增加 API_WORKERS 前先确认 PostgreSQL 的 max_connections
+    uvicorn.run(
+        "src.api.app:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("API_WORKERS", 1)),
+        loop="auto",
+        http="httptools",
+        log_level="info"
+    )
@@ -0,0 +1,116 @@
+"""
+Redis read-through cache for hot API queries.
+Caching is skipped entirely when Redis is disabled or unavailable.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from pydantic import TypeAdapter
+
+from src.utils.config import config
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # 未安装 redis 时不启用缓存
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Redis 客户端（内部维护连接池），在应用 lifespan 中创建和关闭
+_redis: Optional["aioredis.Redis"] = None
+
+
+async def init_cache():
+    """创建 Redis 客户端（未配置 USE_REDIS/REDIS_URL 或未安装 redis 时不启用缓存）"""
+    global _redis
+
+    if not (config.USE_REDIS and config.REDIS_URL):
+        logger.info("Redis cache disabled")
+        return
+    if aioredis is None:
+        logger.warning("USE_REDIS is set but the redis package is not installed, cache disabled")
+        return
+
+    client = aioredis.from_url(config.REDIS_URL)
+    try:
+        await client.ping()
+    except Exception as e:
+        logger.warning(f"Redis unavailable, cache disabled: {e}")
+        await client.aclose()
+        return
+
+    _redis = client
+    logger.info("Redis cache enabled")
+
+
+async def close_cache():
+    """关闭 Redis 客户端"""
+    global _redis
+
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+def cached(
+    ttl: int,
+    key_prefix: str,
+    response_type: Any
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    异步查询函数的 Redis 读穿缓存装饰器
+
+    缓存键为 key_prefix 加调用参数的哈希；命中时从 JSON 反序列化为 response_type，
+    未命中时执行查询并写入缓存。Redis 出错时直接查询，不影响接口可用性。
+
+    Args:
+        ttl: 缓存有效期（秒）
+        key_prefix: 缓存键前缀
+        response_type: 返回值类型（Pydantic 模型或 List[模型]），用于序列化和反序列化
+
+    Returns:
+        装饰器
+    """
+    adapter = TypeAdapter(response_type)
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            if _redis is None:
+                return await func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            digest = hashlib.sha1(
+                json.dumps(bound.arguments, sort_keys=True, default=str).encode()
+            ).hexdigest()
+            key = f"{key_prefix}:{digest}"
+
+            try:
+                raw = await _redis.get(key)
+                if raw is not None:
+                    return adapter.validate_json(raw)
+            except Exception as e:
+                logger.warning(f"Redis get failed for {key}: {e}")
+
+            result = await func(*args, **kwargs)
+
+            try:
+                await _redis.set(key, adapter.dump_json(result), ex=ttl)
+            except Exception as e:
+                logger.warning(f"Redis set failed for {key}: {e}")
+
+            return result
+
+        return wrapper
+
+    return decorator
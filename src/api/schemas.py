@@ -51,10 +51,11 @@ class TokenResponse(TokenBase):
 
 class TokenListResponse(BaseModel):
     """代币列表响应"""
-    total: int = Field(..., description="总数量")
+    total: Optional[int] = Field(None, description="总数量（游标分页时不返回）")
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页数量")
     data: List[TokenResponse] = Field(..., description="代币列表")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为空")
 
 
 class OHLCVResponse(BaseModel):
@@ -186,10 +187,11 @@ class DexScreenerTokenResponse(BaseModel):
 
 class DexScreenerTokenListResponse(BaseModel):
     """DexScreener代币列表响应"""
-    total: int = Field(..., description="总数量")
+    total: Optional[int] = Field(None, description="总数量（游标分页时不返回）")
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页数量")
     data: List[DexScreenerTokenResponse] = Field(..., description="代币列表")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为空")
 
 
 class PriceSwingResponse(BaseModel):
@@ -224,10 +226,11 @@ class PriceSwingResponse(BaseModel):
 
 class PriceSwingListResponse(BaseModel):
     """价格波动列表响应"""
-    total: int = Field(..., description="总数量")
+    total: Optional[int] = Field(None, description="总数量（游标分页时不返回）")
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页数量")
     data: List[PriceSwingResponse] = Field(..., description="波动列表")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为空")
 
 
 class TokenSwingStats(BaseModel):
@@ -3,9 +3,14 @@ Service layer for API endpoints.
 Handles business logic and database queries.
 """
 
-from typing import List, Optional, Dict, Any
-from sqlalchemy import select, func, or_, desc
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import select, func, or_, and_, desc, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import base64
+import json
 import logging
 
 from src.storage.db_manager import DatabaseManager
@@ -13,7 +18,6 @@ from src.storage.models import Token, TokenOHLCV, TokenPair, TokenMetrics, DexSc
 from src.api.schemas import (
     TokenResponse,
     TokenListResponse,
-    OHLCVResponse,
     StatsResponse,
     DataSourceStats,
     DexScreenerTokenResponse,
@@ -31,6 +35,86 @@ logger = logging.getLogger(__name__)
 db_manager = DatabaseManager()
 
 
+class InvalidCursorError(ValueError):
+    """分页游标格式无效"""
+
+
+def _encode_cursor(sort_value: Any, row_id: str) -> str:
+    """
+    将最后一行的 (排序值, id) 编码为不透明的分页游标
+
+    Args:
+        sort_value: 排序字段的值（datetime / Decimal / 数字 / None）
+        row_id: 行ID
+
+    Returns:
+        URL 安全的 base64 字符串
+    """
+    if isinstance(sort_value, datetime):
+        payload = ["dt", sort_value.isoformat(), row_id]
+    elif isinstance(sort_value, Decimal):
+        payload = ["dec", str(sort_value), row_id]
+    else:
+        payload = [None, sort_value, row_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """
+    解码分页游标
+
+    Args:
+        cursor: _encode_cursor 生成的游标
+
+    Returns:
+        (排序值, id)
+
+    Raises:
+        InvalidCursorError: 游标格式无效
+    """
+    try:
+        kind, sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if kind == "dt":
+            sort_value = datetime.fromisoformat(sort_value)
+        elif kind == "dec":
+            sort_value = Decimal(sort_value)
+    except (ValueError, TypeError, ArithmeticError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    return sort_value, row_id
+
+
+def _keyset_after(sort_column, id_column, cursor: str, descending: bool):
+    """
+    构建游标之后的行的过滤条件
+
+    与 ORDER BY sort_column NULLS LAST, id_column（同方向）配合使用，
+    可以直接走索引定位，不需要像 OFFSET 那样扫描并丢弃前面的行
+
+    Args:
+        sort_column: 排序列
+        id_column: 主键列（排序值相同时的次序）
+        cursor: 上一页返回的 next_cursor
+        descending: 是否降序
+
+    Returns:
+        SQLAlchemy 过滤条件
+    """
+    sort_value, row_id = _decode_cursor(cursor)
+
+    if sort_value is None:
+        # 游标已在 NULL 段内，只按 id 继续
+        return and_(
+            sort_column.is_(None),
+            id_column < row_id if descending else id_column > row_id
+        )
+
+    key = tuple_(sort_column, id_column)
+    return or_(
+        key < (sort_value, row_id) if descending else key > (sort_value, row_id),
+        sort_column.is_(None)
+    )
+
+
 async def initialize_db():
     """初始化数据库连接"""
     await db_manager.init_async_db()
@@ -103,17 +187,21 @@ async def get_tokens(
     page_size: int = 20,
     data_source: Optional[str] = None,
     min_market_cap: Optional[float] = None,
-    symbol: Optional[str] = None
+    symbol: Optional[str] = None,
+    cursor: Optional[str] = None
 ) -> TokenListResponse:
     """
     获取代币列表（分页）
 
+    传入 cursor 时使用游标分页（忽略 page，且不返回 total）
+
     Args:
         page: 页码
         page_size: 每页数量
         data_source: 数据源过滤
         min_market_cap: 最小市值
         symbol: 代币符号
+        cursor: 上一页返回的 next_cursor
 
     Returns:
         TokenListResponse
@@ -129,16 +217,18 @@ async def get_tokens(
         if symbol:
             query = query.where(Token.symbol.ilike(f"%{symbol}%"))
 
-        # 获取总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await session.scalar(count_query)
-
-        # 分页
-        offset = (page - 1) * page_size
-        query = query.offset(offset).limit(page_size)
+        if cursor:
+            # 游标分页：按 (updated_at, id) 定位，跳过 COUNT(*)
+            total = None
+            query = query.where(_keyset_after(Token.updated_at, Token.id, cursor, descending=True))
+        else:
+            # 获取总数
+            count_query = select(func.count()).select_from(query.subquery())
+            total = await session.scalar(count_query) or 0
+            query = query.offset((page - 1) * page_size)
 
-        # 按更新时间降序排序
-        query = query.order_by(desc(Token.updated_at))
+        # 按更新时间降序排序（id 保证顺序稳定）
+        query = query.order_by(desc(Token.updated_at).nulls_last(), desc(Token.id)).limit(page_size)
 
         # 执行查询
         result = await session.execute(query)
@@ -175,11 +265,16 @@ async def get_tokens(
 
             token_responses.append(TokenResponse(**token_data))
 
+        next_cursor = None
+        if len(tokens) == page_size:
+            next_cursor = _encode_cursor(tokens[-1].updated_at, tokens[-1].id)
+
         return TokenListResponse(
-            total=total or 0,
+            total=total,
             page=page,
             page_size=page_size,
-            data=token_responses
+            data=token_responses,
+            next_cursor=next_cursor
         )
 
 
@@ -230,21 +325,44 @@ async def get_token_by_address(address: str) -> Optional[TokenResponse]:
         return TokenResponse(**token_data)
 
 
-async def get_token_ohlcv(
+# K线查询超过该条数时使用服务端游标流式读取，否则一次取完后立即释放连接
+OHLCV_STREAM_MIN_LIMIT = 200
+
+
+def _ohlcv_row(record: TokenOHLCV, token_address: str) -> Dict[str, Any]:
+    """将 K 线记录转换为 OHLCVResponse 字段组成的字典"""
+    return {
+        "token_id": record.token_id,
+        "token_address": token_address,
+        "timestamp": record.timestamp,
+        "open_price": float(record.open) if record.open else None,
+        "high_price": float(record.high) if record.high else None,
+        "low_price": float(record.low) if record.low else None,
+        "close_price": float(record.close) if record.close else None,
+        "volume": float(record.volume) if record.volume else None,
+        "interval": record.timeframe
+    }
+
+
+async def iter_token_ohlcv(
     address: str,
     interval: str = "1d",
     limit: int = 100
-) -> List[OHLCVResponse]:
+) -> AsyncIterator[Dict[str, Any]]:
     """
-    获取代币的OHLCV数据
+    逐行获取代币的OHLCV数据（最近 limit 条，按时间升序）
+
+    limit 超过 OHLCV_STREAM_MIN_LIMIT 时通过服务端游标流式读取，内存中只保留当前行。
+    注意：流式读取期间数据库连接和事务一直被占用，直到迭代结束（或调用方关闭生成器），
+    客户端读取越慢占用越久；较小的 limit 一次取完后即释放连接，避免慢客户端耗尽连接池
 
     Args:
         address: 代币地址
         interval: 时间间隔
         limit: 返回数量
 
-    Returns:
-        OHLCV数据列表
+    Yields:
+        OHLCVResponse 字段组成的字典
     """
     async with db_manager.get_session() as session:
         # 先获取代币
@@ -253,35 +371,33 @@ async def get_token_ohlcv(
         token = token_result.scalar_one_or_none()
 
         if not token:
-            return []
+            return
 
-        # 查询OHLCV数据
-        query = select(TokenOHLCV).where(TokenOHLCV.token_id == token.id)
+        # 最近 limit 条（按时间戳降序取），再按时间升序输出，最旧的在前
+        latest_query = select(TokenOHLCV.id).where(TokenOHLCV.token_id == token.id)
 
         if interval:
-            query = query.where(TokenOHLCV.timeframe == interval)
+            latest_query = latest_query.where(TokenOHLCV.timeframe == interval)
 
-        # 按时间戳降序排序，最新的在前
-        query = query.order_by(desc(TokenOHLCV.timestamp)).limit(limit)
+        latest_query = latest_query.order_by(desc(TokenOHLCV.timestamp)).limit(limit)
+        query = (
+            select(TokenOHLCV)
+            .where(TokenOHLCV.id.in_(latest_query.scalar_subquery()))
+            .order_by(TokenOHLCV.timestamp)
+        )
+
+        if limit > OHLCV_STREAM_MIN_LIMIT:
+            records = await session.stream_scalars(query)
+            async for record in records:
+                yield _ohlcv_row(record, token.address)
+            return
 
         result = await session.execute(query)
-        ohlcv_records = result.scalars().all()
+        rows = [_ohlcv_row(record, token.address) for record in result.scalars()]
 
-        # 转换为响应模型
-        return [
-            OHLCVResponse(
-                token_id=record.token_id,
-                token_address=token.address,
-                timestamp=record.timestamp,
-                open_price=float(record.open) if record.open else None,
-                high_price=float(record.high) if record.high else None,
-                low_price=float(record.low) if record.low else None,
-                close_price=float(record.close) if record.close else None,
-                volume=float(record.volume) if record.volume else None,
-                interval=record.timeframe
-            )
-            for record in reversed(ohlcv_records)  # 反转顺序，最旧的在前
-        ]
+    # 连接已归还连接池，再逐行输出
+    for row in rows:
+        yield row
 
 
 async def search_tokens(
@@ -368,52 +484,50 @@ async def get_data_source_stats() -> StatsResponse:
     """
     获取数据源统计信息
 
+    代币数和OHLCV记录数各用一条 GROUP BY 查询按数据源汇总，
+    两条查询在各自的 session 中并发执行
+
     Returns:
         StatsResponse
     """
-    async with db_manager.get_session() as session:
-        # 总代币数
-        total_tokens_query = select(func.count(Token.id))
-        total_tokens = await session.scalar(total_tokens_query) or 0
-
-        # 总OHLCV记录数
-        total_ohlcv_query = select(func.count(TokenOHLCV.id))
-        total_ohlcv = await session.scalar(total_ohlcv_query) or 0
-
-        # 按数据源统计
-        sources_stats = []
-
-        # 获取所有唯一的数据源
-        sources_query = select(Token.data_source).distinct()
-        result = await session.execute(sources_query)
-        sources = [row[0] for row in result.all() if row[0]]
-
-        for source in sources:
-            # 该数据源的代币数
-            token_count_query = select(func.count(Token.id)).where(
-                Token.data_source == source
-            )
-            token_count = await session.scalar(token_count_query) or 0
-
-            # 该数据源的OHLCV记录数
-            ohlcv_count_query = select(func.count(TokenOHLCV.id)).join(
-                Token, TokenOHLCV.token_id == Token.id
-            ).where(Token.data_source == source)
-            ohlcv_count = await session.scalar(ohlcv_count_query) or 0
-
-            sources_stats.append(
-                DataSourceStats(
-                    source=source,
-                    token_count=token_count,
-                    ohlcv_count=ohlcv_count
-                )
-            )
-
-        return StatsResponse(
-            total_tokens=total_tokens,
-            total_ohlcv=total_ohlcv,
-            sources=sources_stats
+    async def count_by_source(query) -> Dict[Optional[str], int]:
+        async with db_manager.get_session() as session:
+            result = await session.execute(query)
+            return {source: count for source, count in result.all()}
+
+    # 按数据源统计代币数
+    token_counts_query = select(Token.data_source, func.count(Token.id)).group_by(Token.data_source)
+
+    # 按数据源统计OHLCV记录数（外连接，未关联代币的记录也计入总数）
+    ohlcv_counts_query = (
+        select(Token.data_source, func.count(TokenOHLCV.id))
+        .select_from(TokenOHLCV)
+        .outerjoin(Token, TokenOHLCV.token_id == Token.id)
+        .group_by(Token.data_source)
+    )
+
+    token_counts, ohlcv_counts = await asyncio.gather(
+        count_by_source(token_counts_query),
+        count_by_source(ohlcv_counts_query)
+    )
+
+    sources_stats = [
+        DataSourceStats(
+            source=source,
+            token_count=token_count,
+            ohlcv_count=ohlcv_counts.get(source, 0)
+        )
+        for source, token_count in sorted(
+            (item for item in token_counts.items() if item[0]),
+            key=lambda item: item[0]
         )
+    ]
+
+    return StatsResponse(
+        total_tokens=sum(token_counts.values()),
+        total_ohlcv=sum(ohlcv_counts.values()),
+        sources=sources_stats
+    )
 
 
 async def get_dexscreener_tokens(
@@ -425,11 +539,14 @@ async def get_dexscreener_tokens(
     min_market_cap: Optional[float] = None,
     symbol: Optional[str] = None,
     sort_by: str = "market_cap",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    cursor: Optional[str] = None
 ) -> DexScreenerTokenListResponse:
     """
     获取DexScreener代币列表（分页）
 
+    传入 cursor 时使用游标分页（忽略 page，且不返回 total）
+
     Args:
         page: 页码
         page_size: 每页数量
@@ -440,6 +557,7 @@ async def get_dexscreener_tokens(
         symbol: 代币符号
         sort_by: 排序字段 (market_cap, liquidity_usd, volume_h24, price_change_h24)
         sort_order: 排序方向 (asc, desc)
+        cursor: 上一页返回的 next_cursor
 
     Returns:
         DexScreenerTokenListResponse
@@ -464,20 +582,25 @@ async def get_dexscreener_tokens(
         if symbol:
             query = query.where(DexScreenerToken.base_token_symbol.ilike(f"%{symbol}%"))
 
-        # 获取总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await session.scalar(count_query)
-
-        # 排序
         sort_column = getattr(DexScreenerToken, sort_by, DexScreenerToken.market_cap)
-        if sort_order.lower() == "desc":
-            query = query.order_by(desc(sort_column))
-        else:
-            query = query.order_by(sort_column)
+        descending = sort_order.lower() == "desc"
 
-        # 分页
-        offset = (page - 1) * page_size
-        query = query.offset(offset).limit(page_size)
+        if cursor:
+            # 游标分页：按 (排序字段, id) 定位，跳过 COUNT(*)
+            total = None
+            query = query.where(_keyset_after(sort_column, DexScreenerToken.id, cursor, descending))
+        else:
+            # 获取总数
+            count_query = select(func.count()).select_from(query.subquery())
+            total = await session.scalar(count_query) or 0
+            query = query.offset((page - 1) * page_size)
+
+        # 排序（空值排在最后，id 保证顺序稳定）
+        if descending:
+            query = query.order_by(desc(sort_column).nulls_last(), desc(DexScreenerToken.id))
+        else:
+            query = query.order_by(sort_column.asc().nulls_last(), DexScreenerToken.id)
+        query = query.limit(page_size)
 
         # 执行查询
         result = await session.execute(query)
@@ -523,11 +646,16 @@ async def get_dexscreener_tokens(
                 )
             )
 
+        next_cursor = None
+        if len(tokens) == page_size:
+            next_cursor = _encode_cursor(getattr(tokens[-1], sort_column.key), tokens[-1].id)
+
         return DexScreenerTokenListResponse(
-            total=total or 0,
+            total=total,
             page=page,
             page_size=page_size,
-            data=token_responses
+            data=token_responses,
+            next_cursor=next_cursor
         )
 
 
@@ -687,11 +815,14 @@ async def get_price_swings(
     swing_type: Optional[str] = None,
     min_swing_pct: Optional[float] = None,
     sort_by: str = "start_time",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    cursor: Optional[str] = None
 ) -> PriceSwingListResponse:
     """
     获取价格波动列表
 
+    传入 cursor 时使用游标分页（忽略 page，且不返回 total）
+
     Args:
         page: 页码
         page_size: 每页数量
@@ -701,6 +832,7 @@ async def get_price_swings(
         min_swing_pct: 最小波动幅度过滤
         sort_by: 排序字段 (start_time, swing_pct, duration_hours)
         sort_order: 排序方向 (asc, desc)
+        cursor: 上一页返回的 next_cursor
 
     Returns:
         PriceSwingListResponse
@@ -747,24 +879,34 @@ async def get_price_swings(
             query_str += " AND ABS(ps.swing_pct) >= :min_swing_pct"
             params["min_swing_pct"] = min_swing_pct
 
-        # 获取总数
-        count_query = f"SELECT COUNT(*) FROM ({query_str}) as subq"
-        total_result = await session.execute(text(count_query), params)
-        total = total_result.scalar()
-
         # 排序
         valid_sort_fields = ["start_time", "swing_pct", "duration_hours", "created_at"]
         if sort_by not in valid_sort_fields:
             sort_by = "start_time"
 
         sort_direction = "DESC" if sort_order.lower() == "desc" else "ASC"
-        query_str += f" ORDER BY ps.{sort_by} {sort_direction}"
+
+        if cursor:
+            # 游标分页：按 (排序字段, id) 定位，跳过 COUNT(*)
+            total = None
+            params["cursor_value"], params["cursor_id"] = _decode_cursor(cursor)
+            comparison = "<" if sort_direction == "DESC" else ">"
+            query_str += f" AND (ps.{sort_by}, ps.id) {comparison} (:cursor_value, :cursor_id)"
+        else:
+            # 获取总数
+            count_query = f"SELECT COUNT(*) FROM ({query_str}) as subq"
+            total_result = await session.execute(text(count_query), params)
+            total = total_result.scalar() or 0
+
+        # id 保证排序值相同时顺序稳定
+        query_str += f" ORDER BY ps.{sort_by} {sort_direction}, ps.id {sort_direction}"
 
         # 分页
-        offset = (page - 1) * page_size
-        query_str += " LIMIT :limit OFFSET :offset"
+        query_str += " LIMIT :limit"
         params["limit"] = page_size
-        params["offset"] = offset
+        if not cursor:
+            query_str += " OFFSET :offset"
+            params["offset"] = (page - 1) * page_size
 
         # 执行查询
         result = await session.execute(text(query_str), params)
@@ -792,11 +934,16 @@ async def get_price_swings(
                 )
             )
 
+        next_cursor = None
+        if len(rows) == page_size:
+            next_cursor = _encode_cursor(getattr(rows[-1], sort_by), rows[-1].id)
+
         return PriceSwingListResponse(
-            total=total or 0,
+            total=total,
             page=page,
             page_size=page_size,
-            data=swing_responses
+            data=swing_responses,
+            next_cursor=next_cursor
         )
 
 
@@ -15,12 +15,12 @@ logger = setup_logger(__name__)
 class RateLimiter:
     """Token bucket rate limiter."""
 
-    def __init__(self, rate_limit: int):
+    def __init__(self, rate_limit: float):
         """
         Initialize rate limiter.
 
         Args:
-            rate_limit: Maximum requests per minute
+            rate_limit: Maximum requests per minute (may be fractional, e.g. 0.5 = one per 2 minutes)
         """
         self.rate_limit = rate_limit
         self.tokens = rate_limit
@@ -44,6 +44,8 @@ class RateLimiter:
                 sleep_time = (1 - self.tokens) / (self.rate_limit / 60.0)
                 logger.debug(f"Rate limit reached, waiting {sleep_time:.2f}s")
                 await asyncio.sleep(sleep_time)
+                # The wait already used up the refilled token; don't count it again on the next call
+                self.last_update = time.time()
                 self.tokens = 0
             else:
                 self.tokens -= 1
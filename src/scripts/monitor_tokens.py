@@ -58,8 +58,10 @@ def filter(count, top_n, headless, output):
             # 保存到文件
             if output:
                 import json
-                with open(output, 'w', encoding='utf-8') as f:
-                    json.dump(top_gainers, f, indent=2, ensure_ascii=False)
+                # 先在内存中完成序列化，再一次性写入文件
+                data = json.dumps(top_gainers, indent=2, ensure_ascii=False).encode('utf-8')
+                with open(output, 'wb') as f:
+                    f.write(data)
                 console.print(f"  [green]✓ 已保存到: {output}[/green]\n")
 
         except Exception as e:
@@ -7,23 +7,41 @@ DexScreener数据服务
 import time
 import json
 import sys
+import gzip
+import hashlib
 import asyncio
+import aiohttp
 import requests
 import cloudscraper
 import random
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterable, Iterator, AsyncIterator, Union
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from sqlalchemy import select, text
+from sqlalchemy import text, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from src.storage.db_manager import DatabaseManager
 from src.storage.models import DexScreenerToken
 from src.utils.logger import setup_logger
 
+try:
+    import orjson
+
+    def _json_dumps(obj: Any, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+    _json_loads = orjson.loads
+except ImportError:  # 未安装 orjson 时退回标准库
+    def _json_dumps(obj: Any, indent: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+    _json_loads = json.loads
+
 logger = setup_logger(__name__)
 
 # User-Agent 池，增加请求多样性
@@ -35,19 +53,87 @@ USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
 ]
 
+# 爬取结果缓存目录（L2 磁盘层，跨进程复用）
+SCRAPE_CACHE_DIR = Path("/tmp/dexscreener_cache")
+
+# DexScreener pairs 接口单次请求最多支持的交易对地址数
+PAIRS_BATCH_SIZE = 30
+
+# 导入数据库时每批 upsert 的行数
+IMPORT_BATCH_SIZE = 500
+
+
+async def _aiter_tokens(
+    tokens: Union[Iterable[Dict[str, Any]], AsyncIterator[Dict[str, Any]]]
+) -> AsyncIterator[Dict[str, Any]]:
+    """统一遍历代币列表或异步迭代器"""
+    if hasattr(tokens, "__aiter__"):
+        async for token in tokens:
+            yield token
+    else:
+        for token in tokens:
+            yield token
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """把API中的数值/数值字符串转为 float，无法转换时返回 None"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class TokenView:
+    """
+    交易对数据的只读视图，过滤时按属性访问，避免逐层字典 .get
+
+    raw 保留原始API数据，import_tokens 等仍使用原始字典
+    """
+
+    __slots__ = ("symbol", "price_usd", "liquidity_usd", "volume_h24", "raw")
+
+    symbol: str
+    price_usd: Optional[float]
+    liquidity_usd: float
+    volume_h24: float
+    raw: Dict[str, Any]
+
+    @classmethod
+    def from_raw(cls, raw: Dict[str, Any]) -> "TokenView":
+        """从 DexScreener API 返回的交易对数据构建视图"""
+        return cls(
+            symbol=(raw.get('baseToken') or {}).get('symbol', 'N/A'),
+            price_usd=_to_float(raw.get('priceUsd')),
+            liquidity_usd=_to_float((raw.get('liquidity') or {}).get('usd')) or 0.0,
+            volume_h24=_to_float((raw.get('volume') or {}).get('h24')) or 0.0,
+            raw=raw
+        )
+
 
 class DexScreenerService:
     """DexScreener数据服务类"""
 
-    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, cache_ttl: int = 0):
         """
         初始化服务
 
         Args:
             db_manager: 数据库管理器实例（可选，如果不提供会自动创建）
+            cache_ttl: 爬取结果缓存有效期（秒），0 表示不缓存。
+                适合反复运行的示例/调试场景，实时监控请保持为 0
         """
         self.db_manager = db_manager
         self._db_created = False
+        self.cache_ttl = cache_ttl
+        # L1 内存缓存: key -> (过期时间, 数据)
+        self._memory_cache: Dict[str, Any] = {}
+        # 异步HTTP会话（fetch_pair_details_async 首次调用时创建，复用连接）
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        # 本实例导入后尚未去重的 base_token_address（增量去重只检查这些代币）
+        self._pending_dedup_addresses = set()
 
     async def _ensure_db(self):
         """确保数据库管理器已初始化"""
@@ -57,10 +143,60 @@ class DexScreenerService:
             self._db_created = True
 
     async def close(self):
-        """关闭数据库连接"""
+        """关闭数据库连接和HTTP会话"""
+        if self._http_session and not self._http_session.closed:
+            await self._http_session.close()
         if self._db_created and self.db_manager:
             await self.db_manager.close()
 
+    # ==================== 爬取缓存 ====================
+
+    @staticmethod
+    def _cache_key(*parts: Any) -> str:
+        """由请求参数生成缓存键"""
+        return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[Any]:
+        """读取缓存，先查内存再查磁盘，过期返回 None"""
+        if self.cache_ttl <= 0:
+            return None
+
+        now = time.time()
+        entry = self._memory_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        cache_file = SCRAPE_CACHE_DIR / f"{key}.json.gz"
+        try:
+            if cache_file.stat().st_mtime + self.cache_ttl <= now:
+                return None
+            with gzip.open(cache_file, 'rb') as f:
+                data = _json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        self._memory_cache[key] = (cache_file.stat().st_mtime + self.cache_ttl, data)
+        return data
+
+    def _cache_set(self, key: str, data: Any):
+        """写入内存和磁盘缓存"""
+        if self.cache_ttl <= 0:
+            return
+
+        self._memory_cache[key] = (time.time() + self.cache_ttl, data)
+        try:
+            SCRAPE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with gzip.open(SCRAPE_CACHE_DIR / f"{key}.json.gz", 'wb') as f:
+                f.write(_json_dumps(data))
+        except OSError as e:
+            logger.warning(f"写入爬取缓存失败: {e}")
+
+    def refresh(self):
+        """清空爬取缓存，下次调用将重新爬取"""
+        self._memory_cache.clear()
+        for cache_file in SCRAPE_CACHE_DIR.glob("*.json.gz"):
+            cache_file.unlink(missing_ok=True)
+
     # ==================== 爬取功能 ====================
 
     def setup_chrome_driver(self, headless: bool = False, use_undetected: bool = True) -> webdriver.Chrome:
@@ -147,12 +283,18 @@ class DexScreenerService:
         Returns:
             包含交易对信息的列表 [{"pair_address": "0x...", "url": "...", "text": "..."}]
         """
+        url = "https://dexscreener.com/bsc"
+        cache_key = self._cache_key(url, target_count, max_scrolls)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info(f"使用缓存的交易对列表: {len(cached)} 个")
+            return cached
+
         logger.info(f"开始爬取DexScreener BSC页面，目标: {target_count}个交易对")
 
         driver = self.setup_chrome_driver(headless=headless)
 
         try:
-            url = "https://dexscreener.com/bsc"
             logger.info(f"访问页面: {url}")
             driver.get(url)
 
@@ -206,6 +348,7 @@ class DexScreenerService:
                     last_count = current_count
 
             logger.info(f"爬取完成，共获取 {len(tokens)} 个交易对")
+            self._cache_set(cache_key, tokens)
             return tokens
 
         finally:
@@ -239,6 +382,12 @@ class DexScreenerService:
         for idx, pair_addr in enumerate(pair_addresses, 1):
             try:
                 url = f"https://api.dexscreener.com/latest/dex/pairs/bsc/{pair_addr}"
+                cache_key = self._cache_key(url)
+                cached = self._cache_get(cache_key)
+                if cached is not None:
+                    detailed_tokens.append(cached)
+                    continue
+
                 response = requests.get(url, headers=headers, timeout=10)
 
                 if response.status_code == 200:
@@ -247,8 +396,10 @@ class DexScreenerService:
                     # API可能返回 'pair' 或 'pairs'
                     if 'pair' in data:
                         detailed_tokens.append(data['pair'])
+                        self._cache_set(cache_key, data['pair'])
                     elif 'pairs' in data and len(data['pairs']) > 0:
                         detailed_tokens.append(data['pairs'][0])
+                        self._cache_set(cache_key, data['pairs'][0])
 
                     if idx % 10 == 0 or idx == total:
                         logger.info(f"进度: {idx}/{total} ({len(detailed_tokens)} 成功)")
@@ -261,6 +412,88 @@ class DexScreenerService:
         logger.info(f"获取完成，成功: {len(detailed_tokens)}/{total}")
         return detailed_tokens
 
+    async def fetch_pair_details_async(
+        self,
+        pair_addresses: List[str],
+        concurrency: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        异步获取交易对详细信息（批量接口 + 并发请求）
+
+        每次请求携带最多 PAIRS_BATCH_SIZE 个地址，多个批次并发执行，
+        并发数由信号量限制，连接在服务实例内复用
+
+        Args:
+            pair_addresses: 交易对地址列表
+            concurrency: 最大并发请求数
+
+        Returns:
+            交易对详细信息列表（按输入顺序）
+        """
+        logger.info(f"开始异步获取 {len(pair_addresses)} 个交易对的详细信息")
+
+        url_prefix = "https://api.dexscreener.com/latest/dex/pairs/bsc/"
+        details: Dict[str, Dict[str, Any]] = {}
+
+        # 先查缓存，只请求未命中的地址
+        missing = []
+        for pair_addr in pair_addresses:
+            cached = self._cache_get(self._cache_key(url_prefix + pair_addr.lower()))
+            if cached is not None:
+                details[pair_addr.lower()] = cached
+            else:
+                missing.append(pair_addr)
+
+        if missing:
+            if self._http_session is None or self._http_session.closed:
+                self._http_session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300),
+                    timeout=aiohttp.ClientTimeout(total=10),
+                    headers={
+                        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+                        'Accept': 'application/json',
+                    }
+                )
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch_batch(batch: List[str]) -> List[Dict[str, Any]]:
+                async with semaphore:
+                    try:
+                        async with self._http_session.get(url_prefix + ",".join(batch)) as response:
+                            if response.status != 200:
+                                logger.warning(f"批量获取交易对失败: HTTP {response.status}")
+                                return []
+                            data = await response.json()
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        logger.error(f"批量获取交易对 {batch[0][:10]}... 失败: {e}")
+                        return []
+
+                # API可能返回 'pair' 或 'pairs'
+                if data.get('pairs'):
+                    return data['pairs']
+                if data.get('pair'):
+                    return [data['pair']]
+                return []
+
+            batches = [
+                missing[i:i + PAIRS_BATCH_SIZE]
+                for i in range(0, len(missing), PAIRS_BATCH_SIZE)
+            ]
+            for pairs in await asyncio.gather(*(fetch_batch(b) for b in batches)):
+                for pair in pairs:
+                    pair_addr = pair.get('pairAddress')
+                    if not pair_addr:
+                        continue
+                    details[pair_addr.lower()] = pair
+                    self._cache_set(self._cache_key(url_prefix + pair_addr.lower()), pair)
+
+        detailed_tokens = [
+            details[addr.lower()] for addr in pair_addresses if addr.lower() in details
+        ]
+        logger.info(f"获取完成，成功: {len(detailed_tokens)}/{len(pair_addresses)}")
+        return detailed_tokens
+
     def scrape_and_fetch(
         self,
         target_count: int = 100,
@@ -302,13 +535,70 @@ class DexScreenerService:
             output_path = Path(output_file)
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(detailed_data, f, indent=2, ensure_ascii=False)
+            output_path.write_bytes(_json_dumps(detailed_data, indent=True))
 
             logger.info(f"数据已保存到: {output_path}")
 
         return detailed_data
 
+    async def iter_scrape(
+        self,
+        target_count: int = 100,
+        output_file: Optional[str] = None,
+        headless: bool = True,
+        filter_old_tokens: bool = False,
+        max_age_days: int = 30
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式爬取：每获取一批交易对详情就逐个产出，不在内存中保留完整列表
+
+        可直接传给 import_tokens，实现边爬取边入库
+
+        Args:
+            target_count: 目标交易对数量
+            output_file: 输出NDJSON文件路径（可选，每行一个代币）
+            headless: 是否使用无头模式
+            filter_old_tokens: 是否过滤掉旧代币（默认False）
+            max_age_days: 代币最大年龄（天数）
+
+        Yields:
+            交易对详细数据
+        """
+        # 第一步：爬取页面获取交易对地址（浏览器操作放到线程中，避免阻塞事件循环）
+        pairs = await asyncio.to_thread(
+            self.scrape_bsc_page, target_count=target_count, headless=headless
+        )
+
+        if not pairs:
+            logger.error("未能获取到交易对数据")
+            return
+
+        output = None
+        if output_file:
+            output_path = Path(output_file)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output = open(output_path, 'wb')
+
+        try:
+            # 第二步：逐批获取详细信息并产出
+            pair_addresses = [p['pair_address'] for p in pairs]
+            for start in range(0, len(pair_addresses), PAIRS_BATCH_SIZE):
+                details = await self.fetch_pair_details_async(
+                    pair_addresses[start:start + PAIRS_BATCH_SIZE]
+                )
+
+                if filter_old_tokens:
+                    details = self.filter_tokens_by_age(details, max_age_days)
+
+                for token in details:
+                    if output:
+                        output.write(_json_dumps(token) + b'\n')
+                    yield token
+        finally:
+            if output:
+                output.close()
+                logger.info(f"数据已保存到: {output_file}")
+
     # ==================== 从页面解析数据（无需API调用）====================
 
     def scrape_bsc_page_with_details(
@@ -704,7 +994,8 @@ class DexScreenerService:
         if not tokens:
             return []
 
-        cutoff_time = datetime.now() - timedelta(days=max_age_days)
+        now = datetime.now()
+        cutoff_time = now - timedelta(days=max_age_days)
         cutoff_timestamp = int(cutoff_time.timestamp() * 1000)  # 转换为毫秒
 
         filtered_tokens = []
@@ -724,9 +1015,9 @@ class DexScreenerService:
             if pair_created_at >= cutoff_timestamp:
                 filtered_tokens.append(token)
             else:
-                # 计算代币年龄
+                # 计算代币年龄（复用循环外的当前时间）
                 created_time = datetime.fromtimestamp(pair_created_at / 1000)
-                age_days = (datetime.now() - created_time).days
+                age_days = (now - created_time).days
                 symbol = token.get('baseToken', {}).get('symbol', 'N/A')
                 logger.debug(f"过滤掉代币 {symbol}，创建于 {created_time.strftime('%Y-%m-%d')} ({age_days}天前)")
                 filtered_count += 1
@@ -837,14 +1128,15 @@ class DexScreenerService:
 
     async def import_tokens(
         self,
-        tokens_data: List[Dict[str, Any]],
+        tokens_data: Union[Iterable[Dict[str, Any]], AsyncIterator[Dict[str, Any]]],
         update_existing: bool = True
     ) -> Dict[str, int]:
         """
         导入代币数据到数据库
 
         Args:
-            tokens_data: 代币数据列表
+            tokens_data: 代币数据列表，或异步迭代器（如 iter_scrape），
+                每累积 IMPORT_BATCH_SIZE 条写入一次
             update_existing: 是否更新已存在的记录
 
         Returns:
@@ -852,58 +1144,56 @@ class DexScreenerService:
         """
         await self._ensure_db()
 
-        logger.info(f"开始导入 {len(tokens_data)} 个代币到数据库")
+        logger.info("开始导入代币到数据库")
 
         inserted_count = 0
         updated_count = 0
         error_count = 0
+        idx = 0
+
+        # 待写入的行；同一批中重复的交易对以最后一条为准
+        rows: Dict[str, Dict[str, Any]] = {}
 
         async with self.db_manager.get_session() as session:
-            for idx, raw_token in enumerate(tokens_data, 1):
-                try:
-                    # 解析数据
-                    parsed_data = self.parse_token_data(raw_token)
-                    pair_address = parsed_data.get("pair_address")
 
-                    if not pair_address:
-                        logger.warning(f"Token {idx}: 缺少交易对地址，跳过")
-                        error_count += 1
-                        continue
+            async def flush():
+                nonlocal inserted_count, updated_count, error_count
+                batch = list(rows.values())
+                rows.clear()
+                try:
+                    inserted, updated = await self._upsert_token_rows(session, batch, update_existing)
+                    await session.commit()
+                except Exception as e:
+                    await session.rollback()
+                    logger.error(f"导入 {len(batch)} 条代币时出错: {e}")
+                    error_count += len(batch)
+                    return
 
-                    # 检查是否已存在
-                    result = await session.execute(
-                        select(DexScreenerToken).where(
-                            DexScreenerToken.pair_address == pair_address
-                        )
-                    )
-                    existing_token = result.scalar_one_or_none()
-
-                    if existing_token and update_existing:
-                        # 更新现有记录
-                        for key, value in parsed_data.items():
-                            if key != 'pair_address':
-                                setattr(existing_token, key, value)
-                        existing_token.updated_at = datetime.utcnow()
-                        updated_count += 1
-                        logger.debug(f"[{idx}/{len(tokens_data)}] 更新: {parsed_data.get('base_token_symbol')}")
-                    elif not existing_token:
-                        # 插入新记录
-                        token = DexScreenerToken(**parsed_data)
-                        session.add(token)
-                        inserted_count += 1
-                        logger.info(f"[{idx}/{len(tokens_data)}] 插入: {parsed_data.get('base_token_symbol')}")
-
-                    # 每10条提交一次
-                    if idx % 10 == 0:
-                        await session.commit()
-                        logger.info(f"进度: {idx}/{len(tokens_data)}")
+                inserted_count += inserted
+                updated_count += updated
+                logger.info(f"进度: 已处理 {idx} 个代币")
 
+            async for raw_token in _aiter_tokens(tokens_data):
+                idx += 1
+                try:
+                    parsed_data = self.parse_token_data(raw_token)
                 except Exception as e:
                     logger.error(f"处理代币 {idx} 时出错: {e}")
                     error_count += 1
+                    continue
+
+                pair_address = parsed_data.get("pair_address")
+                if not pair_address:
+                    logger.warning(f"Token {idx}: 缺少交易对地址，跳过")
+                    error_count += 1
+                    continue
 
-            # 最终提交
-            await session.commit()
+                rows[pair_address] = parsed_data
+                if len(rows) >= IMPORT_BATCH_SIZE:
+                    await flush()
+
+            if rows:
+                await flush()
 
         stats = {
             "inserted": inserted_count,
@@ -914,6 +1204,55 @@ class DexScreenerService:
         logger.info(f"导入完成 - 插入: {inserted_count}, 更新: {updated_count}, 错误: {error_count}")
         return stats
 
+    async def _upsert_token_rows(
+        self,
+        session,
+        rows: List[Dict[str, Any]],
+        update_existing: bool
+    ) -> Tuple[int, int]:
+        """
+        用一条 INSERT ... ON CONFLICT (pair_address) 语句批量写入代币
+
+        Args:
+            session: 数据库会话（由调用方提交）
+            rows: parse_token_data 解析后的数据（pair_address 不重复）
+            update_existing: 是否更新已存在的记录
+
+        Returns:
+            (插入数, 更新数)
+        """
+        stmt = pg_insert(DexScreenerToken)
+        if update_existing:
+            update_columns = {
+                key: stmt.excluded[key] for key in rows[0] if key != "pair_address"
+            }
+            update_columns["updated_at"] = datetime.utcnow()
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["pair_address"],
+                set_=update_columns
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["pair_address"])
+
+        # xmax = 0 表示本行是新插入的，否则是被更新的
+        stmt = stmt.returning(
+            DexScreenerToken.base_token_address,
+            literal_column("xmax = 0").label("inserted")
+        )
+
+        result = await session.execute(stmt, rows)
+
+        inserted = 0
+        updated = 0
+        for base_token_address, is_inserted in result.all():
+            if is_inserted:
+                inserted += 1
+                self._pending_dedup_addresses.add(base_token_address)
+            else:
+                updated += 1
+
+        return inserted, updated
+
     async def import_from_json(
         self,
         json_file_path: str,
@@ -923,7 +1262,7 @@ class DexScreenerService:
         从JSON文件导入代币数据
 
         Args:
-            json_file_path: JSON文件路径
+            json_file_path: JSON文件路径（.ndjson/.jsonl 按行流式读取）
             update_existing: 是否更新已存在的记录
 
         Returns:
@@ -931,122 +1270,169 @@ class DexScreenerService:
         """
         logger.info(f"从JSON文件导入: {json_file_path}")
 
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            tokens_data = json.load(f)
+        if Path(json_file_path).suffix in ('.ndjson', '.jsonl'):
+            return await self.import_tokens(self._iter_ndjson(json_file_path), update_existing)
+
+        tokens_data = _json_loads(Path(json_file_path).read_bytes())
 
         return await self.import_tokens(tokens_data, update_existing)
 
+    @staticmethod
+    def _iter_ndjson(file_path: str) -> Iterator[Dict[str, Any]]:
+        """逐行读取NDJSON文件"""
+        with open(file_path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield _json_loads(line)
+
+    # 去重排名：流动性优先，其次24h交易量，id 作为稳定的平局裁决
+    _DEDUP_RANK_EXPR = """ROW_NUMBER() OVER (
+                            PARTITION BY base_token_address
+                            ORDER BY
+                                COALESCE(liquidity_usd, 0) DESC,
+                                COALESCE(volume_h24, 0) DESC,
+                                id
+                        )"""
+
+    async def _dedup_sql(self, session, token_filter: str = "", params: Optional[Dict[str, Any]] = None) -> int:
+        """
+        用 ROW_NUMBER() 窗口函数在数据库端删除每个代币除流动性最大之外的交易对
+
+        Args:
+            session: 数据库会话（由调用方提交）
+            token_filter: 限定参与去重代币的 WHERE 子句（增量模式）
+            params: token_filter 的绑定参数
+
+        Returns:
+            删除的记录数
+        """
+        result = await session.execute(text("""
+            DELETE FROM dexscreener_tokens
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, {rank_expr} as rn
+                    FROM dexscreener_tokens
+                    {token_filter}
+                ) ranked
+                WHERE rn > 1
+            )
+        """.format(rank_expr=self._DEDUP_RANK_EXPR, token_filter=token_filter)), params or {})
+        return result.rowcount
+
     async def deduplicate_tokens(
         self,
-        dry_run: bool = True
+        dry_run: bool = True,
+        incremental: bool = False
     ) -> Dict[str, Any]:
         """
         去重代币数据，每个代币只保留流动性最大的交易对
 
         Args:
             dry_run: 如果为True，只返回将要删除的记录，不实际删除
+            incremental: 如果为True，只检查本实例上次去重后新插入的代币
+                （要求表在此之前已全量去重过，否则请使用全量模式）
 
         Returns:
             去重统计信息
         """
         await self._ensure_db()
 
-        logger.info("开始分析重复代币...")
+        token_filter = ""
+        params = {}
+        if incremental:
+            pending = list(self._pending_dedup_addresses)
+            if not pending:
+                logger.info("没有新插入的代币，跳过增量去重")
+                return {
+                    "duplicate_tokens_count": 0,
+                    "pairs_to_delete": 0,
+                    "duplicate_info": [],
+                    "deleted": False
+                }
+            token_filter = "WHERE base_token_address = ANY(:token_addrs)"
+            params["token_addrs"] = pending
+            logger.info(f"开始增量分析 {len(pending)} 个新插入代币的重复情况...")
+        else:
+            logger.info("开始分析重复代币...")
 
         async with self.db_manager.get_session() as session:
-            # 查找重复代币
-            find_duplicates_query = text("""
-                SELECT
-                    base_token_address,
-                    base_token_symbol,
-                    base_token_name,
-                    COUNT(*) as pair_count
-                FROM dexscreener_tokens
-                GROUP BY base_token_address, base_token_symbol, base_token_name
-                HAVING COUNT(*) > 1
-            """)
-
-            result = await session.execute(find_duplicates_query)
-            duplicate_tokens = result.fetchall()
-
-            logger.info(f"找到 {len(duplicate_tokens)} 个有重复交易对的代币")
-
-            to_delete = []
-            duplicate_info = []
-
-            for token_addr, symbol, name, count in duplicate_tokens:
-                # 查找该代币的所有交易对
-                find_pairs_query = text("""
+            # 一次窗口查询取出所有重复组的交易对及其排名（rn=1 为保留项）
+            result = await session.execute(text("""
+                WITH ranked AS (
                     SELECT
                         id,
+                        base_token_address,
+                        base_token_symbol,
+                        base_token_name,
                         pair_address,
                         dex_id,
                         liquidity_usd,
-                        volume_h24
+                        {rank_expr} as rn,
+                        COUNT(*) OVER (PARTITION BY base_token_address) as pair_count
                     FROM dexscreener_tokens
-                    WHERE base_token_address = :token_addr
-                    ORDER BY
-                        COALESCE(liquidity_usd, 0) DESC,
-                        COALESCE(volume_h24, 0) DESC
-                """)
-
-                result = await session.execute(find_pairs_query, {"token_addr": token_addr})
-                pairs = result.fetchall()
-
-                # 保留第一个（流动性最大），删除其余
-                keep_pair = pairs[0]
-                delete_pairs = pairs[1:]
-
-                duplicate_info.append({
-                    "token_symbol": symbol,
-                    "token_name": name,
-                    "total_pairs": count,
-                    "keep": {
-                        "pair_address": keep_pair[1],
-                        "dex_id": keep_pair[2],
-                        "liquidity_usd": float(keep_pair[3]) if keep_pair[3] else 0
-                    },
-                    "delete": [
-                        {
-                            "pair_address": p[1],
-                            "dex_id": p[2],
-                            "liquidity_usd": float(p[3]) if p[3] else 0
-                        }
-                        for p in delete_pairs
-                    ]
-                })
-
-                to_delete.extend([p[0] for p in delete_pairs])
+                    {token_filter}
+                )
+                SELECT *
+                FROM ranked
+                WHERE pair_count > 1
+                ORDER BY base_token_address, rn
+            """.format(rank_expr=self._DEDUP_RANK_EXPR, token_filter=token_filter)), params)
+            rows = result.mappings().all()
+
+            duplicate_info = []
+            for row in rows:
+                pair = {
+                    "pair_address": row["pair_address"],
+                    "dex_id": row["dex_id"],
+                    "liquidity_usd": float(row["liquidity_usd"]) if row["liquidity_usd"] else 0
+                }
+                if row["rn"] == 1:
+                    # 保留第一个（流动性最大），删除其余
+                    duplicate_info.append({
+                        "token_symbol": row["base_token_symbol"],
+                        "token_name": row["base_token_name"],
+                        "total_pairs": row["pair_count"],
+                        "keep": pair,
+                        "delete": []
+                    })
+                else:
+                    duplicate_info[-1]["delete"].append(pair)
+
+            pairs_to_delete = len(rows) - len(duplicate_info)
+
+            logger.info(f"找到 {len(duplicate_info)} 个有重复交易对的代币")
 
             stats = {
-                "duplicate_tokens_count": len(duplicate_tokens),
-                "pairs_to_delete": len(to_delete),
+                "duplicate_tokens_count": len(duplicate_info),
+                "pairs_to_delete": pairs_to_delete,
                 "duplicate_info": duplicate_info
             }
 
-            if not dry_run and to_delete:
-                # 执行删除
-                delete_query = text("""
-                    DELETE FROM dexscreener_tokens
-                    WHERE id = ANY(:ids)
-                """)
-
-                await session.execute(delete_query, {"ids": to_delete})
+            if not dry_run and pairs_to_delete:
+                # 执行删除（集合操作，在数据库端一次完成）
+                deleted = await self._dedup_sql(session, token_filter, params)
                 await session.commit()
 
-                logger.info(f"✓ 已删除 {len(to_delete)} 条重复记录")
+                logger.info(f"✓ 已删除 {deleted} 条重复记录")
 
                 # 验证结果
                 verify_query = text("SELECT COUNT(*) FROM dexscreener_tokens")
                 result = await session.execute(verify_query)
                 remaining = result.scalar()
 
+                stats["pairs_to_delete"] = deleted
                 stats["remaining_records"] = remaining
                 stats["deleted"] = True
             else:
-                logger.info(f"[预览模式] 将删除 {len(to_delete)} 条记录")
+                logger.info(f"[预览模式] 将删除 {pairs_to_delete} 条记录")
                 stats["deleted"] = False
 
+            if not dry_run:
+                if incremental:
+                    self._pending_dedup_addresses.difference_update(params["token_addrs"])
+                else:
+                    self._pending_dedup_addresses.clear()
+
             return stats
 
     async def get_token_count(self) -> int:
@@ -1121,7 +1507,7 @@ class DexScreenerService:
             # 步骤3: 去重（可选）
             if deduplicate:
                 logger.info("\n[步骤 3/4] 执行去重...")
-                dedup_stats = await self.deduplicate_tokens(dry_run=False)
+                dedup_stats = await self.deduplicate_tokens(dry_run=False, incremental=True)
                 result["steps"]["deduplicate"] = dedup_stats
             else:
                 logger.info("\n[步骤 3/4] 跳过去重")
@@ -1587,7 +1973,8 @@ async def quick_scrape_and_import(
     headless: bool = True,
     deduplicate: bool = True,
     filter_old_tokens: bool = True,
-    max_age_days: int = 30
+    max_age_days: int = 30,
+    db_manager: Optional[DatabaseManager] = None
 ) -> Dict[str, Any]:
     """
     快速函数：一键爬取并导入
@@ -1598,11 +1985,12 @@ async def quick_scrape_and_import(
         deduplicate: 是否去重
         filter_old_tokens: 是否过滤掉旧代币（默认True）
         max_age_days: 代币最大年龄（天数），默认30天
+        db_manager: 复用的数据库管理器（可选，不提供则临时创建）
 
     Returns:
         操作结果
     """
-    service = DexScreenerService()
+    service = DexScreenerService(db_manager)
     try:
         result = await service.scrape_and_import(
             target_count=target_count,
@@ -7,7 +7,8 @@ import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, and_, desc, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..api_clients.geckoterminal_client import GeckoTerminalClient
@@ -17,18 +18,41 @@ from ..utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# 每个代币更新都会执行的"最新K线时间戳"查询，模块级构建一次，仅绑定参数变化
+_LATEST_KLINE_TS_STMT = (
+    select(TokenKline.timestamp)
+    .where(
+        and_(
+            TokenKline.pair_address == bindparam("pair_address"),
+            TokenKline.timeframe == bindparam("timeframe"),
+            TokenKline.aggregate == bindparam("aggregate")
+        )
+    )
+    .order_by(desc(TokenKline.timestamp))
+    .limit(1)
+)
+
 
 class KlineService:
     """K线数据更新服务"""
 
-    def __init__(self):
-        """初始化K线服务"""
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        """
+        初始化K线服务
+
+        Args:
+            db_manager: 数据库管理器实例（可选，如果不提供会自动创建）
+        """
         self.client = GeckoTerminalClient()
-        self.db_manager = DatabaseManager()
+        self.db_manager = db_manager or DatabaseManager()
+        # 只关闭自己创建的数据库管理器，外部传入的连接池由调用方负责
+        self._db_created = db_manager is None
 
     async def close(self):
-        """关闭服务"""
-        await self.db_manager.close()
+        """关闭服务（HTTP 会话，以及自行创建的数据库连接）"""
+        await self.client.close()
+        if self._db_created:
+            await self.db_manager.close()
 
     async def get_latest_kline_timestamp(
         self,
@@ -50,16 +74,12 @@ class KlineService:
             最新K线时间戳，如果没有数据则返回 None
         """
         result = await session.execute(
-            select(TokenKline.timestamp)
-            .where(
-                and_(
-                    TokenKline.pair_address == pair_address.lower(),
-                    TokenKline.timeframe == timeframe,
-                    TokenKline.aggregate == aggregate
-                )
-            )
-            .order_by(desc(TokenKline.timestamp))
-            .limit(1)
+            _LATEST_KLINE_TS_STMT,
+            {
+                "pair_address": pair_address.lower(),
+                "timeframe": timeframe,
+                "aggregate": aggregate
+            }
         )
         latest = result.scalar_one_or_none()
         return latest
@@ -89,55 +109,43 @@ class KlineService:
         Returns:
             统计信息 {saved: 新增数量, skipped: 跳过数量}
         """
-        saved_count = 0
-        skipped_count = 0
-
+        rows = []
         for kline in klines:
             try:
                 timestamp, open_price, high, low, close, volume = kline
-
-                # 检查是否已存在（使用唯一索引）
-                result = await session.execute(
-                    select(TokenKline).where(
-                        and_(
-                            TokenKline.pair_address == pair_address.lower(),
-                            TokenKline.timestamp == int(timestamp),
-                            TokenKline.timeframe == timeframe,
-                            TokenKline.aggregate == aggregate
-                        )
-                    )
-                )
-                existing = result.scalar_one_or_none()
-
-                if existing:
-                    # 已存在，跳过（可以选择更新）
-                    skipped_count += 1
-                    continue
-
-                # 创建新记录
-                kline_record = TokenKline(
-                    token_address=token_address.lower(),
-                    pair_address=pair_address.lower(),
-                    chain=chain,
-                    timestamp=int(timestamp),
-                    timeframe=timeframe,
-                    aggregate=aggregate,
-                    open=Decimal(str(open_price)),
-                    high=Decimal(str(high)),
-                    low=Decimal(str(low)),
-                    close=Decimal(str(close)),
-                    volume=Decimal(str(volume)),
-                    data_source="geckoterminal"
-                )
-
-                session.add(kline_record)
-                saved_count += 1
-
+                rows.append({
+                    "token_address": token_address.lower(),
+                    "pair_address": pair_address.lower(),
+                    "chain": chain,
+                    "timestamp": int(timestamp),
+                    "timeframe": timeframe,
+                    "aggregate": aggregate,
+                    "open": Decimal(str(open_price)),
+                    "high": Decimal(str(high)),
+                    "low": Decimal(str(low)),
+                    "close": Decimal(str(close)),
+                    "volume": Decimal(str(volume)),
+                    "data_source": "geckoterminal"
+                })
             except Exception as e:
-                logger.error(f"Error saving kline for {pair_address} @ {timestamp}: {e}")
+                logger.error(f"Error parsing kline for {pair_address}: {kline} ({e})")
                 continue
 
-        # 批量提交
+        if not rows:
+            return {"saved": 0, "skipped": 0}
+
+        # 单条多行 INSERT，已存在的K线（唯一索引冲突）直接跳过
+        result = await session.execute(
+            pg_insert(TokenKline)
+            .on_conflict_do_nothing(
+                index_elements=["pair_address", "timestamp", "timeframe", "aggregate"]
+            )
+            .returning(TokenKline.id),
+            rows
+        )
+        saved_count = len(result.all())
+        skipped_count = len(rows) - saved_count
+
         await session.commit()
 
         return {"saved": saved_count, "skipped": skipped_count}
@@ -286,14 +294,18 @@ class KlineService:
             async with self.db_manager.get_session() as session:
                 # 获取所有未删除的监控代币
                 result = await session.execute(
-                    select(MonitoredToken).where(
+                    select(
+                        MonitoredToken.token_address,
+                        MonitoredToken.pair_address,
+                        MonitoredToken.chain
+                    ).where(
                         and_(
                             MonitoredToken.deleted_at.is_(None),
                             MonitoredToken.permanently_deleted == 0
                         )
                     )
                 )
-                tokens = result.scalars().all()
+                tokens = result.all()
 
                 if not tokens:
                     logger.info("没有监控代币需要更新K线")
@@ -371,7 +383,11 @@ class KlineService:
             async with self.db_manager.get_session() as session:
                 # 获取所有未删除且未添加到监控的潜力代币
                 result = await session.execute(
-                    select(PotentialToken).where(
+                    select(
+                        PotentialToken.token_address,
+                        PotentialToken.pair_address,
+                        PotentialToken.chain
+                    ).where(
                         and_(
                             PotentialToken.is_added_to_monitoring == 0,
                             PotentialToken.deleted_at.is_(None),
@@ -379,7 +395,7 @@ class KlineService:
                         )
                     )
                 )
-                tokens = result.scalars().all()
+                tokens = result.all()
 
                 if not tokens:
                     logger.info("没有潜力代币需要更新K线")
@@ -461,26 +477,36 @@ class KlineService:
             async with self.db_manager.get_session() as session:
                 # 获取监控代币
                 monitored_result = await session.execute(
-                    select(MonitoredToken).where(
+                    select(
+                        MonitoredToken.token_address,
+                        MonitoredToken.pair_address,
+                        MonitoredToken.chain,
+                        MonitoredToken.token_symbol
+                    ).where(
                         and_(
                             MonitoredToken.deleted_at.is_(None),
                             MonitoredToken.permanently_deleted == 0
                         )
                     )
                 )
-                monitored_tokens = monitored_result.scalars().all()
+                monitored_tokens = monitored_result.all()
                 for token in monitored_tokens:
                     all_tokens.append({
                         "type": "monitored",
                         "token_address": token.token_address,
                         "pair_address": token.pair_address,
                         "chain": token.chain,
-                        "symbol": getattr(token, 'token_symbol', 'N/A')
+                        "symbol": token.token_symbol or 'N/A'
                     })
 
                 # 获取潜力代币
                 potential_result = await session.execute(
-                    select(PotentialToken).where(
+                    select(
+                        PotentialToken.token_address,
+                        PotentialToken.pair_address,
+                        PotentialToken.chain,
+                        PotentialToken.token_symbol
+                    ).where(
                         and_(
                             PotentialToken.is_added_to_monitoring == 0,
                             PotentialToken.deleted_at.is_(None),
@@ -488,14 +514,14 @@ class KlineService:
                         )
                     )
                 )
-                potential_tokens = potential_result.scalars().all()
+                potential_tokens = potential_result.all()
                 for token in potential_tokens:
                     all_tokens.append({
                         "type": "potential",
                         "token_address": token.token_address,
                         "pair_address": token.pair_address,
                         "chain": token.chain,
-                        "symbol": getattr(token, 'token_symbol', 'N/A')
+                        "symbol": token.token_symbol or 'N/A'
                     })
 
             if not all_tokens:
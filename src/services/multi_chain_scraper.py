@@ -4,6 +4,9 @@
 支持 BSC 和 Solana 链
 """
 
+import asyncio
+from concurrent.futures import Executor
+from operator import itemgetter
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from sqlalchemy import select
@@ -18,13 +21,41 @@ from src.utils.logger import setup_logger
 logger = setup_logger(__name__)
 
 
+def _scrape_chain_tokens(chain: str, limit: int, use_undetected_chrome: bool) -> List[Dict[str, Any]]:
+    """
+    爬取单条链的代币列表（模块级函数，可提交到进程池执行）
+
+    Args:
+        chain: 链名称
+        limit: 爬取数量
+        use_undetected_chrome: 是否使用 undetected-chromedriver
+
+    Returns:
+        代币数据列表
+    """
+    service = DexScreenerService()
+    if use_undetected_chrome:
+        return service.scrape_with_undetected_chrome(chain=chain, limit=limit)
+    return service.scrape_with_cloudscraper(chain=chain, limit=limit)
+
+
 class MultiChainScraper:
     """多链爬虫服务"""
 
-    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+    def __init__(
+        self,
+        db_manager: Optional[DatabaseManager] = None,
+        executor: Optional[Executor] = None
+    ):
+        """
+        Args:
+            db_manager: 数据库管理器实例（可选，如果不提供会自动创建）
+            executor: 执行阻塞爬取的执行器（如进程池）；不提供时在线程中执行
+        """
         self.db_manager = db_manager
         self._db_created = False
         self.dex_service = DexScreenerService()
+        self.executor = executor
 
     async def _ensure_db(self):
         """确保数据库已初始化"""
@@ -35,9 +66,16 @@ class MultiChainScraper:
 
     async def close(self):
         """关闭连接"""
+        await self.dex_service.close()
         if self._db_created and self.db_manager:
             await self.db_manager.close()
 
+    async def __aenter__(self) -> "MultiChainScraper":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
     def _get_correct_case_address(self, pair_address: str, chain: str) -> str:
         """
         获取正确大小写的地址（仅对 Solana）
@@ -71,6 +109,25 @@ class MultiChainScraper:
 
         return pair_address
 
+    def _correct_addresses_case(self, tokens: List[Dict[str, Any]], chain: str):
+        """
+        逐个修正代币的 pair 地址大小写（同步请求，原地修改）
+
+        Args:
+            tokens: 代币数据列表
+            chain: 链名称
+        """
+        for token_data in tokens:
+            old_address = token_data.get('pair_address', '')
+            correct_address = self._get_correct_case_address(old_address, chain)
+            if correct_address != old_address:
+                token_data['pair_address'] = correct_address
+                # 如果 token_address 也是 pair_address，同样修正
+                if token_data.get('token_address') == old_address:
+                    token_data['token_address'] = correct_address
+            # 避免API限流
+            time.sleep(0.1)
+
     async def scrape_and_save_multi_chain(
         self,
         chains: List[str] = ['bsc', 'solana'],
@@ -79,10 +136,11 @@ class MultiChainScraper:
         use_undetected_chrome: bool = False,
         min_market_cap: Optional[float] = None,
         min_liquidity: Optional[float] = None,
-        max_token_age_days: Optional[int] = None
+        max_token_age_days: Optional[int] = None,
+        max_concurrent_chains: int = 2
     ) -> Dict[str, Any]:
         """
-        爬取多条链并保存到 potential_tokens 表
+        爬取多条链并保存到 potential_tokens 表（各链并发爬取）
 
         Args:
             chains: 链列表，如 ['bsc', 'solana']
@@ -92,6 +150,7 @@ class MultiChainScraper:
             min_market_cap: 最小市值（美元），低于此值的代币将被过滤
             min_liquidity: 最小流动性（美元），低于此值的代币将被过滤
             max_token_age_days: 最大代币年龄（天），超过此值的代币将被过滤
+            max_concurrent_chains: 同时爬取的链数量上限（undetected-chromedriver 模式下固定为1）
 
         Returns:
             统计信息 {chain: {scraped, saved, skipped}}
@@ -106,20 +165,33 @@ class MultiChainScraper:
         total_saved = 0
         total_skipped = 0
 
-        for chain in chains:
-            logger.info(f"\n{'─'*80}")
-            logger.info(f"爬取 {chain.upper()} 链...")
-            logger.info(f"{'─'*80}")
+        # 限制并发，避免触发 DexScreener 限流；
+        # undetected-chromedriver 首次启动会修补 chromedriver，多个实例同时启动会冲突
+        semaphore = asyncio.Semaphore(1 if use_undetected_chrome else max_concurrent_chains)
+
+        async def scrape_chain(chain: str) -> Dict[str, Any]:
+            async with semaphore:
+                logger.info(f"\n{'─'*80}\n爬取 {chain.upper()} 链...\n{'─'*80}")
+                return await self._scrape_and_save_chain(
+                    chain=chain,
+                    count=count_per_chain,
+                    top_n=top_n_per_chain,
+                    use_undetected_chrome=use_undetected_chrome,
+                    min_market_cap=min_market_cap,
+                    min_liquidity=min_liquidity,
+                    max_token_age_days=max_token_age_days
+                )
+
+        chain_results = await asyncio.gather(
+            *(scrape_chain(chain) for chain in chains),
+            return_exceptions=True
+        )
 
-            chain_result = await self._scrape_and_save_chain(
-                chain=chain,
-                count=count_per_chain,
-                top_n=top_n_per_chain,
-                use_undetected_chrome=use_undetected_chrome,
-                min_market_cap=min_market_cap,
-                min_liquidity=min_liquidity,
-                max_token_age_days=max_token_age_days
-            )
+        for chain, chain_result in zip(chains, chain_results):
+            if isinstance(chain_result, Exception):
+                # 单条链失败不影响其他链的结果
+                logger.error(f"  {chain}: 爬取失败: {chain_result}")
+                chain_result = {"scraped": 0, "saved": 0, "skipped": 0, "error": str(chain_result)}
 
             results[chain] = chain_result
             total_saved += chain_result['saved']
@@ -161,13 +233,20 @@ class MultiChainScraper:
             {scraped, saved, skipped, filtered}
         """
         # 1. 爬取数据（根据参数选择方法）
-        if use_undetected_chrome:
-            tokens = self.dex_service.scrape_with_undetected_chrome(
+        # 同步爬取交给执行器（进程池可避免 Selenium/cloudscraper 阻塞主进程），未提供时放到线程中
+        if self.executor is not None:
+            tokens = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _scrape_chain_tokens, chain, count, use_undetected_chrome
+            )
+        elif use_undetected_chrome:
+            tokens = await asyncio.to_thread(
+                self.dex_service.scrape_with_undetected_chrome,
                 chain=chain,
                 limit=count
             )
         else:
-            tokens = self.dex_service.scrape_with_cloudscraper(
+            tokens = await asyncio.to_thread(
+                self.dex_service.scrape_with_cloudscraper,
                 chain=chain,
                 limit=count
             )
@@ -199,37 +278,30 @@ class MultiChainScraper:
             if max_token_age_days:
                 logger.info(f"      代币年龄 <= {max_token_age_days} 天")
 
-            filtered_tokens = []
-            for token in tokens_with_change:
+            # 缺少对应字段的代币视为不满足条件
+            filtered_tokens = [
+                token for token in tokens_with_change
                 # 检查市值
-                if min_market_cap is not None:
-                    market_cap = token.get('market_cap')
-                    if market_cap is None or market_cap < min_market_cap:
-                        filtered_count += 1
-                        continue
-
+                if (min_market_cap is None
+                    or ((market_cap := token.get('market_cap')) is not None
+                        and market_cap >= min_market_cap))
                 # 检查流动性
-                if min_liquidity is not None:
-                    liquidity = token.get('liquidity_usd')
-                    if liquidity is None or liquidity < min_liquidity:
-                        filtered_count += 1
-                        continue
-
+                and (min_liquidity is None
+                     or ((liquidity := token.get('liquidity_usd')) is not None
+                         and liquidity >= min_liquidity))
                 # 检查代币年龄
-                if max_token_age_days is not None:
-                    age_days = token.get('age_days')
-                    if age_days is None or age_days > max_token_age_days:
-                        filtered_count += 1
-                        continue
-
-                filtered_tokens.append(token)
+                and (max_token_age_days is None
+                     or ((age_days := token.get('age_days')) is not None
+                         and age_days <= max_token_age_days))
+            ]
+            filtered_count = len(tokens_with_change) - len(filtered_tokens)
 
             logger.info(f"  ✓ 筛选后剩余 {len(filtered_tokens)} 个代币（过滤掉 {filtered_count} 个）")
 
-        # 3. 按24h涨幅排序取前N
+        # 3. 按24h涨幅排序取前N（前面已过滤掉没有涨幅数据的代币，可直接取值）
         sorted_tokens = sorted(
             filtered_tokens,
-            key=lambda x: x.get('price_change_24h', 0),
+            key=itemgetter('price_change_24h'),
             reverse=True
         )
         top_gainers = sorted_tokens[:top_n]
@@ -246,16 +318,7 @@ class MultiChainScraper:
         # 4. 对于 Solana 链，修正地址大小写
         if chain == 'solana':
             logger.info(f"  🔧 修正 Solana 地址大小写...")
-            for token_data in top_gainers:
-                old_address = token_data.get('pair_address', '')
-                correct_address = self._get_correct_case_address(old_address, chain)
-                if correct_address != old_address:
-                    token_data['pair_address'] = correct_address
-                    # 如果 token_address 也是 pair_address，同样修正
-                    if token_data.get('token_address') == old_address:
-                        token_data['token_address'] = correct_address
-                # 避免API限流
-                time.sleep(0.1)
+            await asyncio.to_thread(self._correct_addresses_case, top_gainers, chain)
 
         # 5. 保存到数据库
         saved_count = 0
@@ -5,7 +5,9 @@ Token Monitor Service
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional
+import random
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -24,16 +26,26 @@ logger = setup_logger(__name__)
 class TokenMonitorService:
     """Token monitoring service for price drop alerts."""
 
-    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+    def __init__(
+        self,
+        db_manager: Optional[DatabaseManager] = None,
+        config_cache_ttl: float = 60,
+        ave_concurrency: int = 10
+    ):
         """
         Initialize monitor service.
 
         Args:
             db_manager: Database manager instance
+            config_cache_ttl: 监控/爬虫配置在进程内的缓存有效期（秒），0 表示不缓存
+            ave_concurrency: 该实例所有 AVE API 请求合计的最大并发数（多个更新任务同时运行时共享）
         """
         self.db_manager = db_manager
         self._db_created = False
         self.dex_service = DexScreenerService(db_manager=db_manager)
+        self.config_cache_ttl = config_cache_ttl
+        self._config_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._ave_semaphore = asyncio.Semaphore(ave_concurrency)
 
     async def _ensure_db(self):
         """Ensure database manager is initialized."""
@@ -43,10 +55,59 @@ class TokenMonitorService:
             self._db_created = True
 
     async def close(self):
-        """Close database connection."""
+        """Close HTTP session and database connection."""
+        await self.dex_service.close()
         if self._db_created and self.db_manager:
             await self.db_manager.close()
 
+    async def __aenter__(self) -> "TokenMonitorService":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _fetch_ave_pair(self, pair_address: str, chain: str, delay: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        获取 AVE API 交易对详情，受实例级共享并发限制
+
+        AVE API 是同步请求，放到线程中执行，避免阻塞事件循环；
+        请求完成后仍占用并发槽位停顿 delay 秒（随机 ±50%），控制整体请求速率
+
+        Args:
+            pair_address: 交易对地址
+            chain: 链（bsc 或 solana）
+            delay: 请求完成后的平均停顿（秒）
+
+        Returns:
+            解析后的交易对数据，失败时为 None
+        """
+        async with self._ave_semaphore:
+            try:
+                return await asyncio.to_thread(
+                    ave_api_service.get_pair_detail_parsed,
+                    pair_address=pair_address,
+                    chain=chain
+                )
+            finally:
+                if delay:
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    def _config_cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的配置缓存（返回副本，调用方修改不影响缓存）"""
+        entry = self._config_cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return dict(entry[1])
+
+    def _config_cache_set(self, key: str, config: Optional[Dict[str, Any]]):
+        """写入配置缓存（读取失败或不存在时不缓存，下次重新查询）"""
+        if self.config_cache_ttl > 0 and config is not None:
+            self._config_cache[key] = (time.monotonic() + self.config_cache_ttl, dict(config))
+
+    def invalidate_config_cache(self):
+        """清空配置缓存，下次读取时重新查询数据库"""
+        self._config_cache.clear()
+
     def _format_token_list(self, tokens: list) -> List[Dict[str, Any]]:
         """
         Format a list of MonitoredToken objects to dictionaries with all AVE API fields.
@@ -488,14 +549,19 @@ class TokenMonitorService:
     async def update_monitored_prices(
         self,
         batch_size: int = 10,
-        delay: float = 0.3
+        delay: float = 0.3,
+        concurrency: int = 8
     ) -> Dict[str, Any]:
         """
         Update current prices and detailed data for all active monitored tokens using AVE API.
 
+        AVE API 请求并发执行（最多 concurrency 个同时进行），
+        拿到数据后再在同一个 session 中逐个更新并检查报警
+
         Args:
             batch_size: Number of pairs to fetch at once (not used with AVE API, kept for compatibility)
-            delay: Delay between API calls (seconds)
+            delay: 每个请求完成后该并发槽位的平均停顿（秒，随机 ±50%）
+            concurrency: 本次调用的最大并发请求数（同时受实例级 ave_concurrency 限制）
 
         Returns:
             Update statistics including removal counts
@@ -504,19 +570,14 @@ class TokenMonitorService:
 
         logger.info("Updating prices for monitored tokens using AVE API...")
 
-        # Load monitor configuration
-        monitor_config = None
-        async with self.db_manager.get_session() as session:
-            config_result = await session.execute(
-                select(MonitorConfig).limit(1)
-            )
-            monitor_config = config_result.scalar_one_or_none()
+        # Load monitor configuration (cached)
+        monitor_config = await self.get_monitor_config()
 
         min_market_cap = None
         min_liquidity = None
         if monitor_config:
-            min_market_cap = float(monitor_config.min_monitor_market_cap) if monitor_config.min_monitor_market_cap else None
-            min_liquidity = float(monitor_config.min_monitor_liquidity) if monitor_config.min_monitor_liquidity else None
+            min_market_cap = monitor_config.get('min_monitor_market_cap')
+            min_liquidity = monitor_config.get('min_monitor_liquidity')
             if min_market_cap or min_liquidity:
                 logger.info(f"监控过滤阈值: 市值 >= {min_market_cap}, 流动性 >= {min_liquidity}")
 
@@ -544,22 +605,29 @@ class TokenMonitorService:
         removed_count = 0
         removed_by_market_cap = 0
         removed_by_liquidity = 0
-        import time
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_pair_data(token):
+            # 使用代币的 chain 字段（bsc 或 solana）
+            chain = getattr(token, 'chain', 'bsc')  # 兼容旧数据，默认 bsc
+            async with semaphore:
+                return await self._fetch_ave_pair(token.pair_address, chain, delay)
+
+        # 并发获取AVE API数据
+        pair_results = await asyncio.gather(
+            *(fetch_pair_data(token) for token in monitored_tokens),
+            return_exceptions=True
+        )
 
         async with self.db_manager.get_session() as session:
-            for token in monitored_tokens:
+            for token, pair_data in zip(monitored_tokens, pair_results):
                 try:
-                    # Fetch detailed data from AVE API
-                    # 使用代币的 chain 字段（bsc 或 solana）
-                    chain = getattr(token, 'chain', 'bsc')  # 兼容旧数据，默认 bsc
-                    pair_data = ave_api_service.get_pair_detail_parsed(
-                        pair_address=token.pair_address,
-                        chain=chain
-                    )
+                    if isinstance(pair_data, Exception):
+                        raise pair_data
 
                     if not pair_data or not pair_data.get('current_price_usd'):
                         logger.warning(f"No price data for {token.token_symbol}")
-                        time.sleep(delay)
                         continue
 
                     current_price = pair_data['current_price_usd']
@@ -684,12 +752,8 @@ class TokenMonitorService:
                             f"{min_market_cap if removal_reason == 'low_market_cap' else min_liquidity:.2f})"
                         )
 
-                    # Delay to avoid rate limiting
-                    time.sleep(delay)
-
                 except Exception as e:
                     logger.error(f"Error updating {token.token_symbol}: {e}")
-                    time.sleep(delay)
                     continue
 
             await session.commit()
@@ -1544,33 +1608,33 @@ class TokenMonitorService:
     async def update_potential_tokens_data(
         self,
         delay: float = 0.3,
-        min_update_interval_minutes: int = 3
+        min_update_interval_minutes: int = 3,
+        max_concurrency: int = 10
     ) -> Dict[str, Any]:
         """
         更新所有潜力币种的AVE API数据
 
+        AVE API 请求并发执行（最多 max_concurrency 个同时进行），
+        拿到数据后再在同一个 session 中逐个更新
+
         Args:
-            delay: API调用间隔（秒）
+            delay: 每个请求完成后该并发槽位的平均停顿（秒，随机 ±50%）
             min_update_interval_minutes: 最小更新间隔（分钟），避免频繁调用
+            max_concurrency: 本次调用的最大并发请求数（同时受实例级 ave_concurrency 限制）
 
         Returns:
             更新统计
         """
         await self._ensure_db()
 
-        # 加载监控配置（用于筛选阈值）
-        monitor_config = None
-        async with self.db_manager.get_session() as session:
-            config_result = await session.execute(
-                select(MonitorConfig).limit(1)
-            )
-            monitor_config = config_result.scalar_one_or_none()
+        # 加载监控配置（用于筛选阈值，使用缓存）
+        monitor_config = await self.get_monitor_config()
 
         min_market_cap = None
         min_liquidity = None
         if monitor_config:
-            min_market_cap = float(monitor_config.min_monitor_market_cap) if monitor_config.min_monitor_market_cap else None
-            min_liquidity = float(monitor_config.min_monitor_liquidity) if monitor_config.min_monitor_liquidity else None
+            min_market_cap = monitor_config.get('min_monitor_market_cap')
+            min_liquidity = monitor_config.get('min_monitor_liquidity')
             if min_market_cap or min_liquidity:
                 logger.info(f"潜力代币筛选阈值: 市值 >= {min_market_cap}, 流动性 >= {min_liquidity}")
 
@@ -1601,7 +1665,6 @@ class TokenMonitorService:
         removed_count = 0
         removed_by_market_cap = 0
         removed_by_liquidity = 0
-        import time
 
         # 在同一个 session 中查询和更新
         async with self.db_manager.get_session() as session:
@@ -1621,20 +1684,28 @@ class TokenMonitorService:
 
             logger.info(f"Found {len(potential_tokens)} potential tokens to update")
 
-            for token in potential_tokens:
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def fetch_pair_data(token):
+                # 使用代币的 chain 字段（bsc 或 solana）
+                chain = getattr(token, 'chain', 'bsc')  # 兼容旧数据，默认 bsc
+                async with semaphore:
+                    return await self._fetch_ave_pair(token.pair_address, chain, delay)
+
+            # 并发获取AVE API数据
+            pair_results = await asyncio.gather(
+                *(fetch_pair_data(token) for token in potential_tokens),
+                return_exceptions=True
+            )
+
+            for token, pair_data in zip(potential_tokens, pair_results):
                 try:
-                    # 获取AVE API数据
-                    # 使用代币的 chain 字段（bsc 或 solana）
-                    chain = getattr(token, 'chain', 'bsc')  # 兼容旧数据，默认 bsc
-                    pair_data = ave_api_service.get_pair_detail_parsed(
-                        pair_address=token.pair_address,
-                        chain=chain
-                    )
+                    if isinstance(pair_data, Exception):
+                        raise pair_data
 
                     if not pair_data:
                         logger.warning(f"No AVE data for {token.token_symbol}")
                         failed_count += 1
-                        time.sleep(delay)
                         continue
 
                     # 更新所有AVE API字段（和 MonitoredToken 一样的逻辑）
@@ -1747,12 +1818,9 @@ class TokenMonitorService:
                     # 不再打印每个代币的成功更新，最后汇总
                     updated_count += 1
 
-                    time.sleep(delay)
-
                 except Exception as e:
                     logger.error(f"Error updating {token.token_symbol}: {e}")
                     failed_count += 1
-                    time.sleep(delay)
 
             # 汇总成功日志
             if updated_count > 0:
@@ -1778,7 +1846,20 @@ class TokenMonitorService:
 
     async def get_monitor_config(self) -> Optional[Dict[str, Any]]:
         """
-        获取监控配置
+        获取监控配置（进程内缓存 config_cache_ttl 秒，配置变更最多延迟一个缓存周期生效）
+
+        Returns:
+            配置字典，如果不存在则返回None
+        """
+        config = self._config_cache_get('monitor')
+        if config is None:
+            config = await self._load_monitor_config()
+            self._config_cache_set('monitor', config)
+        return config
+
+    async def _load_monitor_config(self) -> Optional[Dict[str, Any]]:
+        """
+        从数据库读取监控配置
 
         Returns:
             配置字典，如果不存在则返回None
@@ -1819,7 +1900,20 @@ class TokenMonitorService:
 
     async def get_scraper_config(self) -> Optional[Dict[str, Any]]:
         """
-        获取爬虫配置
+        获取爬虫配置（进程内缓存 config_cache_ttl 秒，配置变更最多延迟一个缓存周期生效）
+
+        Returns:
+            配置字典，如果不存在则返回None
+        """
+        config = self._config_cache_get('scraper')
+        if config is None:
+            config = await self._load_scraper_config()
+            self._config_cache_set('scraper', config)
+        return config
+
+    async def _load_scraper_config(self) -> Optional[Dict[str, Any]]:
+        """
+        从数据库读取爬虫配置
 
         Returns:
             配置字典，如果不存在则返回None
@@ -1875,7 +1969,7 @@ class TokenMonitorService:
         import uuid
 
         # 1. 调用 AVE API 获取 pair 详情
-        pair_data = ave_api_service.get_pair_detail_parsed(pair_address, chain)
+        pair_data = await self._fetch_ave_pair(pair_address, chain)
         if not pair_data:
             raise ValueError(
                 f"无法找到 pair: {pair_address} (链: {chain})。"
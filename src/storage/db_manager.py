@@ -19,6 +19,21 @@ from ..utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+try:
+    import orjson
+
+    def _json_serializer(value: Any) -> str:
+        """Serialize JSON/JSONB column values with orjson."""
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    # Engine options shared by the sync and async engines
+    _JSON_ENGINE_OPTIONS: Dict[str, Any] = {
+        "json_serializer": _json_serializer,
+        "json_deserializer": orjson.loads,
+    }
+except ImportError:  # orjson not installed: keep SQLAlchemy's stdlib json
+    _JSON_ENGINE_OPTIONS = {}
+
 
 class DatabaseManager:
     """Manages database connections and operations."""
@@ -41,7 +56,7 @@ class DatabaseManager:
         logger.info(f"Initializing database: {self.database_url}")
 
         # Create engine
-        self.engine = create_engine(self.database_url, echo=False)
+        self.engine = create_engine(self.database_url, echo=False, **_JSON_ENGINE_OPTIONS)
 
         # Create tables
         Base.metadata.create_all(bind=self.engine)
@@ -62,8 +77,25 @@ class DatabaseManager:
         # Convert to async URL (postgresql:// -> postgresql+asyncpg://)
         async_url = self.database_url.replace("postgresql://", "postgresql+asyncpg://")
 
-        # Create async engine
-        self.async_engine = create_async_engine(async_url, echo=False)
+        # Create async engine (long-lived pools: validate connections on checkout,
+        # recycle them before server-side idle timeouts drop them, and keep idle
+        # connections alive through NAT/load balancers with TCP keepalives)
+        self.async_engine = create_async_engine(
+            async_url,
+            echo=False,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            connect_args={
+                "server_settings": {
+                    "tcp_keepalives_idle": str(config.DB_TCP_KEEPALIVE_IDLE),
+                    "tcp_keepalives_interval": "10",
+                    "tcp_keepalives_count": "3",
+                }
+            },
+            **_JSON_ENGINE_OPTIONS
+        )
 
         # Create tables
         async with self.async_engine.begin() as conn:
@@ -26,7 +26,7 @@ class Token(Base):
     symbol = Column(String(50), nullable=False)
     decimals = Column(Integer, default=18)
     total_supply = Column(Numeric(78, 0), nullable=True)  # Large enough for uint256 blockchain values
-    data_source = Column(String(50), nullable=True)  # Data source (ave, geckoterminal, dexscreener)
+    data_source = Column(String(50), nullable=True, index=True)  # Data source (ave, geckoterminal, dexscreener)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -839,6 +839,11 @@ class TokenKline(Base):
         Index("idx_kline_token_time", "token_address", "timestamp"),
         Index("idx_kline_pair_time", "pair_address", "timestamp"),
         Index("idx_kline_timeframe", "timeframe", "aggregate"),
+        # 覆盖索引：按交易对统计K线数量时走 index-only scan
+        Index(
+            "idx_kline_pair_tf_agg", "pair_address", "timeframe", "aggregate",
+            postgresql_include=["id"]
+        ),
         # 唯一约束：同一交易对、同一时间、同一周期、同一聚合级别只能有一条K线
         Index("idx_kline_unique", "pair_address", "timestamp", "timeframe", "aggregate", unique=True),
     )
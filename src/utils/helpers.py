@@ -1,9 +1,23 @@
 """Helper utility functions."""
+import asyncio
 from typing import Optional, Dict, Any
 from datetime import datetime, timezone
 from decimal import Decimal
 
 
+async def ainput(prompt: str = "") -> str:
+    """
+    Read a line from stdin without blocking the event loop.
+
+    Args:
+        prompt: Prompt to display
+
+    Returns:
+        Line entered by the user
+    """
+    return await asyncio.to_thread(input, prompt)
+
+
 def get_current_timestamp() -> datetime:
     """Get current UTC timestamp."""
     return datetime.now(timezone.utc)